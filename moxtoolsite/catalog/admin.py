@@ -2,13 +2,21 @@ from django.contrib import admin
 from catalog.models import Artist, Genre, Label, Playlist, SetList, SetListItem, Tag, Track, TrackInstance, Transition
 from catalog.models import Artist404, Genre404, Label404, Track404
 from catalog.models import ArtistBacklog, GenreBacklog, LabelBacklog, TrackBacklog
+from catalog.models import ArchivedPage, ProbedRange, ScrapeJob, UploadJob, Watermark
 # from catalog.models ArtistRequest, GenreRequest, TrackRequest
 
 
+@admin.action(description='Re-evaluate metadata completeness')
+def evaluate_metadata(modeladmin, request, queryset):
+    statuses = queryset.model.objects.evaluate_metadata(queryset)
+    modeladmin.message_user(request, str(len(statuses)) + ' objects evaluated.')
+
+
 @admin.register(Artist)
 class ArtistAdmin(admin.ModelAdmin):
-    list_display = ['name', 'public']
-    list_filter = ['public']
+    list_display = ['name', 'public', 'metadata_state']
+    list_filter = ['public', 'metadata_state']
+    actions = [evaluate_metadata]
 
 
 @admin.register(Artist404)
@@ -31,8 +39,9 @@ class ArtistBacklogAdmin(admin.ModelAdmin):
 
 @admin.register(Genre)
 class GenreAdmin(admin.ModelAdmin):
-    list_display = ['name', 'public']
-    list_filter = ['public']
+    list_display = ['name', 'public', 'metadata_state']
+    list_filter = ['public', 'metadata_state']
+    actions = [evaluate_metadata]
 
 
 @admin.register(Genre404)
@@ -55,8 +64,9 @@ class GenreBacklogAdmin(admin.ModelAdmin):
 
 @admin.register(Label)
 class LabelAdmin(admin.ModelAdmin):
-    list_display = ['name', 'public']
-    list_filter = ['public']
+    list_display = ['name', 'public', 'metadata_state']
+    list_filter = ['public', 'metadata_state']
+    actions = [evaluate_metadata]
 
 
 @admin.register(Label404)
@@ -88,6 +98,35 @@ class SetListItemInline(admin.TabularInline):
     extra = 1
 
 
+@admin.register(ArchivedPage)
+class ArchivedPageAdmin(admin.ModelAdmin):
+    list_display = ['object_type', 'external_id', 'content_hash', 'parsed_hash', 'datetime_fetched']
+    list_filter = ['object_type', 'datetime_fetched']
+
+
+@admin.register(ProbedRange)
+class ProbedRangeAdmin(admin.ModelAdmin):
+    list_display = ['object_type', 'start', 'end', 'datetime_probed']
+    list_filter = ['object_type', 'datetime_probed']
+
+
+@admin.register(ScrapeJob)
+class ScrapeJobAdmin(admin.ModelAdmin):
+    list_display = ['object_type', 'external_id', 'priority', 'status', 'attempts', 'next_attempt_at', 'lease_owner']
+    list_filter = ['object_type', 'status', 'priority']
+
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'user', 'status', 'processed', 'total', 'attempts', 'datetime_created', 'datetime_finished']
+    list_filter = ['kind', 'status', 'user']
+
+
+@admin.register(Watermark)
+class WatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'value', 'datetime_updated']
+
+
 @admin.register(SetList)
 class SetListAdmin(admin.ModelAdmin):
     list_display = ['user', 'name', 'date_played', 'public']
@@ -114,8 +153,9 @@ class TrackInstanceInline(admin.TabularInline):
 
 @admin.register(Track)
 class TrackAdmin(admin.ModelAdmin):
-    list_display = ['title', 'display_artist', 'genre', 'beatport_track_id', 'public']
-    list_filter = ['genre', 'artist', 'public']
+    list_display = ['title', 'display_artist', 'genre', 'beatport_track_id', 'public', 'metadata_state']
+    list_filter = ['genre', 'artist', 'public', 'metadata_state']
+    actions = [evaluate_metadata]
     inlines = [TrackInstanceInline]
 
 
@@ -0,0 +1,63 @@
+from catalog.extractors import extract_name, extract_track
+import gzip, hashlib, os, tempfile
+
+
+# content-addressed archive of fetched pages, stored gzipped under <root>/<hash[:2]>/<hash>.html.gz
+
+
+class PageArchive:
+
+    def __init__(self, root):
+        self.root = root
+
+    def get_hash(self, html):
+        return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+    def get_path(self, content_hash):
+        return os.path.join(self.root, content_hash[:2], content_hash + '.html.gz')
+
+    def put(self, html):
+        content_hash = self.get_hash(html)
+        path = self.get_path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as file:
+                    file.write(gzip.compress(html.encode('utf-8')))
+                os.replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        return content_hash
+
+    def get(self, content_hash):
+        with gzip.open(self.get_path(content_hash), 'rt', encoding='utf-8') as file:
+            return file.read()
+
+
+def get_page_archive():
+    from django.conf import settings
+    root = getattr(settings, 'PAGE_ARCHIVE_DIR', None)
+    if not root:
+        return None
+    return PageArchive(root)
+
+
+# re-parsing, kept free of database access so it can run in worker processes
+
+
+def extract_page(object_name, html, id):
+    if object_name == 'track':
+        return extract_track(html, id)
+    return extract_name(html, id)
+
+
+def extract_archived_page(task):
+    root, object_name, id, content_hash = task
+    try:
+        html = PageArchive(root).get(content_hash)
+        return object_name, id, content_hash, extract_page(object_name, html, id), None
+    except Exception as e:
+        return object_name, id, content_hash, None, str(e)
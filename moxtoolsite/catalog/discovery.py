@@ -0,0 +1,228 @@
+from bisect import bisect_left, bisect_right
+from catalog.models import ProbedRange
+from django.db.models import Max
+import heapq, os, random, threading, time
+
+
+# interval set of known ids, sampled in O(log n) with a prefix sum of interval lengths
+
+
+class IntervalSet:
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.prefix = None
+
+    @classmethod
+    def from_sorted_ids(cls, ids):
+        interval_set = cls()
+        for id in ids:
+            if len(interval_set.ends) > 0 and id <= interval_set.ends[-1] + 1:
+                if id > interval_set.ends[-1]:
+                    interval_set.ends[-1] = id
+            else:
+                interval_set.starts.append(id)
+                interval_set.ends.append(id)
+        return interval_set
+
+    def __contains__(self, id):
+        i = bisect_right(self.starts, id) - 1
+        return i >= 0 and self.ends[i] >= id
+
+    def __len__(self):
+        return self.get_prefix()[-1]
+
+    def add(self, id):
+        self.add_range(id, id)
+
+    def add_range(self, start, end):
+        i = bisect_left(self.ends, start - 1)
+        j = bisect_right(self.starts, end + 1)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j-1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+        self.prefix = None
+
+    def add_ids(self, ids):
+        self.add_ranges((id, id) for id in sorted(ids))
+
+    def add_ranges(self, ranges):
+        # one linear merge of ranges sorted by start, rather than a list splice per range
+        starts = []
+        ends = []
+        for start, end in heapq.merge(zip(self.starts, self.ends), ranges):
+            if len(ends) > 0 and start <= ends[-1] + 1:
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.starts = starts
+        self.ends = ends
+        self.prefix = None
+
+    def get_prefix(self):
+        if self.prefix is None:
+            prefix = [0]
+            for start, end in zip(self.starts, self.ends):
+                prefix.append(prefix[-1] + end - start + 1)
+            self.prefix = prefix
+        return self.prefix
+
+    def count_covered_upto(self, id):
+        i = bisect_right(self.starts, id)
+        if i == 0:
+            return 0
+        return self.get_prefix()[i-1] + min(self.ends[i-1], id) - self.starts[i-1] + 1
+
+    def count_unseen(self, low, high):
+        if high < low:
+            return 0
+        return (high - low + 1) - (self.count_covered_upto(high) - self.count_covered_upto(low - 1))
+
+    def nth_unseen(self, low, n):
+        i = bisect_right(self.starts, low) - 1
+        if i >= 0 and self.ends[i] >= low:
+            low = self.ends[i] + 1
+        prefix = self.get_prefix()
+        base = self.count_covered_upto(low - 1)
+
+        # largest interval above low with at most n unseen ids before it
+        lo = bisect_left(self.starts, low)
+        hi = len(self.starts) - 1
+        found = None
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            unseen_before = (self.starts[mid] - low) - (prefix[mid] - base)
+            if unseen_before <= n:
+                found = (mid, unseen_before)
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        if found is None:
+            return low + n
+        k, unseen_before = found
+        return self.ends[k] + 1 + n - unseen_before
+
+    def sample(self, low, high, rng=random):
+        unseen = self.count_unseen(low, high)
+        if unseen <= 0:
+            return None
+        return self.nth_unseen(low, rng.randrange(unseen))
+
+
+# discovery engine
+
+
+STRATEGIES = {
+    'recent': 0.5,
+    'dense': 0.3,
+    'uniform': 0.2,
+}
+
+
+class DiscoveryEngine:
+    default_max_ids = {
+        'artist': 1000000,
+        'genre': 100,
+        'label': 100000,
+        'track': 20000000,
+    }
+    bucket_size = 100000
+    max_redraws = 8
+
+    def __init__(self, object_name, lookup):
+        self.object_name = object_name
+        self.lookup = lookup
+        self.recent_window = int(os.environ.get('MD_DISCOVERY_RECENT_WINDOW', 100000))
+        self.ttl = float(os.environ.get('MD_DISCOVERY_TTL', 3600))
+        self.lock = threading.Lock()
+        self.sampled = set()
+        self.load()
+
+    def get_sorted_ids(self, model):
+        queryset = model.objects.filter(**{self.lookup['id']+'__isnull': False}).order_by(self.lookup['id'])
+        return queryset.values_list(self.lookup['id'], flat=True).iterator(chunk_size=10000)
+
+    def load(self):
+        known = IntervalSet.from_sorted_ids(heapq.merge(
+            self.get_sorted_ids(self.lookup['model']),
+            self.get_sorted_ids(self.lookup['404']),
+            self.get_sorted_ids(self.lookup['backlog']),
+        ))
+        known.add_ranges(ProbedRange.objects.get_ranges(self.object_name).iterator(chunk_size=10000))
+        known.add_ids(self.sampled)
+        self.sampled = set()
+        max_id = self.lookup['model'].objects.aggregate(max_id=Max(self.lookup['id']))['max_id']
+        if max_id is None:
+            max_id = self.default_max_ids[self.object_name]
+        self.known = known
+        self.max_id = max_id
+        self.loaded_at = time.monotonic()
+
+    def sample_uniform(self):
+        return self.known.sample(1, self.max_id)
+
+    def sample_recent(self):
+        return self.known.sample(max(1, self.max_id - self.recent_window), self.max_id + self.recent_window // 10)
+
+    def sample_dense(self):
+        buckets = []
+        weights = []
+        for low in range(1, self.max_id + 1, self.bucket_size):
+            high = min(low + self.bucket_size - 1, self.max_id)
+            unseen = self.known.count_unseen(low, high)
+            if unseen > 0:
+                buckets.append((low, high))
+                weights.append(high - low + 2 - unseen)
+        if len(buckets) == 0:
+            return None
+        low, high = random.choices(buckets, weights=weights)[0]
+        return self.known.sample(low, high)
+
+    def draw(self, strategy):
+        id = getattr(self, 'sample_'+strategy)()
+        if id is None and strategy != 'uniform':
+            id = self.sample_uniform()
+        return id
+
+    def merge_sampled(self):
+        self.known.add_ids(self.sampled)
+        self.sampled = set()
+
+    def sample(self, strategy=None):
+        if strategy is None:
+            strategy = os.environ.get('MD_DISCOVERY_STRATEGY')
+        if strategy is None:
+            strategy = random.choices(list(STRATEGIES), weights=list(STRATEGIES.values()))[0]
+        if strategy not in STRATEGIES:
+            raise LookupError('Error: unsupported discovery strategy ' + str(strategy))
+        with self.lock:
+            if time.monotonic() - self.loaded_at > self.ttl:
+                self.load()
+
+            # sampled ids go to a side set so the interval prefix survives between draws
+            for _ in range(self.max_redraws):
+                id = self.draw(strategy)
+                if id not in self.sampled:
+                    break
+            else:
+                self.merge_sampled()
+                id = self.draw(strategy)
+            if id is not None:
+                self.sampled.add(id)
+            return id
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_discovery_engine(object_name, lookup):
+    with _engines_lock:
+        if object_name not in _engines:
+            _engines[object_name] = DiscoveryEngine(object_name, lookup)
+        return _engines[object_name]
@@ -0,0 +1,147 @@
+from catalog.models import Playlist, SetListItem, TrackInstance
+import csv, json, re
+
+
+# streaming library exports, yielding text as rows are read so memory stays flat
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'm3u': 'audio/x-mpegurl',
+}
+EXPORT_OBJECTS = ['trackinstance', 'playlist', 'setlist']
+EXPORT_CHUNK_SIZE = 2000
+TRACK_COLUMNS = ['beatport_track_id', 'title', 'mix', 'artist', 'remix_artist', 'genre', 'label', 'bpm', 'key', 'length', 'released']
+TRACK_RELATED = ['track', 'track__genre', 'track__label']
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+def get_track_row(track):
+    if track is None:
+        return {column: None for column in TRACK_COLUMNS}
+    return {
+        'beatport_track_id': track.beatport_track_id,
+        'title': track.title,
+        'mix': track.mix,
+        'artist': track.artist_display,
+        'remix_artist': track.remix_artist_display,
+        'genre': track.genre.name if track.genre is not None else None,
+        'label': track.label.name if track.label is not None else None,
+        'bpm': track.bpm,
+        'key': track.key,
+        'length': track.length,
+        'released': track.released,
+    }
+
+
+def iter_trackinstance_rows(user):
+    trackinstances = TrackInstance.objects.filter(user=user).select_related(*TRACK_RELATED).prefetch_related('tag').order_by('track_id', 'id')
+    for trackinstance in trackinstances.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = get_track_row(trackinstance.track)
+        row['rating'] = trackinstance.rating
+        row['play_count'] = trackinstance.play_count
+        row['date_added'] = trackinstance.date_added
+        row['tags'] = '; '.join(tag.value for tag in trackinstance.tag.all())
+        row['comments'] = trackinstance.comments
+        yield row
+
+
+def iter_playlist_rows(user):
+    items = Playlist.track.through.objects.filter(playlist__user=user).select_related('playlist', *TRACK_RELATED).order_by('playlist_id', 'id')
+    for item in items.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = {
+            'playlist': item.playlist.name,
+        }
+        row.update(get_track_row(item.track))
+        yield row
+
+
+def iter_setlist_rows(user):
+    items = SetListItem.objects.filter(setlist__user=user).select_related('setlist', *TRACK_RELATED).order_by('setlist__date_played', 'setlist_id', 'start_time')
+    for item in items.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = {
+            'setlist': item.setlist.name,
+            'date_played': item.setlist.date_played,
+            'start_time': item.start_time,
+        }
+        row.update(get_track_row(item.track))
+        yield row
+
+
+def get_export_columns(obj_name):
+    if obj_name == 'trackinstance':
+        return TRACK_COLUMNS + ['rating', 'play_count', 'date_added', 'tags', 'comments']
+    elif obj_name == 'playlist':
+        return ['playlist'] + TRACK_COLUMNS
+    elif obj_name == 'setlist':
+        return ['setlist', 'date_played', 'start_time'] + TRACK_COLUMNS
+    else:
+        raise LookupError('Error: unsupported export object ' + str(obj_name))
+
+
+def iter_export_rows(user, obj_name):
+    if obj_name == 'trackinstance':
+        return iter_trackinstance_rows(user)
+    elif obj_name == 'playlist':
+        return iter_playlist_rows(user)
+    elif obj_name == 'setlist':
+        return iter_setlist_rows(user)
+    else:
+        raise LookupError('Error: unsupported export object ' + str(obj_name))
+
+
+def get_length_seconds(length):
+    match = re.match(r'^(\d+):(\d{2})$', length or '')
+    if match is None:
+        return -1
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def get_m3u_lines(obj_name, row, group):
+    lines = []
+    if obj_name != 'trackinstance' and row[obj_name] != group:
+        lines.append('#EXTGRP:' + row[obj_name] + '\n')
+    if row['beatport_track_id'] is None and row['title'] is None:
+        lines.append('# no track for this item\n')
+        return ''.join(lines)
+    title = row['title'] or str(row['beatport_track_id'])
+    if row['mix']:
+        title += ' (' + row['mix'] + ')'
+    if row['artist']:
+        title = row['artist'] + ' - ' + title
+    lines.append('#EXTINF:' + str(get_length_seconds(row['length'])) + ',' + title + '\n')
+    if row['beatport_track_id'] is not None:
+        slug = re.sub(r'[^a-z0-9]+', '-', (row['title'] or 'track').lower()).strip('-')
+        lines.append('https://www.beatport.com/track/' + slug + '/' + str(row['beatport_track_id']) + '\n')
+    else:
+        lines.append('# no Beatport ID for this track\n')
+    return ''.join(lines)
+
+
+def stream_export(user, obj_name, export_format):
+    columns = get_export_columns(obj_name)
+    if export_format not in EXPORT_FORMATS:
+        raise LookupError('Error: unsupported export format ' + str(export_format))
+
+    # the header goes out before the query runs
+    writer = csv.writer(Echo())
+    if export_format == 'csv':
+        yield writer.writerow(columns)
+    elif export_format == 'm3u':
+        yield '#EXTM3U\n'
+    group = None
+    for row in iter_export_rows(user, obj_name):
+        if export_format == 'csv':
+            yield writer.writerow([row[column] for column in columns])
+        elif export_format == 'jsonl':
+            yield json.dumps(row, default=str) + '\n'
+        else:
+            yield get_m3u_lines(obj_name, row, group)
+            if obj_name != 'trackinstance':
+                group = row[obj_name]
@@ -0,0 +1,136 @@
+from bs4 import BeautifulSoup, SoupStrainer
+import json, re
+
+
+# page extractors, returning the data dicts object_model_data_checker expects
+
+
+NEXT_DATA_PATTERN = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+TRACK_CLASSES = ['Typography-style__HeadingH1', 'TrackMeta-style__MetaItem', 'Artists-styles__Items']
+
+
+def has_class_prefix(prefixes):
+    def match(value):
+        return value is not None and any(value.startswith(prefix) for prefix in prefixes)
+    return match
+
+
+TRACK_STRAINER = SoupStrainer(['h1', 'div'], class_=has_class_prefix(TRACK_CLASSES))
+NAME_STRAINER = SoupStrainer('h1')
+
+
+def get_next_data(html):
+    match = NEXT_DATA_PATTERN.search(html)
+    if match is None:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+def find_payload(data, id, keys):
+    stack = [data]
+    while len(stack) > 0:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get('id') == id and all(key in node for key in keys):
+                return node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+def get_link(item):
+    return {
+        'id': item['id'],
+        'text': item['slug'],
+    }
+
+
+def get_href_link(href):
+    parts = href.split('/')
+    return {
+        'id': int(parts[-1].strip()),
+        'text': parts[-2].strip(),
+    }
+
+
+# track pages
+
+
+def extract_track_json(html, id):
+    payload = find_payload(get_next_data(html), id, ['name', 'mix_name', 'artists'])
+    if payload is None:
+        return None
+    label = payload.get('label') or (payload.get('release') or {}).get('label')
+    length = payload.get('length')
+    if length is None and payload.get('length_ms') is not None:
+        seconds = payload['length_ms'] // 1000
+        length = str(seconds // 60) + ':' + str(seconds % 60).zfill(2)
+    key = payload['key'].get('name') if isinstance(payload.get('key'), dict) else payload.get('key')
+    released = payload.get('publish_date') or payload.get('new_release_date')
+
+    # an incomplete payload falls back to the html of the same page rather than a refetch
+    if None in [payload.get('genre'), label, payload.get('bpm'), key, released, length]:
+        return None
+    return {
+        'title': payload['name'],
+        'mix': payload['mix_name'],
+        'artists': [get_link(artist) for artist in payload['artists']],
+        'remix_artists': [get_link(remixer) for remixer in payload.get('remixers', [])],
+        'genre': get_link(payload['genre']),
+        'label': get_link(label),
+        'key': key,
+        'bpm': str(payload['bpm']),
+        'released': released,
+        'length': length,
+    }
+
+
+def parse_track_soup(soup):
+    data = {}
+    title_line = soup.find('h1', {'class': has_class_prefix(['Typography-style__HeadingH1'])})
+    data['title'] = title_line.find(string=True, recursive=False).strip()
+    data['mix'] = title_line.find('span').get_text().strip()
+    data['artists'] = []
+    data['remix_artists'] = []
+    for item in soup.find_all('div', {'class': has_class_prefix(['TrackMeta-style__MetaItem'])}):
+        field = item.find('div', attrs={'class': None}).get_text().replace(':', '').lower()
+        if field not in data:
+            link = item.find('a', href=True)
+            if link:
+                data[field] = get_href_link(link['href'])
+            else:
+                data[field] = item.find('span', attrs={'class': None}).get_text().strip()
+    for section in soup.find_all('div', {'class': has_class_prefix(['Artists-styles__Items'])}):
+        remix = 'remix' in str(section).lower()
+        for artist_line in section.find_all('a', href=True):
+            if remix:
+                data['remix_artists'].append(get_href_link(artist_line['href']))
+            else:
+                data['artists'].append(get_href_link(artist_line['href']))
+    return data
+
+
+def extract_track(html, id):
+    data = extract_track_json(html, id)
+    if data is None:
+        data = parse_track_soup(BeautifulSoup(html, 'html.parser', parse_only=TRACK_STRAINER))
+    return data
+
+
+# artist, genre and label pages
+
+
+def extract_name(html, id):
+    payload = find_payload(get_next_data(html), id, ['name', 'slug'])
+    if payload is not None:
+        return {
+            'name': payload['name'],
+        }
+    title_line = BeautifulSoup(html, 'html.parser', parse_only=NAME_STRAINER).find('h1')
+    return {
+        'name': title_line.text,
+    }
@@ -0,0 +1,141 @@
+from requests.adapters import HTTPAdapter
+from requests.exceptions import HTTPError
+from urllib.parse import urlparse
+import asyncio, os, random, requests, threading
+
+
+# url utils
+
+
+def convert_url(url, s=True):
+    clean_url = url
+    if url.startswith('http://') and s == True:
+        clean_url = 'https://' + url.replace('http://', '', 1)
+    elif url.startswith('https://') and s == False:
+        clean_url = 'http://' + url.replace('https://', '', 1)
+    return clean_url
+
+
+# fetcher backends
+
+
+class Fetcher:
+    rate_limited = True
+    pool_size = 10
+    timeout = 15
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def get_session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self.local.session = session
+        return session
+
+    def fetch(self, url):
+        response = self.get(url)
+        response.raise_for_status()
+        return response.text
+
+    # thread offload for async callers, not async I/O: each fetch blocks a thread of the default
+    # executor, and those threads keep their own session and connection pool between calls
+
+    async def fetch_in_thread(self, url):
+        return await asyncio.to_thread(self.fetch, url)
+
+    async def fetch_many_in_threads(self, urls, concurrency=10):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded_fetch(url):
+            async with semaphore:
+                return await self.fetch_in_thread(url)
+
+        return await asyncio.gather(*[bounded_fetch(url) for url in urls], return_exceptions=True)
+
+
+class ProxyFetcher(Fetcher):
+
+    def __init__(self):
+        super().__init__()
+        self.user_agents = os.environ.get('MY_USER_AGENT_LIST').split('&')
+        self.proxies = os.environ.get('MY_PROXY_LIST').split(',')
+        self.proxy_creds = os.environ.get('MY_PROXY_CREDS')
+
+    def get(self, url):
+        proxy = 'http://' + self.proxy_creds + '@' + random.choice(self.proxies)
+        return self.get_session().get(
+            convert_url(url, False),
+            proxies = {'http': proxy},
+            headers = {'User-Agent': random.choice(self.user_agents)},
+            timeout = self.timeout,
+        )
+
+
+class ScrapingBeeFetcher(Fetcher):
+    api_url = 'https://app.scrapingbee.com/api/v1/'
+    timeout = 60
+
+    def __init__(self):
+        super().__init__()
+        self.api_key = os.environ.get('BEE_KEY')
+
+    def get(self, url):
+        return self.get_session().get(
+            self.api_url,
+            params={
+                'api_key': self.api_key,
+                'url': convert_url(url, True),
+                # 'render_js': 'true',
+                # 'premium_proxy': 'true',
+                # 'country_code': 'US',
+            },
+            timeout=self.timeout,
+        )
+
+
+class FileFetcher(Fetcher):
+    rate_limited = False
+
+    def __init__(self, root=None):
+        super().__init__()
+        if root is None:
+            root = os.environ.get('MD_FIXTURE_DIR', os.path.join(os.path.dirname(__file__), 'tests', 'fixtures'))
+        self.root = root
+
+    def get_path(self, url):
+        parts = [part for part in urlparse(url).path.split('/') if part]
+        if len(parts) == 0:
+            return os.path.join(self.root, 'index.html')
+        return os.path.join(self.root, parts[0], parts[-1] + '.html')
+
+    def fetch(self, url):
+        path = self.get_path(url)
+        if not os.path.exists(path):
+            raise HTTPError('404 Client Error: Not Found for url: ' + url)
+        with open(path, encoding='utf-8') as file:
+            return file.read()
+
+
+FETCHERS = {
+    'PROXY': ProxyFetcher,
+    'BEE': ScrapingBeeFetcher,
+    'FILE': FileFetcher,
+}
+_fetchers = {}
+_fetchers_lock = threading.Lock()
+
+
+def get_fetcher(method=None):
+    if method is None:
+        method = os.environ.get('MD_METHOD')
+    if method not in FETCHERS:
+        raise LookupError('Error: unselected or unsupoorted web scraping method')
+    with _fetchers_lock:
+        if method not in _fetchers:
+            _fetchers[method] = FETCHERS[method]()
+        return _fetchers[method]
@@ -1,9 +1,11 @@
-from catalog.models import Artist, Genre, Label, Playlist, Track, TrackInstance
-from catalog.models import Artist404, Genre404, Label404, Track404
-from catalog.models import ArtistBacklog, GenreBacklog, LabelBacklog, TrackBacklog
+from catalog.models import Artist, Genre, Playlist, Track, TrackInstance
+from catalog.models import TrackBacklog, ScrapeJob, UserVisibility
+from catalog.visibility import invalidate_visibility
 from django import forms
 from django.apps import apps
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import datetime
 
@@ -378,6 +380,7 @@ class TrackInstanceForm(forms.Form, ObjectFormMixin):
 
 
 class BulkUploadForm(forms.Form):
+    CHUNK_SIZE = 5000
     OBJECTS = [
         ('artist', 'Artist'),
         ('genre', 'Genre'),
@@ -409,33 +412,79 @@ class BulkUploadForm(forms.Form):
             raise ValidationError('ID list required')
         return cleaned_data
 
-    def save(self, user=None):
+    def save(self, user=None, progress=None):
         obj_name = self.cleaned_data.get('object_name')
-        for id in self.cleaned_data.get('beatport_id_list'):
-            if obj_name == 'artist':
-                if Artist.objects.filter(beatport_artist_id=id).count() == 0 and Artist404.objects.filter(beatport_artist_id=id).count() == 0 and ArtistBacklog.objects.filter(beatport_artist_id=id).count() == 0:
-                    ArtistBacklog.objects.create(beatport_artist_id=id, datetime_discovered=datetime.datetime.now())
-            elif obj_name == 'genre':
-                if Genre.objects.filter(beatport_genre_id=id).count() == 0 and Genre404.objects.filter(beatport_genre_id=id).count() == 0 and GenreBacklog.objects.filter(beatport_genre_id=id).count() == 0:
-                    GenreBacklog.objects.create(beatport_genre_id=id, datetime_discovered=datetime.datetime.now())
-            elif obj_name == 'label':
-                if Label.objects.filter(beatport_label_id=id).count() == 0 and Label404.objects.filter(beatport_label_id=id).count() == 0 and LabelBacklog.objects.filter(beatport_label_id=id).count() == 0:
-                    LabelBacklog.objects.create(beatport_label_id=id, datetime_discovered=datetime.datetime.now())
-            elif obj_name == 'track':
-                if Track.objects.filter(beatport_track_id=id).count() > 0 and user is not None:
-                    track = Track.objects.get(beatport_track_id=id)
-                    trackinstance, created = TrackInstance.objects.get_or_create(track=track, user=user)
-                    if created:
-                        print(str(trackinstance) + ' added for ' + str(user))
-                elif Track.objects.filter(beatport_track_id=id).count() == 0 and Track404.objects.filter(beatport_track_id=id).count() == 0:
-                    track, created = TrackBacklog.objects.get_or_create(beatport_track_id=id, defaults={'datetime_discovered':datetime.datetime.now()})
-                    if user and track:
-                        track.users.add(user)
-            else:
-                raise ValidationError('Invalid object type processed')
+        if obj_name not in ['artist', 'genre', 'label', 'track']:
+            raise ValidationError('Invalid object type processed')
+        model = apps.get_model('catalog', obj_name.title())
+        model404 = apps.get_model('catalog', obj_name.title()+'404')
+        backlog = apps.get_model('catalog', obj_name.title()+'Backlog')
+        id_field = 'beatport_'+obj_name+'_id'
+        id_list = list(dict.fromkeys(self.cleaned_data.get('beatport_id_list')))
+        now = timezone.now()
+
+        # each chunk commits on its own so progress is visible while the upload runs
+        for i in range(0, len(id_list), self.CHUNK_SIZE):
+            ids = id_list[i:i+self.CHUNK_SIZE]
+            with transaction.atomic():
+
+                # classify the ids with one query per table
+                known = dict(model.objects.filter(**{id_field+'__in': ids}).values_list(id_field, 'id'))
+                bad = set(model404.objects.filter(**{id_field+'__in': ids}).values_list(id_field, flat=True))
+                new_ids = [id for id in ids if id not in known and id not in bad]
+
+                # queue unknown ids on the backlog
+                backlog.objects.bulk_create(
+                    [backlog(**{id_field: id, 'datetime_discovered': now}) for id in new_ids],
+                    batch_size=1000,
+                    ignore_conflicts=True,
+                )
+                ScrapeJob.objects.enqueue(obj_name, new_ids, ScrapeJob.PRIORITY_USER)
+
+                # add known tracks to the library and remember who is waiting on the rest
+                if obj_name == 'track' and user is not None:
+                    TrackInstance.objects.bulk_create(
+                        [TrackInstance(track_id=track_id, user=user) for track_id in known.values()],
+                        batch_size=1000,
+                        ignore_conflicts=True,
+                    )
+                    if len(known) > 0:
+                        print(str(len(known)) + ' known tracks added to the library of ' + str(user))
+                    backlog_ids = TrackBacklog.objects.filter(**{id_field+'__in': new_ids}).values_list('id', flat=True)
+                    TrackBacklog.users.through.objects.bulk_create(
+                        [TrackBacklog.users.through(trackbacklog_id=backlog_id, user_id=user.id) for backlog_id in backlog_ids],
+                        batch_size=1000,
+                        ignore_conflicts=True,
+                    )
+
+            if progress is not None:
+                progress(min(i + self.CHUNK_SIZE, len(id_list)), len(id_list))
+
+        # bulk writes skip signals, so refresh the library visibility directly
+        if obj_name == 'track' and user is not None:
+            UserVisibility.objects.sync([user.id])
+            invalidate_visibility(user.id)
         return True
     
 
+class LibraryImportForm(forms.Form):
+    FORMATS = [
+        ('', 'Detect from file'),
+        ('rekordbox', 'Rekordbox XML'),
+        ('traktor', 'Traktor NML'),
+    ]
+    library_file = forms.FileField(
+        label='Collection File',
+        help_text="Upload a Rekordbox XML export or a Traktor collection.nml file.",
+        required=True,
+    )
+    import_format = forms.ChoiceField(
+        label='Format',
+        choices=FORMATS,
+        required=False,
+    )
+
+
 class PlaylistForm(forms.Form):
     name = forms.CharField()
     track = forms.ModelMultipleChoiceField(
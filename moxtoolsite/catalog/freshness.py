@@ -0,0 +1,96 @@
+from catalog.models import ScrapeJob, Track, TrackInstance
+from catalog.utils import object_lookup
+from django.db.models import Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+import datetime, os
+
+
+# hourly refresh budgets and the age after which complete metadata is considered stale
+
+
+REFRESH_BUDGETS = {
+    'artist': 200,
+    'genre': 5,
+    'label': 100,
+    'track': 500,
+}
+REFRESH_MAX_AGE_DAYS = {
+    'artist': 30,
+    'genre': 90,
+    'label': 30,
+    'track': 60,
+}
+CANDIDATE_FACTOR = 20
+
+
+def get_refresh_budget(object_name, now=None):
+    if now is None:
+        now = timezone.now()
+    budget = int(os.environ.get('MD_REFRESH_BUDGET_' + object_name.upper(), REFRESH_BUDGETS[object_name]))
+
+    # outstanding refresh jobs and those run within the hour both count against the budget
+    used = ScrapeJob.objects.filter(object_type=object_name, priority=ScrapeJob.PRIORITY_REFRESH).filter(
+        Q(status__in=['queued', 'leased']) | Q(datetime_updated__gte=now - datetime.timedelta(hours=1))
+    ).count()
+    return max(budget - used, 0)
+
+
+def get_popularity(object_name):
+    if object_name == 'track':
+        related = [TrackInstance.objects.filter(track_id=OuterRef('pk')).values('track_id')]
+    elif object_name == 'artist':
+        related = [
+            Track.artist.through.objects.filter(artist_id=OuterRef('pk')).values('artist_id'),
+            Track.remix_artist.through.objects.filter(artist_id=OuterRef('pk')).values('artist_id'),
+        ]
+    else:
+        related = [Track.objects.filter(**{object_name+'_id': OuterRef('pk')}).values(object_name+'_id')]
+    counts = [Coalesce(Subquery(rows.annotate(count=Count('id')).values('count').order_by()), 0) for rows in related]
+    popularity = counts[0]
+    for count in counts[1:]:
+        popularity = popularity + count
+    return popularity
+
+
+def get_stale_candidates(object_name, limit, now=None):
+    if now is None:
+        now = timezone.now()
+    lookup = object_lookup(object_name)
+    cutoff = now - datetime.timedelta(days=REFRESH_MAX_AGE_DAYS[object_name])
+    queued = ScrapeJob.objects.filter(object_type=object_name, status__in=['queued', 'leased']).values('external_id')
+    stale = lookup['model'].objects.filter(metadata_state='complete').exclude(**{lookup['id']+'__in': queued})
+
+    # never scraped rows first, then the oldest, both served by the metadata_state, last_scraped_at index
+    candidates = list(stale.filter(last_scraped_at__isnull=True).order_by('id').values_list('id', flat=True)[:limit])
+    if len(candidates) < limit:
+        candidates += list(stale.filter(last_scraped_at__lt=cutoff).order_by('last_scraped_at', 'id').values_list('id', flat=True)[:limit - len(candidates)])
+    return candidates
+
+
+def get_stale_ids(object_name, limit, now=None):
+    if now is None:
+        now = timezone.now()
+    if limit <= 0:
+        return []
+    lookup = object_lookup(object_name)
+    max_age = datetime.timedelta(days=REFRESH_MAX_AGE_DAYS[object_name])
+
+    # score a bounded window of the oldest rows by age weighted by popularity, never scraped rows counting as twice the maximum age
+    candidates = lookup['model'].objects.filter(id__in=get_stale_candidates(object_name, limit * CANDIDATE_FACTOR, now))
+    age = Coalesce(Value(now) - F('last_scraped_at'), Value(max_age * 2), output_field=DurationField())
+    candidates = candidates.annotate(score=ExpressionWrapper(age * (get_popularity(object_name) + 1), output_field=DurationField()))
+    return list(candidates.order_by('-score', 'id').values_list(lookup['id'], flat=True)[:limit])
+
+
+def schedule_refresh(object_types=None, now=None):
+    if now is None:
+        now = timezone.now()
+    if object_types is None:
+        object_types = ['artist', 'genre', 'label', 'track']
+    scheduled = {}
+    for object_name in object_types:
+        ids = get_stale_ids(object_name, get_refresh_budget(object_name, now), now)
+        ScrapeJob.objects.enqueue(object_name, ids, ScrapeJob.PRIORITY_REFRESH)
+        scheduled[object_name] = len(ids)
+    return scheduled
@@ -0,0 +1,417 @@
+from catalog.models import Playlist, ScrapeJob, Tag, Track, Track404, TrackBacklog, TrackInstance, UserVisibility
+from catalog.visibility import invalidate_visibility
+from difflib import SequenceMatcher
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from urllib.parse import unquote
+import datetime, os, re, unicodedata
+import xml.etree.ElementTree as ElementTree
+
+
+# streaming Rekordbox XML and Traktor NML imports, parsed element by element so memory stays flat
+
+
+IMPORT_FORMATS = ['rekordbox', 'traktor']
+IMPORT_CHUNK_SIZE = 2000
+FUZZY_THRESHOLD = 0.85
+BEATPORT_PATTERNS = [
+    re.compile(r'beatport\.com/track/[^/\s]+/(\d+)'),
+    re.compile(r'(?:^|/)(\d{5,9})_[^/]*$'),
+]
+MY_TAG_PATTERN = re.compile(r'/\*(.*?)\*/')
+MIX_PATTERN = re.compile(r'^(.*?)\s*\(([^()]*)\)\s*$')
+ROOT_NODES = ['ROOT', '$ROOT']
+
+
+def detect_format(path):
+    with open(path, 'rb') as file:
+        head = file.read(4096).decode('utf-8', errors='ignore')
+    if '<DJ_PLAYLISTS' in head:
+        return 'rekordbox'
+    elif '<NML' in head:
+        return 'traktor'
+    raise ValueError('Error: ' + str(path) + ' is neither a Rekordbox XML nor a Traktor NML file')
+
+
+def normalize(value):
+    value = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', value.lower()).split())
+
+
+def split_mix(title, mix):
+    match = MIX_PATTERN.match(title or '')
+    if match is not None and not mix:
+        return match.group(1), match.group(2)
+    return title or '', mix or ''
+
+
+def get_beatport_track_id(*values):
+    for value in values:
+        for pattern in BEATPORT_PATTERNS:
+            match = pattern.search(value or '')
+            if match is not None:
+                return int(match.group(1))
+    return None
+
+
+def get_rating(value):
+    try:
+        stars = round(int(value) / 51)
+    except (TypeError, ValueError):
+        return None
+    if stars <= 0:
+        return None
+    return str(min(stars, 5) * 2)
+
+
+def get_date(value, date_format):
+    try:
+        return datetime.datetime.strptime(value, date_format).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def get_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def get_my_tags(comments):
+    tags = []
+    for match in MY_TAG_PATTERN.finditer(comments or ''):
+        tags.extend(value.strip() for value in match.group(1).split('/') if value.strip())
+    return tags
+
+
+def get_row(key, title, mix, artist, location, comments, rating, play_count, date_added):
+    title, mix = split_mix(title, mix)
+    return {
+        'key': key,
+        'title': title,
+        'mix': mix,
+        'artist': artist or '',
+        'beatport_track_id': get_beatport_track_id(comments, location),
+        'comments': comments or None,
+        'rating': rating,
+        'play_count': play_count,
+        'date_added': date_added,
+        'tags': get_my_tags(comments),
+    }
+
+
+# parsers, yielding ('total', count), ('track', row) and ('playlist', name, folder, keys)
+
+
+def release(element, stack):
+    element.clear()
+    if len(stack) > 0:
+        stack[-1].remove(element)
+
+
+def iter_rekordbox(source):
+    stack = []
+    folders = []
+    keys = None
+    for event, element in ElementTree.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if element.tag == 'COLLECTION':
+                yield ('total', get_int(element.get('Entries')))
+            elif element.tag == 'NODE':
+                if element.get('Type') == '1':
+                    keys = []
+                else:
+                    folders.append(element.get('Name'))
+            stack.append(element)
+            continue
+        stack.pop()
+        parent = stack[-1].tag if len(stack) > 0 else None
+        if element.tag == 'TRACK' and parent == 'COLLECTION':
+            location = unquote(element.get('Location') or '')
+            yield ('track', get_row(
+                element.get('TrackID'),
+                element.get('Name'),
+                element.get('Mix'),
+                element.get('Artist'),
+                location,
+                element.get('Comments'),
+                get_rating(element.get('Rating')),
+                get_int(element.get('PlayCount')),
+                get_date(element.get('DateAdded'), '%Y-%m-%d'),
+            ))
+            release(element, stack)
+        elif element.tag == 'TRACK' and parent == 'NODE':
+            if keys is not None:
+                keys.append(element.get('Key'))
+            release(element, stack)
+        elif element.tag == 'NODE':
+            if element.get('Type') == '1':
+                yield ('playlist', element.get('Name'), get_folder(folders), keys)
+                keys = None
+            else:
+                folders.pop()
+            release(element, stack)
+
+
+def get_traktor_key(location):
+    if location is None:
+        return None
+    return (location.get('VOLUME') or '') + (location.get('DIR') or '') + (location.get('FILE') or '')
+
+
+def iter_traktor(source):
+    stack = []
+    folders = []
+    keys = None
+    for event, element in ElementTree.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if element.tag == 'COLLECTION':
+                yield ('total', get_int(element.get('ENTRIES')))
+            elif element.tag == 'NODE':
+                if element.get('TYPE') == 'PLAYLIST':
+                    keys = []
+                else:
+                    folders.append(element.get('NAME'))
+            stack.append(element)
+            continue
+        stack.pop()
+        parent = stack[-1].tag if len(stack) > 0 else None
+        if element.tag == 'ENTRY' and parent == 'COLLECTION':
+            location = element.find('LOCATION')
+            info = element.find('INFO')
+            info = info if info is not None else {}
+            key = get_traktor_key(location)
+            yield ('track', get_row(
+                key,
+                element.get('TITLE'),
+                info.get('MIX'),
+                element.get('ARTIST'),
+                (key or '').replace('/:', '/'),
+                info.get('COMMENT'),
+                get_rating(info.get('RANKING')),
+                get_int(info.get('PLAYCOUNT')),
+                get_date(info.get('IMPORT_DATE'), '%Y/%m/%d'),
+            ))
+            release(element, stack)
+        elif element.tag == 'PRIMARYKEY':
+            if keys is not None:
+                keys.append(element.get('KEY'))
+        elif element.tag == 'ENTRY' and parent == 'PLAYLIST':
+            release(element, stack)
+        elif element.tag == 'NODE':
+            if element.get('TYPE') == 'PLAYLIST':
+                yield ('playlist', element.get('NAME'), get_folder(folders), keys)
+                keys = None
+            else:
+                folders.pop()
+            release(element, stack)
+
+
+def get_folder(folders):
+    names = [name for name in folders if name and name not in ROOT_NODES]
+    return ' / '.join(names) if len(names) > 0 else None
+
+
+PARSERS = {
+    'rekordbox': iter_rekordbox,
+    'traktor': iter_traktor,
+}
+
+
+# matching
+
+
+def get_fuzzy_matches(rows):
+    titles = set(normalize(row['title']) for row in rows)
+    lowered = set(row['title'].lower() for row in rows)
+    candidates = {}
+    queryset = Track.objects.annotate(title_lower=Lower('title')).filter(title_lower__in=lowered)
+    for track_id, title, mix, artist_display in queryset.values_list('id', 'title', 'mix', 'artist_display'):
+        if normalize(title) in titles:
+            candidates.setdefault(normalize(title), []).append((track_id, normalize(mix), normalize(artist_display)))
+    matches = {}
+    for row in rows:
+        best = None
+        artist = normalize(row['artist'])
+        for track_id, mix, artist_display in candidates.get(normalize(row['title']), []):
+            score = SequenceMatcher(None, artist, artist_display).ratio()
+            if score < FUZZY_THRESHOLD:
+                continue
+            score += 1 if mix == normalize(row['mix']) else 0
+            if best is None or score > best[0]:
+                best = (score, track_id)
+        if best is not None:
+            matches[row['key']] = best[1]
+    return matches
+
+
+# import
+
+
+class LibraryImporter:
+
+    def __init__(self, user, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.resolved = {}
+        self.tag_ids = set()
+        self.stats = {
+            'total': 0,
+            'processed': 0,
+            'matched': 0,
+            'fuzzy': 0,
+            'backlogged': 0,
+            'unmatched': 0,
+            'playlists': 0,
+            'tags': 0,
+            'bytes_read': 0,
+            'bytes_total': 0,
+        }
+
+    def run(self, path, import_format=None):
+        if import_format is None:
+            import_format = detect_format(path)
+        if import_format not in PARSERS:
+            raise ValueError('Error: unsupported import format ' + str(import_format))
+        self.stats['bytes_total'] = os.path.getsize(path)
+        rows = []
+        playlists = []
+        with open(path, 'rb') as file:
+            for item in PARSERS[import_format](file):
+                self.stats['bytes_read'] = file.tell()
+                if item[0] == 'total':
+                    self.stats['total'] += item[1]
+                elif item[0] == 'track':
+                    rows.append(item[1])
+                    if len(rows) >= self.chunk_size:
+                        self.import_tracks(rows)
+                        rows = []
+                elif item[0] == 'playlist':
+                    if len(rows) > 0:
+                        self.import_tracks(rows)
+                        rows = []
+                    playlists.append(item[1:])
+                    if sum(len(keys) for _, _, keys in playlists) >= self.chunk_size:
+                        self.import_playlists(playlists)
+                        playlists = []
+            self.stats['bytes_read'] = self.stats['bytes_total']
+        if len(rows) > 0:
+            self.import_tracks(rows)
+        if len(playlists) > 0:
+            self.import_playlists(playlists)
+
+        # bulk writes skip signals, so refresh the library visibility directly
+        UserVisibility.objects.sync([self.user.id])
+        invalidate_visibility(self.user.id)
+        return self.stats
+
+    def report(self):
+        if self.progress is not None:
+            self.progress(dict(self.stats))
+
+    def get_tags(self, tag_type, values):
+        values = set(value[:100] for value in values)
+        if len(values) == 0:
+            return {}
+        now = timezone.now().date()
+        Tag.objects.bulk_create(
+            [Tag(type=tag_type, value=value, user=self.user, date_added=now) for value in values],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        tags = dict(Tag.objects.filter(user=self.user, type=tag_type, value__in=values).values_list('value', 'id'))
+        self.tag_ids.update(tags.values())
+        self.stats['tags'] = len(self.tag_ids)
+        return tags
+
+    def import_tracks(self, rows):
+        with transaction.atomic():
+
+            # resolve beatport ids with one query per table, then fall back to title and artist
+            ids = set(row['beatport_track_id'] for row in rows if row['beatport_track_id'] is not None)
+            known = dict(Track.objects.filter(beatport_track_id__in=ids).values_list('beatport_track_id', 'id'))
+            bad = set(Track404.objects.filter(beatport_track_id__in=ids).values_list('beatport_track_id', flat=True))
+            fuzzy = get_fuzzy_matches([row for row in rows if row['beatport_track_id'] is None])
+            matched = {}
+            new_ids = []
+            for row in rows:
+                if row['beatport_track_id'] in known:
+                    matched[row['key']] = known[row['beatport_track_id']]
+                elif row['key'] in fuzzy:
+                    matched[row['key']] = fuzzy[row['key']]
+                    self.stats['fuzzy'] += 1
+                elif row['beatport_track_id'] is not None and row['beatport_track_id'] not in bad:
+                    new_ids.append(row['beatport_track_id'])
+                else:
+                    self.stats['unmatched'] += 1
+
+            # queue unknown ids on the backlog and remember who is waiting on them
+            new_ids = list(dict.fromkeys(new_ids))
+            TrackBacklog.objects.bulk_create(
+                [TrackBacklog(beatport_track_id=id, datetime_discovered=timezone.now()) for id in new_ids],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            ScrapeJob.objects.enqueue('track', new_ids, ScrapeJob.PRIORITY_USER)
+            backlog_ids = TrackBacklog.objects.filter(beatport_track_id__in=new_ids).values_list('id', flat=True)
+            TrackBacklog.users.through.objects.bulk_create(
+                [TrackBacklog.users.through(trackbacklog_id=backlog_id, user_id=self.user.id) for backlog_id in backlog_ids],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+
+            # add matched tracks to the library, keeping any existing instance as it is
+            instances = {}
+            for row in rows:
+                if row['key'] in matched and matched[row['key']] not in instances:
+                    instances[matched[row['key']]] = TrackInstance(
+                        track_id=matched[row['key']],
+                        user=self.user,
+                        comments=row['comments'],
+                        rating=row['rating'],
+                        play_count=row['play_count'],
+                        date_added=row['date_added'],
+                    )
+            TrackInstance.objects.bulk_create(list(instances.values()), batch_size=1000, ignore_conflicts=True)
+
+            # tag the library with the rekordbox my tags kept in comments
+            tags = self.get_tags('my tag', [value for row in rows if row['key'] in matched for value in row['tags']])
+            if len(tags) > 0:
+                instance_ids = dict(TrackInstance.objects.filter(user=self.user, track_id__in=instances).values_list('track_id', 'id'))
+                TrackInstance.tag.through.objects.bulk_create(
+                    [TrackInstance.tag.through(trackinstance_id=instance_ids[matched[row['key']]], tag_id=tags[value[:100]]) for row in rows if row['key'] in matched for value in row['tags']],
+                    batch_size=1000,
+                    ignore_conflicts=True,
+                )
+
+        self.resolved.update(matched)
+        self.stats['processed'] += len(rows)
+        self.stats['matched'] += len(matched)
+        self.stats['backlogged'] += len(new_ids)
+        self.report()
+
+    def import_playlists(self, playlists):
+        with transaction.atomic():
+            folders = self.get_tags('folder', [folder for _, folder, _ in playlists if folder is not None])
+            for name, folder, keys in playlists:
+                name = (name or 'Imported playlist')[:200]
+                playlist = Playlist.objects.filter(user=self.user, name=name).first()
+                if playlist is None:
+                    playlist = Playlist.objects.create(user=self.user, name=name, date_added=timezone.now().date())
+                track_ids = list(dict.fromkeys(self.resolved[key] for key in keys if key in self.resolved))
+                Playlist.track.through.objects.bulk_create(
+                    [Playlist.track.through(playlist_id=playlist.id, track_id=track_id) for track_id in track_ids],
+                    batch_size=1000,
+                    ignore_conflicts=True,
+                )
+                if folder is not None:
+                    playlist.tag.add(folders[folder[:100]])
+                self.stats['playlists'] += 1
+        self.report()
+
+
+def import_library(user, path, import_format=None, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    return LibraryImporter(user, chunk_size, progress).run(path, import_format)
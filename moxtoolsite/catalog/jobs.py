@@ -0,0 +1,121 @@
+from catalog.forms import BulkUploadForm
+from catalog.importers import import_library
+from catalog.models import UploadJob
+from catalog.utils import get_worker_name
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+import os, threading, traceback, uuid
+
+
+# background upload jobs, run by an in-process thread pool or the upload_worker command
+
+
+UPLOAD_JOB_LEASE = 300
+
+
+def run_bulk_upload(job, progress):
+    form = BulkUploadForm(job.payload)
+    if not form.is_valid():
+        raise ValueError('Error: invalid bulk upload, ' + ' '.join(error for errors in form.errors.values() for error in errors))
+    form.save(job.user, progress)
+    return str(len(form.cleaned_data['beatport_id_list'])) + ' ids uploaded'
+
+
+def run_library_import(job, progress):
+    stats = import_library(
+        job.user,
+        job.payload['path'],
+        job.payload.get('format') or None,
+        progress=lambda stats: progress(stats['processed'], max(stats['total'], stats['processed'])),
+    )
+    if os.path.exists(job.payload['path']):
+        os.remove(job.payload['path'])
+    return 'Imported ' + str(stats['matched']) + ' of ' + str(stats['processed']) + ' tracks, ' + str(stats['backlogged']) + ' queued for scraping, ' + str(stats['playlists']) + ' playlists'
+
+
+RUNNERS = {
+    'bulk_upload': run_bulk_upload,
+    'library_import': run_library_import,
+}
+
+
+def run_upload_job(job, lease_seconds=UPLOAD_JOB_LEASE):
+    def progress(processed, total):
+        job.update_progress(processed, total, lease_seconds)
+
+    try:
+        message = RUNNERS[job.kind](job, progress)
+    except Exception as e:
+        print('Upload job ' + str(job.id) + ' failed: ' + str(e))
+        job.fail(e, traceback.format_exc())
+        if job.status == 'failed' and 'path' in job.payload and os.path.exists(job.payload['path']):
+            os.remove(job.payload['path'])
+        return False
+    job.complete(message)
+    return True
+
+
+# submission
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        started = _executor is None
+        if started:
+            _executor = ThreadPoolExecutor(max_workers=settings.UPLOAD_JOB_THREADS, thread_name_prefix='upload-job')
+    if started:
+        # pick up jobs left queued or with expired leases by a previous process
+        sweep_upload_jobs()
+    return _executor
+
+
+def sweep_upload_jobs():
+    # claiming is compare-and-swap, so submitting a job that is already being run is harmless
+    jobs = list(UploadJob.objects.get_pending().order_by('datetime_created', 'id').values_list('id', 'next_attempt_at'))
+    for id, next_attempt_at in jobs:
+        submit_when_due(id, next_attempt_at)
+    return [id for id, _ in jobs]
+
+
+def submit_when_due(id, next_attempt_at):
+    delay = (next_attempt_at - timezone.now()).total_seconds()
+    if delay <= 0:
+        get_executor().submit(run_in_thread, id)
+    else:
+        timer = threading.Timer(delay, lambda: get_executor().submit(run_in_thread, id))
+        timer.daemon = True
+        timer.start()
+
+
+def run_in_thread(id):
+    try:
+        if UploadJob.objects.try_claim(id, get_worker_name(), UPLOAD_JOB_LEASE):
+            job = UploadJob.objects.get(id=id)
+            if not run_upload_job(job) and job.status == 'queued':
+                # requeued jobs have no worker loop to come back to them, so retry once the backoff has passed
+                submit_when_due(job.id, job.next_attempt_at)
+    finally:
+        connections.close_all()
+
+
+def submit_upload_job(user, kind, payload, total=0):
+    job = UploadJob.objects.create(user=user, kind=kind, payload=payload, total=total)
+    if settings.UPLOAD_JOB_THREADS > 0:
+        transaction.on_commit(lambda: get_executor().submit(run_in_thread, job.id))
+    return job
+
+
+def store_upload(uploaded_file):
+    os.makedirs(settings.UPLOAD_JOB_DIR, exist_ok=True)
+    path = os.path.join(settings.UPLOAD_JOB_DIR, uuid.uuid4().hex + os.path.splitext(uploaded_file.name)[1].lower())
+    with open(path, 'wb') as file:
+        for chunk in uploaded_file.chunks():
+            file.write(chunk)
+    return path
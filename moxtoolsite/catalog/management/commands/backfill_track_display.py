@@ -0,0 +1,27 @@
+from catalog.models import Track
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Populate the denormalized artist and display strings on every track.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of tracks to refresh per batch.',
+        )
+
+    def handle(self, *args, **options):
+        track_count = 0
+        last_id = 0
+        while True:
+            track_ids = list(Track.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:options['batch_size']])
+            if len(track_ids) == 0:
+                break
+            Track.objects.refresh_display(track_ids)
+            track_count += len(track_ids)
+            last_id = track_ids[-1]
+            self.stdout.write('Refreshed ' + str(track_count) + ' tracks')
+        self.stdout.write(self.style.SUCCESS('Track display backfill complete: ' + str(track_count) + ' tracks.'))
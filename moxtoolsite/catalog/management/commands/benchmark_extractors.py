@@ -0,0 +1,64 @@
+from bs4 import BeautifulSoup
+from catalog.extractors import NAME_STRAINER, TRACK_STRAINER, extract_name, extract_track_json, parse_track_soup
+from catalog.fetchers import FileFetcher
+from django.core.management.base import BaseCommand
+import os, time
+
+
+class Command(BaseCommand):
+    help = 'Time the full soup, targeted and embedded JSON extractors against saved fixture pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Number of times each page is extracted per method.',
+        )
+        parser.add_argument(
+            '--fixture-dir',
+            default=None,
+            help='Directory of saved pages, laid out as <object>/<id>.html.',
+        )
+
+    def get_methods(self, object_name, html, id):
+        if object_name == 'track':
+            methods = {
+                'full soup': lambda: parse_track_soup(BeautifulSoup(html, 'html.parser')),
+                'targeted': lambda: parse_track_soup(BeautifulSoup(html, 'html.parser', parse_only=TRACK_STRAINER)),
+                'embedded json': lambda: extract_track_json(html, id),
+            }
+        else:
+            methods = {
+                'full soup': lambda: {'name': BeautifulSoup(html, 'html.parser').find('body').find('h1').text},
+                'targeted': lambda: {'name': BeautifulSoup(html, 'html.parser', parse_only=NAME_STRAINER).find('h1').text},
+                'embedded json': lambda: extract_name(html, id) if '__NEXT_DATA__' in html else None,
+            }
+        return methods
+
+    def handle(self, *args, **options):
+        root = options['fixture_dir'] or FileFetcher().root
+        totals = {}
+        for object_name in ['track', 'artist', 'genre', 'label']:
+            directory = os.path.join(root, object_name)
+            if not os.path.isdir(directory):
+                continue
+            for file_name in sorted(os.listdir(directory)):
+                if not file_name.endswith('.html'):
+                    continue
+                id = int(file_name.split('.')[0])
+                with open(os.path.join(directory, file_name), encoding='utf-8') as file:
+                    html = file.read()
+                timings = {}
+                for method, extract in self.get_methods(object_name, html, id).items():
+                    if extract() is None:
+                        continue
+                    start = time.perf_counter()
+                    for _ in range(options['iterations']):
+                        extract()
+                    timings[method] = (time.perf_counter() - start) / options['iterations'] * 1000
+                    totals.setdefault(method, []).append(timings[method])
+                self.stdout.write(object_name + ' ' + str(id) + ': ' + ', '.join(method + ' ' + str(round(ms, 3)) + ' ms' for method, ms in timings.items()))
+        for method, values in totals.items():
+            self.stdout.write(method + ': ' + str(round(sum(values) / len(values), 3)) + ' ms per page on average over ' + str(len(values)) + ' pages')
+        self.stdout.write(self.style.SUCCESS('Extractor benchmark complete.'))
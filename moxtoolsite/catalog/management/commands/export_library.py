@@ -0,0 +1,45 @@
+from catalog.exports import EXPORT_FORMATS, EXPORT_OBJECTS, stream_export
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Stream a user\'s track library, playlists or setlists as CSV, JSON Lines or M3U.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'username',
+            help='User whose library is exported.',
+        )
+        parser.add_argument(
+            '--object',
+            choices=EXPORT_OBJECTS,
+            default='trackinstance',
+            help='What to export, the track library by default.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=list(EXPORT_FORMATS),
+            default='csv',
+            help='Output format, CSV by default.',
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='File to write, standard output by default.',
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        user = User.objects.filter(**{User.USERNAME_FIELD: options['username']}).first()
+        if user is None:
+            raise CommandError('Error: no user named ' + options['username'])
+        chunks = stream_export(user, options['object'], options['format'])
+        if options['output'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+        else:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+            self.stderr.write(self.style.SUCCESS('Export written to ' + options['output']))
@@ -0,0 +1,46 @@
+from catalog.importers import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, import_library
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from xml.etree.ElementTree import ParseError
+import json
+
+
+class Command(BaseCommand):
+    help = 'Stream a Rekordbox XML or Traktor NML collection into a user\'s track library and playlists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'username',
+            help='User whose library is imported into.',
+        )
+        parser.add_argument(
+            'path',
+            help='Collection file to import.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            default=None,
+            help='Collection format, detected from the file by default.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Tracks written per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        user = User.objects.filter(**{User.USERNAME_FIELD: options['username']}).first()
+        if user is None:
+            raise CommandError('Error: no user named ' + options['username'])
+        try:
+            stats = import_library(user, options['path'], options['format'], options['chunk_size'], self.report)
+        except (OSError, ParseError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(dict({'event': 'summary'}, **stats)))
+        self.stdout.write(self.style.SUCCESS('Imported ' + str(stats['matched']) + ' of ' + str(stats['processed']) + ' tracks into the library of ' + str(user)))
+
+    def report(self, stats):
+        self.stdout.write(json.dumps(dict({'event': 'progress'}, **stats)))
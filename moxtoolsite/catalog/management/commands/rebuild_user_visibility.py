@@ -0,0 +1,36 @@
+from catalog.models import UserVisibility
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the UserVisibility table from user libraries and report any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drift, without modifying the table.',
+        )
+
+    def handle(self, *args, **options):
+        drift_found = False
+        for object_type in UserVisibility.OBJECT_TYPES:
+            if options['check']:
+                missing, stale = UserVisibility.objects.get_drift(object_type)
+                counts = {
+                    'missing': len(missing),
+                    'stale': len(stale),
+                }
+            else:
+                with transaction.atomic():
+                    counts = UserVisibility.objects.sync(object_types=[object_type])[object_type]
+            if counts['missing'] > 0 or counts['stale'] > 0:
+                drift_found = True
+            self.stdout.write(object_type + ': ' + str(counts['missing']) + ' missing, ' + str(counts['stale']) + ' stale')
+        if drift_found and options['check']:
+            self.stdout.write(self.style.WARNING('Drift found, run without --check to rebuild.'))
+        elif drift_found:
+            self.stdout.write(self.style.SUCCESS('Drift repaired.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No drift found.'))
@@ -0,0 +1,138 @@
+from catalog.archive import extract_archived_page, get_page_archive
+from catalog.models import ArchivedPage, Artist, Genre, Label, ScrapeJob
+from catalog.utils import object_model_data_checker, object_model_processor
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+import os
+
+
+class Command(BaseCommand):
+    help = 'Re-run the page extractors over archived pages in parallel and process the results without refetching.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--types',
+            nargs='+',
+            choices=['artist', 'genre', 'label', 'track'],
+            default=['artist', 'genre', 'label', 'track'],
+            help='Object types to reparse, linked objects first by default.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of extractor processes, one per CPU core by default.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of archived pages to extract and process per batch.',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Also reparse pages already parsed at their current hash.',
+        )
+
+    def handle(self, *args, **options):
+        archive = get_page_archive()
+        if archive is None:
+            raise CommandError('Error: the page archive is disabled')
+        self.options = options
+        self.root = archive.root
+        self.executor = None
+        if options['workers'] > 1:
+            self.executor = ProcessPoolExecutor(max_workers=options['workers'])
+        totals = {'pages': 0, 'processed': 0, 'errors': 0, 'unresolved': 0}
+        try:
+            for object_name in ['artist', 'genre', 'label', 'track']:
+                if object_name in options['types']:
+                    for key, value in self.reparse(object_name).items():
+                        totals[key] += value
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            'Reparse complete: ' + str(totals['processed']) + ' of ' + str(totals['pages']) + ' pages processed, '
+            + str(totals['errors']) + ' errors, ' + str(totals['unresolved']) + ' tracks queued for linked objects.'
+        ))
+
+    def extract(self, tasks):
+        if self.executor is None:
+            return map(extract_archived_page, tasks)
+        return self.executor.map(extract_archived_page, tasks, chunksize=max(len(tasks) // (self.options['workers'] * 4), 1))
+
+    def reparse(self, object_name):
+        counts = {'pages': 0, 'processed': 0, 'errors': 0, 'unresolved': 0}
+        last_id = 0
+        while True:
+            pages = ArchivedPage.objects.filter(object_type=object_name, id__gt=last_id)
+            if self.options['all'] == False:
+                pages = pages.exclude(parsed_hash=F('content_hash'))
+            pages = list(pages.order_by('id').values_list('id', 'external_id', 'content_hash', 'datetime_fetched')[:self.options['batch_size']])
+            if len(pages) == 0:
+                break
+            last_id = pages[-1][0]
+            fetched = {str(external_id): datetime_fetched for _, external_id, _, datetime_fetched in pages}
+
+            # extract in worker processes, then validate and persist here
+            data = {}
+            for _, external_id, _, page_data, error in self.extract([(self.root, object_name, external_id, content_hash) for _, external_id, content_hash, _ in pages]):
+                if error is None:
+                    try:
+                        if object_model_data_checker(object_name, page_data) == False:
+                            error = 'incomplete data'
+                    except Exception as e:
+                        error = 'invalid data, ' + str(e)
+                if error is None:
+                    data[str(external_id)] = page_data
+                else:
+                    counts['errors'] += 1
+                    self.stdout.write('Error reparsing ' + object_name + ' ' + str(external_id) + ': ' + str(error))
+            if object_name == 'track':
+                unresolved = self.get_unresolved_tracks(data)
+                for key in unresolved:
+                    del data[key]
+                ScrapeJob.objects.enqueue('track', [int(key) for key in unresolved], ScrapeJob.PRIORITY_BACKLOG)
+                counts['unresolved'] += len(unresolved)
+            if len(data) > 0:
+                processed = self.process(object_name, data, fetched)
+                counts['processed'] += processed
+                counts['errors'] += len(data) - processed
+            counts['pages'] += len(pages)
+            self.stdout.write('Reparsed ' + str(counts['pages']) + ' ' + object_name + ' pages, ' + str(counts['processed']) + ' processed')
+        return counts
+
+    def process(self, object_name, data, fetched):
+        # the data is only as fresh as the archived page, so keep its fetch time as the scrape time
+        scraped_at = {object_name: fetched}
+        if object_model_processor({object_name: data}, scraped_at) == True:
+            return len(data)
+
+        # fall back to one page at a time so a bad page only fails itself
+        processed = 0
+        for key, value in data.items():
+            if object_model_processor({object_name: {key: value}}, scraped_at) == True:
+                processed += 1
+            else:
+                self.stdout.write('Error reparsing ' + object_name + ' ' + key + ': processing unsuccessful')
+        return processed
+
+    def get_unresolved_tracks(self, data):
+        genre_ids = set(value['genre']['id'] for value in data.values())
+        label_ids = set(value['label']['id'] for value in data.values())
+        artist_ids = set()
+        for value in data.values():
+            artist_ids.update(artist['id'] for artist in value['artists'] + value['remix_artists'])
+        genre_ids = set(Genre.objects.filter(beatport_genre_id__in=genre_ids).values_list('beatport_genre_id', flat=True))
+        label_ids = set(Label.objects.filter(beatport_label_id__in=label_ids).values_list('beatport_label_id', flat=True))
+        artist_ids = set(Artist.objects.filter(beatport_artist_id__in=artist_ids).values_list('beatport_artist_id', flat=True))
+        unresolved = []
+        for key, value in data.items():
+            if value['genre']['id'] not in genre_ids or value['label']['id'] not in label_ids:
+                unresolved.append(key)
+            elif any(artist['id'] not in artist_ids for artist in value['artists'] + value['remix_artists']):
+                unresolved.append(key)
+        return unresolved
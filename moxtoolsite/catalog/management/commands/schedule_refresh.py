@@ -0,0 +1,21 @@
+from catalog.freshness import schedule_refresh
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Queue refresh jobs for stale, complete metadata within each type\'s hourly budget.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--types',
+            nargs='+',
+            choices=['artist', 'genre', 'label', 'track'],
+            default=None,
+            help='Object types to refresh, all by default.',
+        )
+
+    def handle(self, *args, **options):
+        scheduled = schedule_refresh(options['types'])
+        for object_name, count in scheduled.items():
+            self.stdout.write('Queued ' + str(count) + ' ' + object_name + ' refreshes')
+        self.stdout.write(self.style.SUCCESS('Refresh scheduling complete: ' + str(sum(scheduled.values())) + ' jobs queued.'))
@@ -0,0 +1,155 @@
+from catalog.metrics import ThroughputStats
+from catalog.models import ScrapeJob
+from catalog.utils import HostRateLimiter, cleanup404, get_worker_name, run_scrape_job
+from django.core.management.base import BaseCommand
+from django.db import connections
+import json, signal, threading, time
+
+
+class Command(BaseCommand):
+    help = 'Continuously claim and run scrape jobs, reporting per-job timings and throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker threads. On SQLite saves are serialized across threads, so extra workers only overlap fetching.',
+        )
+        parser.add_argument(
+            '--types',
+            nargs='+',
+            choices=['artist', 'genre', 'label', 'track'],
+            default=None,
+            help='Object types to scrape, all by default.',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=0,
+            help='Target items per minute across all workers, unlimited by default.',
+        )
+        parser.add_argument(
+            '--once',
+            type=int,
+            default=None,
+            metavar='N',
+            help='Run at most N jobs, then exit once the queue is drained or N is reached.',
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=300,
+            help='Seconds a claimed job stays leased to this worker.',
+        )
+        parser.add_argument(
+            '--report-interval',
+            type=float,
+            default=60,
+            help='Seconds between throughput reports.',
+        )
+        parser.add_argument(
+            '--idle-sleep',
+            type=float,
+            default=5,
+            help='Seconds to wait when the queue is empty.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.stop = threading.Event()
+        self.output_lock = threading.Lock()
+        self.slot_lock = threading.Lock()
+        self.remaining = options['once']
+        self.stats = ThroughputStats()
+        self.rate_limiter = None
+        if options['rate'] > 0:
+            self.rate_limiter = HostRateLimiter(60 / options['rate'])
+        previous_handlers = {}
+        for signum in [signal.SIGTERM, signal.SIGINT]:
+            previous_handlers[signum] = signal.signal(signum, self.request_stop)
+        try:
+            if options['workers'] <= 1:
+                self.work_with_reports()
+            else:
+                threads = [threading.Thread(target=self.work, daemon=True) for _ in range(options['workers'])]
+                for thread in threads:
+                    thread.start()
+                while any(thread.is_alive() for thread in threads):
+                    for thread in threads:
+                        thread.join(options['report_interval'] / len(threads))
+                    self.report()
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+        cleanup404()
+        self.emit('summary', self.stats.summary())
+        self.stdout.write(self.style.SUCCESS('Scrape worker stopped after ' + str(self.stats.summary()['jobs']) + ' jobs.'))
+
+    def request_stop(self, signum, frame):
+        self.emit('stopping', {'signal': signum})
+        self.stop.set()
+
+    def emit(self, event, data):
+        line = json.dumps(dict({'event': event}, **data), default=str)
+        with self.output_lock:
+            self.stdout.write(line)
+
+    def report(self):
+        now = time.monotonic()
+        if now - getattr(self, 'last_report', 0) >= self.options['report_interval']:
+            self.last_report = now
+            self.emit('throughput', self.stats.summary())
+
+    def take_slot(self):
+        with self.slot_lock:
+            if self.remaining is None:
+                return True
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def return_slot(self):
+        with self.slot_lock:
+            if self.remaining is not None:
+                self.remaining += 1
+
+    def work_with_reports(self):
+        self.last_report = time.monotonic()
+        self.work(report=True)
+
+    def work(self, report=False):
+        owner = get_worker_name()
+        try:
+            while not self.stop.is_set():
+                if not self.take_slot():
+                    break
+                if self.rate_limiter is not None:
+                    self.rate_limiter.wait_for('scrape_worker')
+                jobs = ScrapeJob.objects.claim(owner, 1, self.options['types'], self.options['lease'])
+                if len(jobs) == 0:
+                    self.return_slot()
+                    if self.remaining is not None:
+                        break
+                    if report:
+                        self.report()
+                    self.stop.wait(self.options['idle_sleep'])
+                    continue
+                job = jobs[0]
+                result = run_scrape_job(job)
+                self.stats.record(result['timings'], result['success'])
+                self.emit('job', {
+                    'object_type': job.object_type,
+                    'external_id': job.external_id,
+                    'attempts': job.attempts,
+                    'status': job.status,
+                    'success': result['success'],
+                    'message': result['message'],
+                    'timings': {name: round(seconds, 4) for name, seconds in result['timings'].items()},
+                })
+                if report:
+                    self.report()
+        finally:
+            if not report:
+                connections.close_all()
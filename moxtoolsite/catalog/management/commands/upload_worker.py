@@ -0,0 +1,62 @@
+from catalog.jobs import UPLOAD_JOB_LEASE, run_upload_job
+from catalog.models import UploadJob
+from catalog.utils import get_worker_name
+from django.core.management.base import BaseCommand
+import json, signal, threading
+
+
+class Command(BaseCommand):
+    help = 'Continuously claim and run background bulk uploads and library imports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            type=int,
+            default=None,
+            metavar='N',
+            help='Run at most N jobs, then exit once the queue is drained or N is reached.',
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=UPLOAD_JOB_LEASE,
+            help='Seconds a claimed job stays leased to this worker between progress updates.',
+        )
+        parser.add_argument(
+            '--idle-sleep',
+            type=float,
+            default=5,
+            help='Seconds to wait when the queue is empty.',
+        )
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        previous_handlers = {}
+        for signum in [signal.SIGTERM, signal.SIGINT]:
+            previous_handlers[signum] = signal.signal(signum, self.request_stop)
+        count = 0
+        owner = get_worker_name()
+        try:
+            while not self.stop.is_set():
+                if options['once'] is not None and count >= options['once']:
+                    break
+                job = UploadJob.objects.claim(owner, options['lease'])
+                if job is None:
+                    if options['once'] is not None:
+                        break
+                    self.stop.wait(options['idle_sleep'])
+                    continue
+                success = run_upload_job(job, options['lease'])
+                count += 1
+                self.emit('job', dict(job.get_status(), success=success))
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS('Upload worker stopped after ' + str(count) + ' jobs.'))
+
+    def request_stop(self, signum, frame):
+        self.emit('stopping', {'signal': signum})
+        self.stop.set()
+
+    def emit(self, event, data):
+        self.stdout.write(json.dumps(dict({'event': event}, **data), default=str))
@@ -0,0 +1,79 @@
+from collections import deque
+from contextlib import contextmanager
+import math, threading, time
+
+
+# per-job timings, collected on the thread running the job
+
+
+_local = threading.local()
+
+
+def start_timings():
+    _local.timings = {}
+    return _local.timings
+
+
+def add_timing(name, seconds):
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0) + seconds
+
+
+@contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - start)
+
+
+def percentile(values, percent):
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+# throughput and latency over a rolling window of jobs
+
+
+class ThroughputStats:
+    phases = ['total', 'fetch', 'parse', 'persist']
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.success_count = 0
+        self.error_count = 0
+
+    def record(self, timings, success):
+        with self.lock:
+            self.samples.append(dict(timings))
+            if success == True:
+                self.success_count += 1
+            else:
+                self.error_count += 1
+
+    def summary(self):
+        with self.lock:
+            samples = list(self.samples)
+            success_count = self.success_count
+            error_count = self.error_count
+        elapsed = time.monotonic() - self.started_at
+        summary = {
+            'jobs': success_count + error_count,
+            'success': success_count,
+            'errors': error_count,
+            'elapsed': round(elapsed, 3),
+            'items_per_minute': round((success_count + error_count) / elapsed * 60, 2) if elapsed > 0 else 0,
+        }
+        for phase in self.phases:
+            values = [sample[phase] for sample in samples if phase in sample]
+            for percent in [50, 90, 99]:
+                value = percentile(values, percent)
+                summary[phase+'_p'+str(percent)] = round(value, 4) if value is not None else None
+        return summary
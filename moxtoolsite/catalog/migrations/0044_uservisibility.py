@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-17 19:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_uservisibility(apps, schema_editor):
+    TrackInstance = apps.get_model('catalog', 'TrackInstance')
+    UserVisibility = apps.get_model('catalog', 'UserVisibility')
+    lookups = {
+        'track': ['track_id'],
+        'artist': ['track__artist', 'track__remix_artist'],
+        'genre': ['track__genre'],
+        'label': ['track__label'],
+    }
+    for object_type, object_lookups in lookups.items():
+        pairs = set()
+        for lookup in object_lookups:
+            pairs.update(
+                TrackInstance.objects.filter(user__isnull=False, **{lookup+'__isnull': False}).values_list('user_id', lookup).distinct().order_by()
+            )
+        UserVisibility.objects.bulk_create(
+            [UserVisibility(user_id=user_id, object_type=object_type, object_id=object_id) for user_id, object_id in pairs],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0043_remove_genrerequest_genre_remove_genrerequest_user_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'object_type', 'object_id'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'object_type', 'object_id'), name='uservisibility_unique_on_user_type_and_object')],
+            },
+        ),
+        migrations.RunPython(populate_uservisibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0044_uservisibility'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['title', 'id'], name='track_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['bpm', 'id'], name='track_bpm_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['key', 'id'], name='track_key_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['released', 'id'], name='track_released_id_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-17 19:23
+
+from django.db import migrations, models
+
+
+def get_artist_display(artists):
+    return ', '.join(artist.name if artist.name else str(artist.beatport_artist_id) for artist in artists)
+
+
+def populate_track_display(apps, schema_editor):
+    Track = apps.get_model('catalog', 'Track')
+    last_id = 0
+    while True:
+        tracks = list(Track.objects.filter(id__gt=last_id).order_by('id').prefetch_related('artist', 'remix_artist')[:1000])
+        if len(tracks) == 0:
+            break
+        for track in tracks:
+            track.artist_display = get_artist_display(track.artist.all())
+            track.remix_artist_display = get_artist_display(track.remix_artist.all())
+
+            # same as Track.build_full_display, which historical models do not have
+            if track.title:
+                track.full_display = track.title
+                if track.mix is not None:
+                    track.full_display += ' (' + track.mix + ')'
+                elif len(track.remix_artist_display) >= 1:
+                    track.full_display += ' (' + track.remix_artist_display + ' Remix)'
+                if len(track.artist_display) >= 1:
+                    track.full_display += ' by ' + track.artist_display
+            else:
+                track.full_display = str(track.beatport_track_id)
+        Track.objects.bulk_update(tracks, ['artist_display', 'remix_artist_display', 'full_display'], batch_size=500)
+        last_id = tracks[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0045_track_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='track',
+            name='artist_display',
+            field=models.CharField(default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='full_display',
+            field=models.CharField(default='', editable=False, max_length=1500),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='remix_artist_display',
+            field=models.CharField(default='', editable=False, max_length=1000),
+        ),
+        migrations.RunPython(populate_track_display, migrations.RunPython.noop),
+    ]
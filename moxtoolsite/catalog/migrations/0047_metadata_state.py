@@ -0,0 +1,72 @@
+# Generated by Django 5.2 on 2026-10-17 19:27
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Q
+
+
+def populate_metadata_state(apps, schema_editor):
+    models_fields = {
+        'Artist': ('beatport_artist_id', ['name']),
+        'Genre': ('beatport_genre_id', ['name']),
+        'Label': ('beatport_label_id', ['name']),
+        'Track': ('beatport_track_id', ['title', 'mix', 'length', 'bpm', 'key', 'released', 'genre', 'label']),
+    }
+    for model_name, (external_id_field, metadata_fields) in models_fields.items():
+        model = apps.get_model('catalog', model_name)
+        missing = Q()
+        for field_name in metadata_fields:
+            missing = missing | Q(**{field_name+'__isnull': True})
+        if model_name == 'Track':
+            artists = model.artist.through.objects.filter(track_id=OuterRef('pk'))
+            remix_artists = model.remix_artist.through.objects.filter(track_id=OuterRef('pk'))
+            missing = missing | ~Q(Exists(artists)) | (Q(mix__icontains='remix') & ~Q(Exists(remix_artists)))
+        model.objects.update(metadata_state='complete')
+        model.objects.filter(missing).update(metadata_state='incomplete')
+        model.objects.filter(**{external_id_field+'__isnull': True}).update(metadata_state='unlinked')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0046_track_display'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='metadata_state',
+            field=models.CharField(choices=[('complete', 'complete'), ('incomplete', 'incomplete'), ('unlinked', 'unlinked')], default='incomplete', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='metadata_state',
+            field=models.CharField(choices=[('complete', 'complete'), ('incomplete', 'incomplete'), ('unlinked', 'unlinked')], default='incomplete', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='label',
+            name='metadata_state',
+            field=models.CharField(choices=[('complete', 'complete'), ('incomplete', 'incomplete'), ('unlinked', 'unlinked')], default='incomplete', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='metadata_state',
+            field=models.CharField(choices=[('complete', 'complete'), ('incomplete', 'incomplete'), ('unlinked', 'unlinked')], default='incomplete', editable=False, max_length=10),
+        ),
+        migrations.RunPython(populate_metadata_state, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(fields=['metadata_state', 'id'], name='artist_metadata_state_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(fields=['metadata_state', 'id'], name='genre_metadata_state_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='label',
+            index=models.Index(fields=['metadata_state', 'id'], name='label_metadata_state_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['metadata_state', 'id'], name='track_metadata_state_id_idx'),
+        ),
+    ]
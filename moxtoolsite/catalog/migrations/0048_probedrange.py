@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0047_metadata_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProbedRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(max_length=10)),
+                ('start', models.BigIntegerField()),
+                ('end', models.BigIntegerField()),
+                ('datetime_probed', models.DateTimeField(auto_now=True, verbose_name='Date & Time Probed')),
+            ],
+            options={
+                'ordering': ['object_type', 'start'],
+                'indexes': [models.Index(fields=['object_type', 'end'], name='probedrange_type_end_idx')],
+                'constraints': [models.UniqueConstraint(fields=('object_type', 'start'), name='probedrange_unique_on_type_and_start')],
+            },
+        ),
+    ]
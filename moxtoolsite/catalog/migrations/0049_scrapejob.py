@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-17 19:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def populate_scrapejob(apps, schema_editor):
+    ScrapeJob = apps.get_model('catalog', 'ScrapeJob')
+    for object_type in ['artist', 'genre', 'label', 'track']:
+        backlog = apps.get_model('catalog', object_type.title()+'Backlog')
+        ids = backlog.objects.values_list('beatport_'+object_type+'_id', flat=True).iterator(chunk_size=1000)
+        jobs = []
+        for id in ids:
+            jobs.append(ScrapeJob(object_type=object_type, external_id=id, priority=20))
+            if len(jobs) >= 1000:
+                ScrapeJob.objects.bulk_create(jobs, ignore_conflicts=True)
+                jobs = []
+        ScrapeJob.objects.bulk_create(jobs, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0048_probedrange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(max_length=10)),
+                ('external_id', models.BigIntegerField(verbose_name='External ID')),
+                ('priority', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('leased', 'leased'), ('done', 'done'), ('failed', 'failed')], default='queued', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=5)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next Attempt')),
+                ('leased_until', models.DateTimeField(blank=True, null=True, verbose_name='Leased Until')),
+                ('lease_owner', models.CharField(blank=True, default='', max_length=100)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('datetime_created', models.DateTimeField(auto_now_add=True, verbose_name='Date & Time Created')),
+                ('datetime_updated', models.DateTimeField(auto_now=True, verbose_name='Date & Time Updated')),
+            ],
+            options={
+                'ordering': ['-priority', 'next_attempt_at', 'id'],
+                'indexes': [models.Index(fields=['status', '-priority', 'next_attempt_at', 'id'], name='scrapejob_claim_idx'), models.Index(fields=['status', 'leased_until'], name='scrapejob_lease_idx')],
+                'constraints': [models.UniqueConstraint(fields=('object_type', 'external_id'), name='scrapejob_unique_on_type_and_external_id')],
+            },
+        ),
+        migrations.RunPython(populate_scrapejob, migrations.RunPython.noop),
+    ]
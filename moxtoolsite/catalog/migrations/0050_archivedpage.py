@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 19:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0049_scrapejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(max_length=10)),
+                ('external_id', models.BigIntegerField(verbose_name='External ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('parsed_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('datetime_fetched', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date & Time Fetched')),
+            ],
+            options={
+                'ordering': ['object_type', 'external_id'],
+                'constraints': [models.UniqueConstraint(fields=('object_type', 'external_id'), name='archivedpage_unique_on_type_and_external_id')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-17 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0050_archivedpage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('datetime_updated', models.DateTimeField(auto_now=True, verbose_name='Date & Time Updated')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-17 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0051_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='last_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Last Changed'),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='last_scraped_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Last Scraped'),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='last_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Last Changed'),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='last_scraped_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Last Scraped'),
+        ),
+        migrations.AddField(
+            model_name='label',
+            name='last_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Last Changed'),
+        ),
+        migrations.AddField(
+            model_name='label',
+            name='last_scraped_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Last Scraped'),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='last_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Last Changed'),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='last_scraped_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Last Scraped'),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(fields=['metadata_state', 'last_scraped_at'], name='artist_state_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(fields=['metadata_state', 'last_scraped_at'], name='genre_state_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='label',
+            index=models.Index(fields=['metadata_state', 'last_scraped_at'], name='label_state_scraped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['metadata_state', 'last_scraped_at'], name='track_state_scraped_idx'),
+        ),
+    ]
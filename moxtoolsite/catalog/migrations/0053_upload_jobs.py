@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-17 19:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0052_freshness'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('bulk_upload', 'bulk upload'), ('library_import', 'library import')], max_length=20)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='queued', max_length=10)),
+                ('processed', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=3)),
+                ('leased_until', models.DateTimeField(blank=True, null=True, verbose_name='Leased Until')),
+                ('lease_owner', models.CharField(blank=True, default='', max_length=100)),
+                ('message', models.TextField(blank=True, default='')),
+                ('datetime_created', models.DateTimeField(auto_now_add=True, verbose_name='Date & Time Created')),
+                ('datetime_started', models.DateTimeField(blank=True, null=True, verbose_name='Date & Time Started')),
+                ('datetime_finished', models.DateTimeField(blank=True, null=True, verbose_name='Date & Time Finished')),
+                ('datetime_updated', models.DateTimeField(auto_now=True, verbose_name='Date & Time Updated')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-datetime_created'],
+                'indexes': [models.Index(fields=['status', 'datetime_created', 'id'], name='uploadjob_claim_idx')],
+            },
+        ),
+    ]
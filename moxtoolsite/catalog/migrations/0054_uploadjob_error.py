@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0053_upload_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadjob',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-17 20:41
+
+import datetime
+from django.db import migrations
+from django.db.models import F
+from django.utils import timezone
+
+
+def populate_last_scraped(apps, schema_editor):
+    # spread existing complete rows across their refresh window, so they go stale a day's share at a time
+    max_age_days = {
+        'Artist': 30,
+        'Genre': 90,
+        'Label': 30,
+        'Track': 60,
+    }
+    now = timezone.now()
+    for model_name, days in max_age_days.items():
+        model = apps.get_model('catalog', model_name)
+        unscraped = model.objects.filter(metadata_state='complete', last_scraped_at__isnull=True).alias(bucket=F('id') % days)
+        for bucket in range(days):
+            unscraped.filter(bucket=bucket).update(last_scraped_at=now - datetime.timedelta(days=bucket))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0054_uploadjob_error'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_last_scraped, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-17 20:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0055_backfill_last_scraped'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadjob',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next Attempt'),
+        ),
+    ]
@@ -1,10 +1,13 @@
 from django.apps import apps
 from django.conf import settings
 from django.core.exceptions import PermissionDenied, ValidationError, FieldDoesNotExist
-from django.db import models
-from django.db.models import UniqueConstraint, F, Q
+from django.db import connection, models, transaction
+from django.db.models import UniqueConstraint, Case, Exists, F, OuterRef, Q, Subquery, Value, When, Window
+from django.db.models.functions import Rank
 from django.urls import reverse
-import re, uuid
+from django.utils import timezone
+from catalog.visibility import get_visible_set
+import datetime, random, re, uuid
 
 
 # mixins
@@ -442,6 +445,23 @@ class SharedModelMixin:
         except Exception as e:
             print(f"An error occurred: {e}")
 
+    def build_metadata_state(self):
+        external_id_none = False
+        any_metadata_none = False
+
+        # evaluate potentially unset fields
+        if getattr(self, self.external_id_field) is None:
+            external_id_none = True
+        for field_name in self.metadata_fields:
+            if getattr(self, self._meta.get_field(field_name).attname) is None:
+                any_metadata_none = True
+
+        # determine completeness
+        return metadata_state(external_id_none, any_metadata_none)
+
+    def metadata_status(self):
+        return metadata_state_action_status(self.build_metadata_state(), self.public)
+
     def get_modify_url(self):
         obj_name = self.__class__.__name__.lower()
         return reverse('modify-object', args=[obj_name, str(self.id)])
@@ -530,12 +550,75 @@ class RequestMixin:
         return message
 
 
+# metadata completeness
+
+
+METADATA_STATE_CHOICES = [
+    ('complete', 'complete'),
+    ('incomplete', 'incomplete'),
+    ('unlinked', 'unlinked'),
+]
+
+
+# expressions
+
+
+class SubqueryCount(Subquery):
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = models.IntegerField()
+
 
 # shared models with permissions manager
 
 
 class SharedModelPermissionManager(models.Manager):
+
+    def get_user_set(self, user):
+        shared_model = self.model.__name__.lower()
+        if shared_model in UserVisibility.OBJECT_TYPES:
+            object_ids = UserVisibility.objects.filter(user=user, object_type=shared_model).values('object_id')
+            return self.get_queryset().filter(id__in=object_ids)
+        else:
+            raise ValidationError("Data for "+shared_model+" is not currently available.")
+
+    def get_visible_set(self, user):
+        if user.is_anonymous:
+            raise PermissionDenied("You must login.")
+        return get_visible_set(user, self.model, self.build_queryset_can_view)
+
     def get_queryset_can_view(self, user):
+        return self.get_visible_set(user).queryset.all()
+
+    def can_view(self, user, obj_or_ids):
+        if user.is_anonymous:
+            raise PermissionDenied("You must login.")
+        shared_model = self.model.__name__.lower()
+        view_public = user.has_perm('catalog.moxtool_can_view_public_'+shared_model)
+        view_own = user.has_perm('catalog.moxtool_can_view_own_'+shared_model)
+        single, visible, pending = split_visible_items(
+            obj_or_ids,
+            user.has_perm('catalog.moxtool_can_view_any_'+shared_model),
+            lambda obj: view_public and obj.public is True,
+        )
+        if len(pending) > 0 and (view_public or view_own):
+            conditions = []
+            if view_public:
+                conditions.append(Q(public=True))
+            if view_own:
+                conditions.append(Exists(UserVisibility.objects.filter(user=user, object_type=shared_model, object_id=OuterRef('pk'))))
+            condition = conditions[0]
+            for other in conditions[1:]:
+                condition = condition | other
+            visible.update(self.get_queryset().filter(condition, id__in=pending).values_list('id', flat=True))
+        return get_visible_result(single, visible)
+
+    def get_viewable_object(self, user, pk):
+        obj = self.get_queryset().get(id=pk)
+        if self.can_view(user, obj) == False:
+            raise self.model.DoesNotExist(self.model.__name__ + " matching query does not exist.")
+        return obj
+
+    def build_queryset_can_view(self, user):
         if user.is_anonymous:
             raise PermissionDenied("You must login.")
         else:
@@ -549,20 +632,7 @@ class SharedModelPermissionManager(models.Manager):
                     if user.has_perm('catalog.moxtool_can_view_public_'+shared_model):
                         queryset = queryset | self.get_queryset().filter(public=True)
                     if user.has_perm('catalog.moxtool_can_view_own_'+shared_model):
-                        for trackinstance in TrackInstance.objects.filter(user=user):
-                            if shared_model == 'track':
-                                queryset = queryset | Track.objects.filter(id=trackinstance.track.id)
-                            elif shared_model == 'artist':
-                                queryset = queryset | trackinstance.track.artist.all()
-                                queryset = queryset | trackinstance.track.remix_artist.all()
-                            elif shared_model == 'genre':
-                                if trackinstance.track.genre:
-                                    queryset = queryset | Genre.objects.filter(id=trackinstance.track.genre.id)
-                            elif shared_model == 'label':
-                                if trackinstance.track.label:
-                                    queryset = queryset | Label.objects.filter(id=trackinstance.track.label.id)
-                            else:
-                                raise ValidationError("Data for "+shared_model+" is not currently available.")
+                        queryset = queryset | self.get_user_set(user)
                 return queryset.distinct()
             else:
                 raise ValidationError("The request for "+shared_model+" is not a valid shared model.")
@@ -595,33 +665,116 @@ class SharedModelPermissionManager(models.Manager):
                     if user.has_perm('catalog.moxtool_can_modify_public_'+shared_model):
                         queryset = queryset | self.get_queryset().filter(public=True)
                     if user.has_perm('catalog.moxtool_can_modify_own_'+shared_model):
-                        for trackinstance in TrackInstance.objects.filter(user=user):
-                            if shared_model == 'track':
-                                queryset = queryset | Track.objects.filter(id=trackinstance.track.id)
-                            elif shared_model == 'artist':
-                                queryset = queryset | trackinstance.track.artist.all()
-                                queryset = queryset | trackinstance.track.remix_artist.all()
-                            elif shared_model == 'genre':
-                                if trackinstance.track.genre:
-                                    queryset = queryset | Genre.objects.filter(id=trackinstance.track.genre.id)
-                            elif shared_model == 'label':
-                                if trackinstance.track.label:
-                                    queryset = queryset | Label.objects.filter(id=trackinstance.track.label.id)
-                            else:
-                                raise ValidationError("Data for "+shared_model+" is not currently available.")
+                        queryset = queryset | self.get_user_set(user)
                     return queryset.distinct()
             else:
                 raise ValidationError("The request for "+shared_model+" is not a valid shared model.")
 
+    def get_track_fields(self):
+        shared_model = self.model.__name__.lower()
+        if shared_model == 'artist':
+            return ['artist', 'remix_artist']
+        elif shared_model in ['genre', 'label']:
+            return [shared_model]
+        else:
+            raise ValidationError("Track counts for "+shared_model+" are not currently available.")
+
+    def annotate_track_count(self, queryset, tracks):
+        lookup = Q()
+        for field in self.get_track_fields():
+            lookup = lookup | Q(**{field: OuterRef('pk')})
+        track_ids = tracks.filter(lookup).order_by().values('id').distinct()
+        return queryset.annotate(track_count=SubqueryCount(track_ids))
+
+    def get_queryset_can_view_with_track_count(self, user):
+        queryset = self.annotate_track_count(
+            self.get_queryset_can_view(user),
+            Track.objects.get_queryset_can_view(user),
+        )
+        return queryset.order_by('-track_count', 'name', 'id')
+
+    def get_top_by_track_count(self, tracks, limit=1, ties=True):
+        related = Q()
+        for field in self.get_track_fields():
+            related = related | Q(id__in=tracks.order_by().values(field))
+        queryset = self.annotate_track_count(self.get_queryset().filter(related), tracks)
+        queryset = queryset.order_by('-track_count', 'name', 'id')
+        if limit is None:
+            return queryset
+        elif ties is True:
+            queryset = queryset.annotate(rank=Window(Rank(), order_by=F('track_count').desc()))
+            return queryset.filter(rank__lte=limit)
+        else:
+            return queryset[:limit]
+
+    def get_missing_metadata_filter(self):
+        missing = Q()
+        for field_name in self.model.metadata_fields:
+            missing = missing | Q(**{field_name+'__isnull': True})
+        return missing
+
+    def annotate_metadata_state(self, queryset):
+        return queryset.annotate(evaluated_state=Case(
+            When(Q(**{self.model.external_id_field+'__isnull': True}), then=Value('unlinked')),
+            When(self.get_missing_metadata_filter(), then=Value('incomplete')),
+            default=Value('complete'),
+            output_field=models.CharField(),
+        ))
+
+    def evaluate_metadata(self, queryset=None):
+        if queryset is None:
+            queryset = self.get_queryset()
+        rows = list(self.annotate_metadata_state(queryset.order_by()).values_list('id', 'metadata_state', 'evaluated_state', 'public'))
+        statuses = {}
+        changed = []
+        for id, stored_state, state, public in rows:
+            status = metadata_state_action_status(state, public)
+            new_public = public
+            if status['add'] == True:
+                new_public = True
+            if status['remove'] == True:
+                new_public = False
+            if state != stored_state or new_public != public:
+                changed.append(self.model(id=id, metadata_state=state, public=new_public))
+            statuses[id] = status
+        self.bulk_update(changed, ['metadata_state', 'public'], batch_size=500)
+        return statuses
+
     def display(self, user):
         return ', '.join(str(obj) for obj in self.get_queryset_can_view(user))
     
 
+class TrackManager(SharedModelPermissionManager):
+
+    def get_missing_metadata_filter(self):
+        missing = super().get_missing_metadata_filter()
+        artists = Track.artist.through.objects.filter(track_id=OuterRef('pk'))
+        remix_artists = Track.remix_artist.through.objects.filter(track_id=OuterRef('pk'))
+        missing = missing | ~Q(Exists(artists))
+        return missing | (Q(mix__icontains='remix') & ~Q(Exists(remix_artists)))
+
+    def refresh_display(self, track_ids):
+        track_ids = list(track_ids)
+        for i in range(0, len(track_ids), 500):
+            tracks = list(self.get_queryset().filter(id__in=track_ids[i:i+500]).prefetch_related('artist', 'remix_artist'))
+            for track in tracks:
+                track.artist_display = ', '.join(str(artist) for artist in track.artist.all())
+                track.remix_artist_display = ', '.join(str(remix_artist) for remix_artist in track.remix_artist.all())
+                track.full_display = track.build_full_display()
+                track.metadata_state = track.build_metadata_state()
+            self.bulk_update(tracks, ['artist_display', 'remix_artist_display', 'full_display', 'metadata_state'])
+    
+
 class Artist(models.Model, SharedModelMixin, ArtistMixin):
     beatport_artist_id = models.BigIntegerField('Beatport Artist ID', help_text='Artist ID from Beatport, found in the artist URL, which can be used to populate metadata', null=True)
     name = models.CharField(max_length=200, null=True)
     public = models.BooleanField(default=False)
+    metadata_state = models.CharField(max_length=10, choices=METADATA_STATE_CHOICES, default='incomplete', editable=False)
+    last_scraped_at = models.DateTimeField('Last Scraped', null=True, blank=True, editable=False)
+    last_changed_at = models.DateTimeField('Last Changed', null=True, blank=True, editable=False)
     objects = SharedModelPermissionManager()
+    external_id_field = 'beatport_artist_id'
+    metadata_fields = ['name']
 
     def __str__(self):
         if self.name:
@@ -629,6 +782,11 @@ class Artist(models.Model, SharedModelMixin, ArtistMixin):
         else:
             return str(self.beatport_artist_id)
 
+    def save(self, *args, **kwargs):
+        self.metadata_state = self.build_metadata_state()
+        extend_update_fields(kwargs, 'metadata_state', [self.external_id_field] + self.metadata_fields)
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         if self.name:
             url_friendly_name = re.sub(r'[^a-zA-Z0-9]', '_', self.name.lower())
@@ -644,19 +802,6 @@ class Artist(models.Model, SharedModelMixin, ArtistMixin):
                 artist_genre_list.append(artist_track.genre.name)
         return re.sub(r"[\[|\]|']", '', str(artist_genre_list))
     
-    def metadata_status(self):
-        external_id_none = False
-        any_metadata_none = False
-
-        # evaluate potentially unset fields
-        if self.beatport_artist_id is None:
-            external_id_none = True
-        if self.name is None:
-            any_metadata_none = True
-
-        # determine action statuses
-        return metadata_action_status(external_id_none, any_metadata_none, self.public)
-    
     def get_viewable_tracks_by_artist(self, user):
         return Track.objects.get_queryset_can_view(user).filter(Q(artist=self) | Q(remix_artist=self))
     
@@ -664,23 +809,7 @@ class Artist(models.Model, SharedModelMixin, ArtistMixin):
         return self.get_viewable_tracks_by_artist(user).count()
     
     def get_top_viewable_artist_genres(self, user):
-        genre_data = {}
-        max = 1
-        for track in self.get_viewable_tracks_by_artist(user):
-            if track.genre is not None:
-                if track.genre.id in genre_data:
-                    genre_data[track.genre.id]['count'] += 1
-                    if max < genre_data[track.genre.id]['count']:
-                        max = genre_data[track.genre.id]['count']
-                else:
-                    genre_data[track.genre.id] = {
-                        'count': 1,
-                    }
-        top_genres = Genre.objects.none()
-        for id, data in genre_data.items():
-            if data['count'] == max:
-                top_genres = top_genres | Genre.objects.filter(id=id)
-        return top_genres
+        return Genre.objects.get_top_by_track_count(self.get_viewable_tracks_by_artist(user))
     
     class Meta:
         constraints = [
@@ -695,6 +824,10 @@ class Artist(models.Model, SharedModelMixin, ArtistMixin):
                 name='artist_name_or_beatport_id_is_not_null'
             ),
         ]
+        indexes = [
+            models.Index(fields=['metadata_state', 'id'], name='artist_metadata_state_id_idx'),
+            models.Index(fields=['metadata_state', 'last_scraped_at'], name='artist_state_scraped_idx'),
+        ]
         ordering = [
             'name',
         ]
@@ -719,13 +852,23 @@ class Genre(models.Model, SharedModelMixin, GenreMixin):
         help_text="Enter a dance music genre (e.g. Progressive House, Future Bass, etc.)"
     )
     public = models.BooleanField(default=False)
+    metadata_state = models.CharField(max_length=10, choices=METADATA_STATE_CHOICES, default='incomplete', editable=False)
+    last_scraped_at = models.DateTimeField('Last Scraped', null=True, blank=True, editable=False)
+    last_changed_at = models.DateTimeField('Last Changed', null=True, blank=True, editable=False)
     objects = SharedModelPermissionManager()
+    external_id_field = 'beatport_genre_id'
+    metadata_fields = ['name']
 
     def __str__(self):
         if self.name:
             return self.name
         else:
             return str(self.beatport_genre_id)
+
+    def save(self, *args, **kwargs):
+        self.metadata_state = self.build_metadata_state()
+        extend_update_fields(kwargs, 'metadata_state', [self.external_id_field] + self.metadata_fields)
+        super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         if self.name:
@@ -748,38 +891,8 @@ class Genre(models.Model, SharedModelMixin, GenreMixin):
             viewable_artists = viewable_artists | track.get_viewable_remix_artists_on_track(user)
         return viewable_artists.distinct()
     
-    def metadata_status(self):
-        external_id_none = False
-        any_metadata_none = False
-
-        # evaluate potentially unset fields
-        if self.beatport_genre_id is None:
-            external_id_none = True
-        if self.name is None:
-            any_metadata_none = True
-
-        # determine action statuses
-        return metadata_action_status(external_id_none, any_metadata_none, self.public)
-    
     def get_top_viewable_genre_artists(self, user):
-        artist_data = {}
-        max = 1
-        for track in self.get_viewable_tracks_in_genre(user):
-            track_artists = track.artist.all() | track.remix_artist.all()
-            for artist in track_artists.distinct():
-                if artist.id in artist_data:
-                    artist_data[artist.id]['count'] += 1
-                    if max < artist_data[artist.id]['count']:
-                        max = artist_data[artist.id]['count']
-                else:
-                    artist_data[artist.id] = {
-                        'count': 1,
-                    }
-        top_artists = Artist.objects.none()
-        for id, data in artist_data.items():
-            if data['count'] == max:
-                top_artists = top_artists | Artist.objects.filter(id=id)
-        return top_artists
+        return Artist.objects.get_top_by_track_count(self.get_viewable_tracks_in_genre(user))
 
     
     class Meta:
@@ -795,6 +908,10 @@ class Genre(models.Model, SharedModelMixin, GenreMixin):
                 name='genre_name_or_beatport_id_is_not_null'
             ),
         ]
+        indexes = [
+            models.Index(fields=['metadata_state', 'id'], name='genre_metadata_state_id_idx'),
+            models.Index(fields=['metadata_state', 'last_scraped_at'], name='genre_state_scraped_idx'),
+        ]
         ordering = [
             'name',
         ]
@@ -815,13 +932,23 @@ class Label(models.Model, SharedModelMixin, LabelMixin):
     beatport_label_id = models.BigIntegerField('Beatport Label ID', help_text='Label ID from Beatport, found in the label URL, which can be used to populate metadata', null=True)
     name = models.CharField(max_length=200, null=True)
     public = models.BooleanField(default=False)
+    metadata_state = models.CharField(max_length=10, choices=METADATA_STATE_CHOICES, default='incomplete', editable=False)
+    last_scraped_at = models.DateTimeField('Last Scraped', null=True, blank=True, editable=False)
+    last_changed_at = models.DateTimeField('Last Changed', null=True, blank=True, editable=False)
     objects = SharedModelPermissionManager()
+    external_id_field = 'beatport_label_id'
+    metadata_fields = ['name']
 
     def __str__(self):
         if self.name:
             return self.name
         else:
             return str(self.beatport_label_id)
+
+    def save(self, *args, **kwargs):
+        self.metadata_state = self.build_metadata_state()
+        extend_update_fields(kwargs, 'metadata_state', [self.external_id_field] + self.metadata_fields)
+        super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         if self.name:
@@ -830,19 +957,6 @@ class Label(models.Model, SharedModelMixin, LabelMixin):
             url_friendly_name = 'tbd'
         return reverse('label-detail', args=[str(self.id), url_friendly_name])
     
-    def metadata_status(self):
-        external_id_none = False
-        any_metadata_none = False
-
-        # evaluate potentially unset fields
-        if self.beatport_label_id is None:
-            external_id_none = True
-        if self.name is None:
-            any_metadata_none = True
-
-        # determine action statuses
-        return metadata_action_status(external_id_none, any_metadata_none, self.public)
-    
     def get_viewable_tracks_in_label(self, user):
         return Track.objects.get_queryset_can_view(user).filter(label=self)
     
@@ -850,24 +964,7 @@ class Label(models.Model, SharedModelMixin, LabelMixin):
         return self.get_viewable_tracks_in_label(user).count()
     
     def get_top_viewable_label_artists(self, user):
-        artist_data = {}
-        max = 1
-        for track in self.get_viewable_tracks_in_label(user):
-            track_artists = track.artist.all() | track.remix_artist.all()
-            for artist in track_artists.distinct():
-                if artist.id in artist_data:
-                    artist_data[artist.id]['count'] += 1
-                    if max < artist_data[artist.id]['count']:
-                        max = artist_data[artist.id]['count']
-                else:
-                    artist_data[artist.id] = {
-                        'count': 1,
-                    }
-        top_artists = Artist.objects.none()
-        for id, data in artist_data.items():
-            if data['count'] == max:
-                top_artists = top_artists | Artist.objects.filter(id=id)
-        return top_artists
+        return Artist.objects.get_top_by_track_count(self.get_viewable_tracks_in_label(user))
     
     class Meta:
         constraints = [
@@ -882,6 +979,10 @@ class Label(models.Model, SharedModelMixin, LabelMixin):
                 name='label_name_or_beatport_id_is_not_null'
             ),
         ]
+        indexes = [
+            models.Index(fields=['metadata_state', 'id'], name='label_metadata_state_id_idx'),
+            models.Index(fields=['metadata_state', 'last_scraped_at'], name='label_state_scraped_idx'),
+        ]
         ordering = [
             'name',
         ]
@@ -911,13 +1012,41 @@ class Track(models.Model, SharedModelMixin, TrackMixin):
     bpm = models.IntegerField(null=True)
     key = models.CharField(max_length=8, null=True)
     public = models.BooleanField(default=False)
-    objects = SharedModelPermissionManager()
-    
+    artist_display = models.CharField(max_length=1000, default='', editable=False)
+    remix_artist_display = models.CharField(max_length=1000, default='', editable=False)
+    full_display = models.CharField(max_length=1500, default='', editable=False)
+    metadata_state = models.CharField(max_length=10, choices=METADATA_STATE_CHOICES, default='incomplete', editable=False)
+    last_scraped_at = models.DateTimeField('Last Scraped', null=True, blank=True, editable=False)
+    last_changed_at = models.DateTimeField('Last Changed', null=True, blank=True, editable=False)
+    objects = TrackManager()
+    external_id_field = 'beatport_track_id'
+    metadata_fields = ['title', 'mix', 'length', 'bpm', 'key', 'released', 'genre', 'label']
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'genre_id' in instance.__dict__ and 'label_id' in instance.__dict__:
+            instance.loaded_related_ids = {'genre': instance.genre_id, 'label': instance.label_id}
+        return instance
+
     def __str__(self):
+        if self.full_display:
+            return self.full_display
+        else:
+            return self.build_full_display()
+
+    def save(self, *args, **kwargs):
+        self.full_display = self.build_full_display()
+        self.metadata_state = self.build_metadata_state()
+        extend_update_fields(kwargs, 'full_display', ['title', 'mix', 'beatport_track_id'])
+        extend_update_fields(kwargs, 'metadata_state', [self.external_id_field, 'artist_display', 'remix_artist_display'] + self.metadata_fields)
+        super().save(*args, **kwargs)
+
+    def build_full_display(self):
         if self.title:
             value = self.title
-            artists = self.display_artist()
-            remixers = self.display_remix_artist()
+            artists = self.artist_display
+            remixers = self.remix_artist_display
             mix = self.mix
             if mix is not None:
                 value += ' (' + mix + ')'
@@ -928,6 +1057,27 @@ class Track(models.Model, SharedModelMixin, TrackMixin):
             return value
         else:
             return str(self.beatport_track_id)
+
+    def build_metadata_state(self):
+        state = super().build_metadata_state()
+
+        # artists are read from the stored display strings to avoid counting the m2ms
+        if state == 'complete':
+            if len(self.artist_display) < 1:
+                state = 'incomplete'
+            elif 'remix' in self.mix.lower() and len(self.remix_artist_display) < 1:
+                state = 'incomplete'
+        return state
+
+    def display_artist(self):
+        return self.artist_display
+
+    display_artist.short_description = 'Artist'
+
+    def display_remix_artist(self):
+        return self.remix_artist_display
+
+    display_remix_artist.short_description = 'Remix Artist'
     
     def get_absolute_url(self):
         if self.title:
@@ -938,12 +1088,8 @@ class Track(models.Model, SharedModelMixin, TrackMixin):
     
     def get_viewable_artists_on_track(self, user):
         viewable_artists = Artist.objects.none()
-        if Track.objects.get_queryset_can_view(user).filter(id=self.id).count() > 0:
-            user_viewable_artists = Artist.objects.get_queryset_can_view(user)
-            for artist in self.artist.all():
-                viewable_artist = user_viewable_artists.get(id=artist.id)
-                if viewable_artist and artist == viewable_artist:
-                    viewable_artists = viewable_artists | user_viewable_artists.filter(id=artist.id)
+        if Track.objects.can_view(user, self):
+            viewable_artists = self.artist.filter(id__in=Artist.objects.can_view(user, self.artist.values_list('id', flat=True)))
         return viewable_artists.distinct()
     
     def display_viewable_artists(self, user):
@@ -953,12 +1099,8 @@ class Track(models.Model, SharedModelMixin, TrackMixin):
     
     def get_viewable_remix_artists_on_track(self, user):
         viewable_remix_artists = Artist.objects.none()
-        if Track.objects.get_queryset_can_view(user).filter(id=self.id).count() > 0:
-            user_viewable_remix_artists = Artist.objects.get_queryset_can_view(user)
-            for remix_artist in self.remix_artist.all():
-                viewable_remix_artist = user_viewable_remix_artists.get(id=remix_artist.id)
-                if viewable_remix_artist and remix_artist == viewable_remix_artist:
-                    viewable_remix_artists = viewable_remix_artists | user_viewable_remix_artists.filter(id=remix_artist.id)
+        if Track.objects.can_view(user, self):
+            viewable_remix_artists = self.remix_artist.filter(id__in=Artist.objects.can_view(user, self.remix_artist.values_list('id', flat=True)))
         return viewable_remix_artists.distinct()
     
     def display_viewable_remix_artists(self, user):
@@ -967,47 +1109,14 @@ class Track(models.Model, SharedModelMixin, TrackMixin):
     display_viewable_remix_artists.short_description = 'Remix Artist'
     
     def get_viewable_genre_on_track(self, user):
-        track = Track.objects.get_queryset_can_view(user).filter(id=self.id).first()
-        if track:
-            return track.genre
+        if Track.objects.can_view(user, self):
+            return self.genre
         else:
             return None
     
     def get_viewable_instances_of_track(self, user):
         return TrackInstance.objects.get_queryset_can_view(user).filter(track=self)
     
-    def metadata_status(self):
-        external_id_none = False
-        any_metadata_none = False
-
-        # evaluate potentially unset fields
-        if self.beatport_track_id is None:
-            external_id_none = True
-        if self.title is None:
-            any_metadata_none = True
-        if self.mix is None:
-            any_metadata_none = True
-        if self.length is None:
-            any_metadata_none = True
-        if self.bpm is None:
-            any_metadata_none = True
-        if self.key is None:
-            any_metadata_none = True
-        if self.released is None:
-            any_metadata_none = True
-        if self.genre is None:
-            any_metadata_none = True
-        if self.label is None:
-            any_metadata_none = True
-        if self.artist.count() < 1:
-            any_metadata_none = True
-        if self.mix:
-            if 'remix' in self.mix.lower() and self.remix_artist.count() < 1:
-                any_metadata_none = True
-
-        # determine action statuses
-        return metadata_action_status(external_id_none, any_metadata_none, self.public)
-
     class Meta:
         constraints = [
             UniqueConstraint(
@@ -1021,6 +1130,14 @@ class Track(models.Model, SharedModelMixin, TrackMixin):
                 name='track_title_or_beatport_id_is_not_null'
             ),
         ]
+        indexes = [
+            models.Index(fields=['title', 'id'], name='track_title_id_idx'),
+            models.Index(fields=['bpm', 'id'], name='track_bpm_id_idx'),
+            models.Index(fields=['key', 'id'], name='track_key_id_idx'),
+            models.Index(fields=['released', 'id'], name='track_released_id_idx'),
+            models.Index(fields=['metadata_state', 'id'], name='track_metadata_state_id_idx'),
+            models.Index(fields=['metadata_state', 'last_scraped_at'], name='track_state_scraped_idx'),
+        ]
         ordering = [
             'title',
         ]
@@ -1208,10 +1325,7 @@ class UserModelPermissionManager(models.Manager):
     def get_public_set(self):
         user_model = self.model.__name__.lower()
         if user_model == 'setlistitem':
-            queryset = self.none()
-            for setlistitem in self.get_queryset():
-                if setlistitem.setlist.public is True:
-                    queryset = queryset | SetListItem.objects.filter(id=setlistitem.id)
+            queryset = self.get_queryset().filter(setlist__public=True)
         else:
             queryset = self.get_queryset().filter(public=True)
         return queryset
@@ -1219,15 +1333,46 @@ class UserModelPermissionManager(models.Manager):
     def get_user_set(self, user):
         user_model = self.model.__name__.lower()
         if user_model == 'setlistitem':
-            queryset = self.none()
-            for setlistitem in self.get_queryset():
-                if setlistitem.setlist.user == user:
-                    queryset = queryset | SetListItem.objects.filter(id=setlistitem.id)
+            queryset = self.get_queryset().filter(setlist__user=user)
         else:
             queryset = self.get_queryset().filter(user=user)
         return queryset
 
+    def get_visible_set(self, user):
+        if user.is_anonymous:
+            raise PermissionDenied("You must login.")
+        return get_visible_set(user, self.model, self.build_queryset_can_view)
+
     def get_queryset_can_view(self, user):
+        return self.get_visible_set(user).queryset.all()
+
+    def can_view(self, user, obj_or_ids):
+        if user.is_anonymous:
+            raise PermissionDenied("You must login.")
+        user_model = self.model.__name__.lower()
+        view_public = user.has_perm('catalog.moxtool_can_view_public_'+user_model)
+        view_own = user.has_perm('catalog.moxtool_can_view_own_'+user_model)
+        single, visible, pending = split_visible_items(
+            obj_or_ids,
+            user.has_perm('catalog.moxtool_can_view_any_'+user_model),
+            lambda obj: (view_public and getattr(obj, 'public', None) is True) or (view_own and getattr(obj, 'user_id', None) == user.id),
+        )
+        if len(pending) > 0 and (view_public or view_own):
+            queryset = self.model.objects.none()
+            if view_public:
+                queryset = queryset | self.get_public_set()
+            if view_own:
+                queryset = queryset | self.get_user_set(user)
+            visible.update(queryset.filter(id__in=pending).values_list('id', flat=True))
+        return get_visible_result(single, visible)
+
+    def get_viewable_object(self, user, pk):
+        obj = self.get_queryset().get(id=pk)
+        if self.can_view(user, obj) == False:
+            raise self.model.DoesNotExist(self.model.__name__ + " matching query does not exist.")
+        return obj
+
+    def build_queryset_can_view(self, user):
         if user.is_anonymous:
             raise PermissionDenied("You must login.")
         else:
@@ -1241,10 +1386,7 @@ class UserModelPermissionManager(models.Manager):
                         queryset = queryset | self.get_public_set()
                     if user.has_perm('catalog.moxtool_can_view_own_'+user_model):
                         queryset = queryset | self.get_user_set(user)
-                    if queryset.count() >= 1:
-                        return queryset.distinct()
-                    else:
-                        return queryset
+                    return queryset.distinct()
             else:
                 raise ValidationError("The request for "+user_model+" is not a valid user model.")
 
@@ -1277,10 +1419,7 @@ class UserModelPermissionManager(models.Manager):
                         queryset = queryset | self.get_public_set()
                     if user.has_perm('catalog.moxtool_can_modify_own_'+user_model):
                         queryset = queryset | self.get_user_set(user)
-                    if queryset.count() >= 1:
-                        return queryset.distinct()
-                    else:
-                        return queryset
+                    return queryset.distinct()
             else:
                 raise ValidationError("The request for "+user_model+" is not a valid shared model.")
 
@@ -1373,6 +1512,18 @@ class TrackInstance(models.Model, SharedModelMixin, TrackInstanceMixin):
         help_text='Track rating',
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+
+        # remember what the library row pointed at, so saves that leave it alone skip the visibility update
+        if 'track_id' in instance.__dict__ and 'user_id' in instance.__dict__:
+            instance.loaded_library_key = instance.get_library_key()
+        return instance
+
+    def get_library_key(self):
+        return (self.track_id, self.user_id)
+
     def __str__(self):
         if self.track.title:
             return self.track.title
@@ -1456,35 +1607,14 @@ class SetList(models.Model, SharedModelMixin, SetListMixin):
         return reverse('setlist-detail', args=[str(self.id), url_friendly_name])
 
     def get_viewable_tracks_in_setlist(self, user):
-        ids = []
-        for setlistitem in SetListItem.objects.filter(setlist=self):
-            track = Track.objects.get_queryset_can_view(user).filter(id=setlistitem.track.id)
-            if track.count() == 1:
-                ids.append(track.first().id)
-        return Track.objects.filter(id__in=ids)
+        ids = Track.objects.get_queryset_can_view(user).values_list('id', flat=True)
+        return Track.objects.filter(id__in=SetListItem.objects.filter(setlist=self).values('track_id')).filter(id__in=ids)
     
     def count_viewable_tracks_in_setlist(self, user):
         return self.get_viewable_tracks_in_setlist(user).count()
     
     def get_top_viewable_setlist_artists(self, user):
-        artist_data = {}
-        max = 1
-        for track in self.get_viewable_tracks_in_setlist(user):
-            track_artists = track.artist.all() | track.remix_artist.all()
-            for artist in track_artists.distinct():
-                if artist.id in artist_data:
-                    artist_data[artist.id]['count'] += 1
-                    if max < artist_data[artist.id]['count']:
-                        max = artist_data[artist.id]['count']
-                else:
-                    artist_data[artist.id] = {
-                        'count': 1,
-                    }
-        top_artists = Artist.objects.none()
-        for id, data in artist_data.items():
-            if data['count'] == max:
-                top_artists = top_artists | Artist.objects.filter(id=id)
-        return top_artists
+        return Artist.objects.get_top_by_track_count(self.get_viewable_tracks_in_setlist(user))
 
     class Meta:
         constraints = [
@@ -1634,24 +1764,7 @@ class Playlist(models.Model, SharedModelMixin, PlaylistMixin):
         return self.get_viewable_tracks_in_playlist(user).count()
     
     def get_top_viewable_playlist_artists(self, user):
-        artist_data = {}
-        max = 1
-        for track in self.get_viewable_tracks_in_playlist(user):
-            track_artists = track.artist.all() | track.remix_artist.all()
-            for artist in track_artists.distinct():
-                if artist.id in artist_data:
-                    artist_data[artist.id]['count'] += 1
-                    if max < artist_data[artist.id]['count']:
-                        max = artist_data[artist.id]['count']
-                else:
-                    artist_data[artist.id] = {
-                        'count': 1,
-                    }
-        top_artists = Artist.objects.none()
-        for id, data in artist_data.items():
-            if data['count'] == max:
-                top_artists = top_artists | Artist.objects.filter(id=id)
-        return top_artists
+        return Artist.objects.get_top_by_track_count(self.get_viewable_tracks_in_playlist(user))
 
     class Meta:
         constraints = [
@@ -1674,6 +1787,149 @@ class Playlist(models.Model, SharedModelMixin, PlaylistMixin):
         )
 
 
+# materialized permissions
+
+
+class UserVisibilityManager(models.Manager):
+
+    def get_library_lookups(self, object_type):
+        if object_type == 'track':
+            return ['track_id']
+        elif object_type == 'artist':
+            return ['track__artist', 'track__remix_artist']
+        elif object_type == 'genre':
+            return ['track__genre']
+        elif object_type == 'label':
+            return ['track__label']
+        raise ValidationError("Data for "+object_type+" is not currently available.")
+
+    def get_library_pairs(self, object_type, user_ids=None):
+        trackinstances = TrackInstance.objects.filter(user__isnull=False)
+        if user_ids is not None:
+            trackinstances = trackinstances.filter(user_id__in=user_ids)
+        lookups = self.get_library_lookups(object_type)
+        pairs = set()
+        for lookup in lookups:
+            pairs.update(
+                trackinstances.filter(**{lookup+'__isnull': False}).values_list('user_id', lookup).distinct().order_by()
+            )
+        return pairs
+
+    def get_drift(self, object_type, user_ids=None):
+        existing_rows = self.filter(object_type=object_type)
+        if user_ids is not None:
+            existing_rows = existing_rows.filter(user_id__in=user_ids)
+        existing = set(existing_rows.values_list('user_id', 'object_id'))
+        expected = self.get_library_pairs(object_type, user_ids)
+        return expected - existing, existing - expected
+
+    def sync(self, user_ids=None, object_types=None):
+        drift = {}
+        for object_type in object_types or self.model.OBJECT_TYPES:
+            missing, stale = self.get_drift(object_type, user_ids)
+            self.bulk_create(
+                [self.model(user_id=user_id, object_type=object_type, object_id=object_id) for user_id, object_id in missing],
+                ignore_conflicts=True,
+            )
+            stale_by_user = {}
+            for user_id, object_id in stale:
+                stale_by_user.setdefault(user_id, []).append(object_id)
+            for user_id, object_ids in stale_by_user.items():
+                self.filter(user_id=user_id, object_type=object_type, object_id__in=object_ids).delete()
+            drift[object_type] = {
+                'missing': len(missing),
+                'stale': len(stale),
+            }
+        return drift
+
+    def add_track(self, user_id, track):
+        rows = [
+            self.model(user_id=user_id, object_type='track', object_id=track.id),
+        ]
+        for artist_id in track.artist.values_list('id', flat=True):
+            rows.append(self.model(user_id=user_id, object_type='artist', object_id=artist_id))
+        for remix_artist_id in track.remix_artist.values_list('id', flat=True):
+            rows.append(self.model(user_id=user_id, object_type='artist', object_id=remix_artist_id))
+        if track.genre_id is not None:
+            rows.append(self.model(user_id=user_id, object_type='genre', object_id=track.genre_id))
+        if track.label_id is not None:
+            rows.append(self.model(user_id=user_id, object_type='label', object_id=track.label_id))
+        self.bulk_create(rows, ignore_conflicts=True)
+
+    def sync_track_owners(self, track_ids, object_types=None):
+        user_ids = self.get_track_owner_ids(track_ids)
+        if user_ids:
+            self.sync(user_ids, object_types)
+
+    # incremental updates, touching only the given objects rather than whole libraries
+
+    def get_track_owner_ids(self, track_ids):
+        return set(TrackInstance.objects.filter(track_id__in=track_ids, user__isnull=False).values_list('user_id', flat=True))
+
+    def get_track_objects(self, track_ids):
+        objects = {
+            'track': set(track_ids),
+            'artist': set(),
+            'genre': set(),
+            'label': set(),
+        }
+        for through in [Track.artist.through, Track.remix_artist.through]:
+            objects['artist'].update(through.objects.filter(track_id__in=track_ids).values_list('artist_id', flat=True))
+        for genre_id, label_id in Track.objects.filter(id__in=track_ids).values_list('genre_id', 'label_id'):
+            objects['genre'].add(genre_id)
+            objects['label'].add(label_id)
+        return objects
+
+    def add_objects(self, user_ids, object_type, object_ids):
+        self.bulk_create(
+            [self.model(user_id=user_id, object_type=object_type, object_id=object_id) for user_id in user_ids for object_id in object_ids if object_id is not None],
+            ignore_conflicts=True,
+        )
+
+    def remove_unreachable(self, user_ids, object_type, object_ids):
+        object_ids = set(object_id for object_id in object_ids if object_id is not None)
+        if len(user_ids) == 0 or len(object_ids) == 0:
+            return
+        trackinstances = TrackInstance.objects.filter(user_id__in=user_ids)
+        reachable = set()
+        for lookup in self.get_library_lookups(object_type):
+            reachable.update(
+                trackinstances.filter(**{lookup+'__in': object_ids}).values_list('user_id', lookup).distinct().order_by()
+            )
+        for user_id in user_ids:
+            stale = [object_id for object_id in object_ids if (user_id, object_id) not in reachable]
+            if len(stale) > 0:
+                self.filter(user_id=user_id, object_type=object_type, object_id__in=stale).delete()
+
+    def remove_tracks(self, user_ids, track_ids):
+        for object_type, object_ids in self.get_track_objects(track_ids).items():
+            self.remove_unreachable(user_ids, object_type, object_ids)
+
+
+class UserVisibility(models.Model):
+    OBJECT_TYPES = ['artist', 'genre', 'label', 'track']
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    object_type = models.CharField(max_length=10)
+    object_id = models.BigIntegerField()
+    objects = UserVisibilityManager()
+
+    def __str__(self):
+        return str(self.user) + ' can view ' + self.object_type + ' ' + str(self.object_id)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'object_type', 'object_id'],
+                name='uservisibility_unique_on_user_type_and_object',
+            ),
+        ]
+        ordering = [
+            'user',
+            'object_type',
+            'object_id',
+        ]
+
+
 # database management
 
 
@@ -1830,9 +2086,456 @@ class TrackBacklog(models.Model):
         ]
 
 
+class ProbedRangeManager(models.Manager):
+
+    def get_ranges(self, object_type):
+        return self.filter(object_type=object_type).order_by('start', 'end').values_list('start', 'end')
+
+
+class ProbedRange(models.Model):
+    object_type = models.CharField(max_length=10)
+    start = models.BigIntegerField()
+    end = models.BigIntegerField()
+    datetime_probed = models.DateTimeField('Date & Time Probed', auto_now=True)
+    objects = ProbedRangeManager()
+
+    def __str__(self):
+        return self.object_type + ' ' + str(self.start) + '-' + str(self.end)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['object_type', 'start'],
+                name='probedrange_unique_on_type_and_start',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['object_type', 'end'], name='probedrange_type_end_idx'),
+        ]
+        ordering = [
+            'object_type',
+            'start',
+        ]
+
+
+class ArchivedPageManager(models.Manager):
+
+    def record(self, object_type, external_id, content_hash):
+        page, created = self.update_or_create(
+            object_type=object_type,
+            external_id=external_id,
+            defaults={
+                'content_hash': content_hash,
+                'datetime_fetched': timezone.now(),
+            },
+        )
+        return page
+
+    def mark_saved(self, object_type, external_ids):
+        return self.filter(object_type=object_type, external_id__in=external_ids).exclude(parsed_hash=F('content_hash')).update(parsed_hash=F('content_hash'))
+
+
+class ArchivedPage(models.Model):
+    object_type = models.CharField(max_length=10)
+    external_id = models.BigIntegerField('External ID')
+    content_hash = models.CharField(max_length=64)
+    parsed_hash = models.CharField(max_length=64, blank=True, default='')
+    datetime_fetched = models.DateTimeField('Date & Time Fetched', default=timezone.now)
+    objects = ArchivedPageManager()
+
+    def __str__(self):
+        return self.object_type + ' ' + str(self.external_id) + ' (' + self.content_hash[:12] + ')'
+
+    def is_unchanged(self):
+        return self.parsed_hash == self.content_hash
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['object_type', 'external_id'],
+                name='archivedpage_unique_on_type_and_external_id',
+            ),
+        ]
+        ordering = [
+            'object_type',
+            'external_id',
+        ]
+
+
+class WatermarkManager(models.Manager):
+
+    def get_value(self, name):
+        value = self.filter(name=name).values_list('value', flat=True).first()
+        if value is None:
+            return 0
+        return value
+
+    def advance(self, name, value):
+        watermark, created = self.get_or_create(name=name, defaults={'value': value})
+        if created == False:
+            self.filter(name=name, value__lt=value).update(value=value, datetime_updated=timezone.now())
+
+
+class Watermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    datetime_updated = models.DateTimeField('Date & Time Updated', auto_now=True)
+    objects = WatermarkManager()
+
+    def __str__(self):
+        return self.name + ': ' + str(self.value)
+
+    class Meta:
+        ordering = [
+            'name',
+        ]
+
+
+class ScrapeJobManager(models.Manager):
+
+    def enqueue(self, object_type, ids, priority=0):
+        ids = list(dict.fromkeys(ids))
+        now = timezone.now()
+        for i in range(0, len(ids), 1000):
+            chunk = ids[i:i+1000]
+            self.bulk_create(
+                [self.model(object_type=object_type, external_id=id, priority=priority, next_attempt_at=now) for id in chunk],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            jobs = self.filter(object_type=object_type, external_id__in=chunk)
+            jobs.filter(status__in=['done', 'failed']).update(status='queued', priority=priority, attempts=0, next_attempt_at=now, last_error='')
+            jobs.filter(priority__lt=priority).update(priority=priority)
+
+    def get_available(self, object_types=None, now=None):
+        if now is None:
+            now = timezone.now()
+        available = self.filter(
+            Q(status='queued', next_attempt_at__lte=now) | Q(status='leased', leased_until__lt=now)
+        )
+        if object_types is not None:
+            available = available.filter(object_type__in=object_types)
+        return available
+
+    def try_claim(self, id, owner, lease_seconds, object_types=None):
+        now = timezone.now()
+        return self.get_available(object_types, now).filter(id=id).update(
+            status='leased',
+            lease_owner=owner,
+            leased_until=now + datetime.timedelta(seconds=lease_seconds),
+            attempts=F('attempts') + 1,
+        ) == 1
+
+    def claim(self, owner, limit=1, object_types=None, lease_seconds=300):
+        available = self.get_available(object_types).order_by('-priority', 'next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                ids = list(available.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+                now = timezone.now()
+                self.filter(id__in=ids).update(
+                    status='leased',
+                    lease_owner=owner,
+                    leased_until=now + datetime.timedelta(seconds=lease_seconds),
+                    attempts=F('attempts') + 1,
+                )
+        else:
+            # compare-and-swap: a candidate is ours only if it is still available when updated,
+            # so keep taking fresh windows until we have enough or the queue runs dry
+            ids = []
+            lost = []
+            while len(ids) < limit:
+                window = list(available.exclude(id__in=lost).values_list('id', flat=True)[:(limit - len(ids)) * 4])
+                if len(window) == 0:
+                    break
+                for id in window:
+                    if self.try_claim(id, owner, lease_seconds, object_types):
+                        ids.append(id)
+                    else:
+                        lost.append(id)
+                    if len(ids) >= limit:
+                        break
+        return list(self.filter(id__in=ids, lease_owner=owner).order_by('-priority', 'next_attempt_at', 'id'))
+
+
+class ScrapeJob(models.Model):
+    PRIORITY_RANDOM = 0
+    PRIORITY_REFRESH = 10
+    PRIORITY_BACKLOG = 20
+    PRIORITY_USER = 30
+    BACKOFF_BASE = 60
+    BACKOFF_MAX = 21600
+
+    STATUS_CHOICES = [
+        ('queued', 'queued'),
+        ('leased', 'leased'),
+        ('done', 'done'),
+        ('failed', 'failed'),
+    ]
+
+    object_type = models.CharField(max_length=10)
+    external_id = models.BigIntegerField('External ID')
+    priority = models.IntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    next_attempt_at = models.DateTimeField('Next Attempt', default=timezone.now)
+    leased_until = models.DateTimeField('Leased Until', null=True, blank=True)
+    lease_owner = models.CharField(max_length=100, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    datetime_created = models.DateTimeField('Date & Time Created', auto_now_add=True)
+    datetime_updated = models.DateTimeField('Date & Time Updated', auto_now=True)
+    objects = ScrapeJobManager()
+
+    def __str__(self):
+        return self.object_type + ' ' + str(self.external_id) + ' (' + self.status + ')'
+
+    def get_backoff(self):
+        return min(self.BACKOFF_BASE * 2 ** max(self.attempts - 1, 0), self.BACKOFF_MAX)
+
+    def get_leased(self):
+        return ScrapeJob.objects.filter(id=self.id, status='leased', lease_owner=self.lease_owner)
+
+    def extend_lease(self, lease_seconds=300):
+        self.leased_until = timezone.now() + datetime.timedelta(seconds=lease_seconds)
+        return self.get_leased().update(leased_until=self.leased_until, datetime_updated=timezone.now()) == 1
+
+    def complete(self):
+        self.status = 'done'
+        self.leased_until = None
+        return self.get_leased().update(status='done', leased_until=None, last_error='', datetime_updated=timezone.now()) == 1
+
+    def fail(self, error=''):
+        now = timezone.now()
+        if self.attempts >= self.max_attempts:
+            self.status = 'failed'
+        else:
+            self.status = 'queued'
+            self.next_attempt_at = now + datetime.timedelta(seconds=self.get_backoff() * random.uniform(0.8, 1.2))
+        self.leased_until = None
+        self.last_error = str(error)
+        return self.get_leased().update(
+            status=self.status,
+            next_attempt_at=self.next_attempt_at,
+            leased_until=None,
+            last_error=self.last_error,
+            datetime_updated=now,
+        ) == 1
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['object_type', 'external_id'],
+                name='scrapejob_unique_on_type_and_external_id',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', '-priority', 'next_attempt_at', 'id'], name='scrapejob_claim_idx'),
+            models.Index(fields=['status', 'leased_until'], name='scrapejob_lease_idx'),
+        ]
+        ordering = [
+            '-priority',
+            'next_attempt_at',
+            'id',
+        ]
+
+
+
+class UploadJobManager(models.Manager):
+
+    def get_available(self, now=None):
+        if now is None:
+            now = timezone.now()
+        return self.filter(Q(status='queued', next_attempt_at__lte=now) | Q(status='running', leased_until__lt=now))
+
+    def get_pending(self, now=None):
+        if now is None:
+            now = timezone.now()
+        return self.filter(Q(status='queued') | Q(status='running', leased_until__lt=now))
+
+    def try_claim(self, id, owner, lease_seconds=300):
+        now = timezone.now()
+        return self.get_available(now).filter(id=id).update(
+            status='running',
+            lease_owner=owner,
+            leased_until=now + datetime.timedelta(seconds=lease_seconds),
+            attempts=F('attempts') + 1,
+            datetime_started=now,
+        ) == 1
+
+    def claim(self, owner, lease_seconds=300):
+        # compare-and-swap, as for scrape jobs: a candidate is ours only if it is still available when updated
+        lost = []
+        while True:
+            window = list(self.get_available().exclude(id__in=lost).order_by('datetime_created', 'id').values_list('id', flat=True)[:4])
+            if len(window) == 0:
+                return None
+            for id in window:
+                if self.try_claim(id, owner, lease_seconds):
+                    return self.get(id=id)
+                lost.append(id)
+
+
+class UploadJob(models.Model):
+    BACKOFF_BASE = 30
+    BACKOFF_MAX = 600
+
+    KIND_CHOICES = [
+        ('bulk_upload', 'bulk upload'),
+        ('library_import', 'library import'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'queued'),
+        ('running', 'running'),
+        ('done', 'done'),
+        ('failed', 'failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    processed = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    next_attempt_at = models.DateTimeField('Next Attempt', default=timezone.now)
+    leased_until = models.DateTimeField('Leased Until', null=True, blank=True)
+    lease_owner = models.CharField(max_length=100, blank=True, default='')
+    message = models.TextField(blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    datetime_created = models.DateTimeField('Date & Time Created', auto_now_add=True)
+    datetime_started = models.DateTimeField('Date & Time Started', null=True, blank=True)
+    datetime_finished = models.DateTimeField('Date & Time Finished', null=True, blank=True)
+    datetime_updated = models.DateTimeField('Date & Time Updated', auto_now=True)
+    objects = UploadJobManager()
+
+    def __str__(self):
+        return self.get_kind_display() + ' ' + str(self.id) + ' (' + self.status + ')'
+
+    def get_absolute_url(self):
+        return reverse('upload-job-detail', args=[str(self.id)])
+
+    def get_percent(self):
+        if self.status == 'done':
+            return 100
+        if self.total <= 0:
+            return 0
+        return min(round(self.processed / self.total * 100), 100)
+
+    def get_status(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'processed': self.processed,
+            'total': self.total,
+            'percent': self.get_percent(),
+            'message': self.message,
+            'datetime_created': self.datetime_created,
+            'datetime_started': self.datetime_started,
+            'datetime_finished': self.datetime_finished,
+        }
+
+    def get_running(self):
+        return UploadJob.objects.filter(id=self.id, status='running', lease_owner=self.lease_owner)
+
+    def get_backoff(self):
+        return min(self.BACKOFF_BASE * 2 ** max(self.attempts - 1, 0), self.BACKOFF_MAX)
+
+    def update_progress(self, processed, total, lease_seconds=300):
+        self.processed = processed
+        self.total = total
+        self.leased_until = timezone.now() + datetime.timedelta(seconds=lease_seconds)
+        return self.get_running().update(processed=processed, total=total, leased_until=self.leased_until, datetime_updated=timezone.now()) == 1
+
+    def complete(self, message=''):
+        now = timezone.now()
+        self.status = 'done'
+        self.processed = max(self.processed, self.total)
+        self.leased_until = None
+        self.message = message
+        self.datetime_finished = now
+        return self.get_running().update(
+            status='done',
+            processed=self.processed,
+            leased_until=None,
+            message=message,
+            datetime_finished=now,
+            datetime_updated=now,
+        ) == 1
+
+    def fail(self, error='', details=''):
+        now = timezone.now()
+        self.status = 'failed' if self.attempts >= self.max_attempts else 'queued'
+        if self.status == 'queued':
+            self.next_attempt_at = now + datetime.timedelta(seconds=self.get_backoff())
+        self.leased_until = None
+        self.message = str(error)
+        self.error = details or self.message
+        self.datetime_finished = now if self.status == 'failed' else None
+        return self.get_running().update(
+            status=self.status,
+            next_attempt_at=self.next_attempt_at,
+            leased_until=None,
+            message=self.message,
+            error=self.error,
+            datetime_finished=self.datetime_finished,
+            datetime_updated=now,
+        ) == 1
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'datetime_created', 'id'], name='uploadjob_claim_idx'),
+        ]
+        ordering = [
+            '-datetime_created',
+        ]
+
 # functions
 
 
+def split_visible_items(obj_or_ids, view_any, visible_without_query):
+    single = obj_or_ids is None or isinstance(obj_or_ids, (models.Model, int, str, uuid.UUID))
+    items = [obj_or_ids] if single else list(obj_or_ids)
+    visible = set()
+    pending = set()
+    for item in items:
+        if item is None:
+            continue
+        pk = item.pk if isinstance(item, models.Model) else item
+        if view_any or (isinstance(item, models.Model) and visible_without_query(item)):
+            visible.add(pk)
+        else:
+            pending.add(pk)
+    return single, visible, pending
+
+
+def get_visible_result(single, visible):
+    if single:
+        return len(visible) > 0
+    return visible
+
+
+def extend_update_fields(kwargs, field_name, trigger_fields):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and field_name not in update_fields:
+        if len(set(update_fields) & set(trigger_fields)) > 0:
+            kwargs['update_fields'] = list(update_fields) + [field_name]
+
+
+def metadata_state(external_id_none, any_metadata_none):
+    if external_id_none == True:
+        return 'unlinked'
+    elif any_metadata_none == True:
+        return 'incomplete'
+    else:
+        return 'complete'
+
+
+def metadata_state_action_status(state, public):
+    return metadata_action_status(state == 'unlinked', state != 'complete', public)
+
+
 def metadata_action_status(external_id_none, any_metadata_none, public):
     status = {}
     if external_id_none == False:
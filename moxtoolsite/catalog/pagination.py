@@ -0,0 +1,96 @@
+from django.db.models import F, Q
+import base64, json
+
+
+# keyset pagination, ordered by (field, id) so page cost does not grow with the table
+
+
+def encode_cursor(value, pk):
+    if value is not None and not isinstance(value, (str, int, float)):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+
+
+def decode_cursor(cursor, field):
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return field.to_python(value), int(pk)
+    except Exception:
+        return None
+
+
+class KeysetPage:
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+
+    def __init__(self, queryset, field_name, per_page=20, descending=False):
+        self.queryset = queryset
+        self.field_name = field_name
+        self.field = queryset.model._meta.get_field(field_name)
+        self.per_page = per_page
+        self.descending = descending
+
+    def get_ordering(self, descending, backwards=False):
+        nulls = {'nulls_first': True} if backwards else {'nulls_last': True}
+        if descending != backwards:
+            return [F(self.field_name).desc(**nulls), F('id').desc()]
+        return [F(self.field_name).asc(**nulls), F('id').asc()]
+
+    def get_seek_filter(self, value, pk, descending):
+        after_id = Q(id__lt=pk) if descending else Q(id__gt=pk)
+        if value is None:
+            return Q(**{self.field_name+'__isnull': True}) & after_id
+        after_value = Q(**{self.field_name+('__lt' if descending else '__gt'): value})
+        return after_value | (Q(**{self.field_name: value}) & after_id) | Q(**{self.field_name+'__isnull': True})
+
+    def get_seek_back_filter(self, value, pk, descending):
+        before_id = Q(id__gt=pk) if descending else Q(id__lt=pk)
+        if value is None:
+            return Q(**{self.field_name+'__isnull': False}) | before_id
+        before_value = Q(**{self.field_name+('__gt' if descending else '__lt'): value})
+        return (before_value | (Q(**{self.field_name: value}) & before_id)) & Q(**{self.field_name+'__isnull': False})
+
+    def get_cursor(self, obj):
+        return encode_cursor(getattr(obj, self.field_name), obj.id)
+
+    def page(self, after=None, before=None):
+        queryset = self.queryset
+        backwards = False
+        after_cursor = decode_cursor(after, self.field) if after else None
+        before_cursor = decode_cursor(before, self.field) if before else None
+        if after_cursor is not None:
+            queryset = queryset.filter(self.get_seek_filter(*after_cursor, self.descending))
+        elif before_cursor is not None:
+            queryset = queryset.filter(self.get_seek_back_filter(*before_cursor, self.descending))
+            backwards = True
+        rows = list(queryset.order_by(*self.get_ordering(self.descending, backwards))[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        next_cursor = None
+        previous_cursor = None
+        if len(rows) > 0:
+            if has_more or backwards:
+                next_cursor = self.get_cursor(rows[-1])
+            if (backwards and has_more) or (not backwards and after_cursor is not None):
+                previous_cursor = self.get_cursor(rows[0])
+        return KeysetPage(rows, next_cursor, previous_cursor)
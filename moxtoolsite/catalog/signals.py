@@ -0,0 +1,143 @@
+from catalog.models import Artist, Genre, Label, Track, TrackInstance, UserVisibility
+from catalog.models import ArtistBacklog, GenreBacklog, LabelBacklog, ScrapeJob, TrackBacklog
+from catalog.visibility import invalidate_visibility
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+
+# visibility cache
+
+
+@receiver(post_save, sender=TrackInstance)
+@receiver(post_delete, sender=TrackInstance)
+def trackinstance_changed(sender, instance, **kwargs):
+    invalidate_visibility(instance.user_id)
+
+
+# materialized user visibility
+
+
+@receiver(post_save, sender=TrackInstance)
+def trackinstance_saved(sender, instance, created, update_fields=None, **kwargs):
+    loaded_track_id, loaded_user_id = getattr(instance, 'loaded_library_key', (None, None))
+    instance.loaded_library_key = instance.get_library_key()
+    if created:
+        if instance.user_id is not None:
+            UserVisibility.objects.add_track(instance.user_id, instance.track)
+        return
+    if update_fields is not None and 'track' not in update_fields and 'user' not in update_fields:
+        return
+    if (loaded_track_id, loaded_user_id) == instance.get_library_key():
+        return
+
+    # the row moved to another track or user, so drop what only the old one reached and add the new one
+    if loaded_track_id is None:
+        if instance.user_id is not None:
+            UserVisibility.objects.sync([instance.user_id])
+        return
+    if loaded_user_id is not None:
+        UserVisibility.objects.remove_tracks([loaded_user_id], [loaded_track_id])
+    if instance.user_id is not None:
+        UserVisibility.objects.add_track(instance.user_id, instance.track)
+
+
+@receiver(post_delete, sender=TrackInstance)
+def trackinstance_deleted(sender, instance, **kwargs):
+    if instance.user_id is not None:
+        UserVisibility.objects.remove_tracks([instance.user_id], [instance.track_id])
+
+
+@receiver(m2m_changed, sender=Track.artist.through)
+@receiver(m2m_changed, sender=Track.remix_artist.through)
+def track_artists_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance.cleared_ids = set(sender.objects.filter(artist_id=instance.pk).values_list('track_id', flat=True))
+        else:
+            instance.cleared_ids = set(sender.objects.filter(track_id=instance.pk).values_list('artist_id', flat=True))
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+    changed_ids = getattr(instance, 'cleared_ids', set()) if pk_set is None else pk_set
+    if reverse:
+        track_ids = list(changed_ids)
+        artist_ids = [instance.pk]
+    else:
+        track_ids = [instance.pk]
+        artist_ids = list(changed_ids)
+
+    # only the changed artists can gain or lose visibility
+    user_ids = UserVisibility.objects.get_track_owner_ids(track_ids)
+    if len(user_ids) > 0 and len(artist_ids) > 0:
+        if action == 'post_add':
+            UserVisibility.objects.add_objects(user_ids, 'artist', artist_ids)
+        else:
+            UserVisibility.objects.remove_unreachable(user_ids, 'artist', artist_ids)
+    Track.objects.refresh_display(track_ids)
+
+
+@receiver(post_save, sender=Track)
+def track_saved(sender, instance, created, update_fields=None, **kwargs):
+    loaded_ids = getattr(instance, 'loaded_related_ids', None)
+    instance.loaded_related_ids = {'genre': instance.genre_id, 'label': instance.label_id}
+    if created:
+        return
+    if update_fields is not None and 'genre' not in update_fields and 'label' not in update_fields:
+        return
+    if loaded_ids is None:
+        UserVisibility.objects.sync_track_owners([instance.pk], ['genre', 'label'])
+        return
+    changed = [object_type for object_type, object_id in instance.loaded_related_ids.items() if loaded_ids[object_type] != object_id]
+    if len(changed) == 0:
+        return
+    user_ids = UserVisibility.objects.get_track_owner_ids([instance.pk])
+    for object_type in changed:
+        UserVisibility.objects.add_objects(user_ids, object_type, [instance.loaded_related_ids[object_type]])
+        UserVisibility.objects.remove_unreachable(user_ids, object_type, [loaded_ids[object_type]])
+
+
+@receiver(post_delete, sender=Artist)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Label)
+@receiver(post_delete, sender=Track)
+def shared_model_deleted(sender, instance, **kwargs):
+    UserVisibility.objects.filter(object_type=sender.__name__.lower(), object_id=instance.pk).delete()
+
+
+# denormalized track display
+
+
+@receiver(post_save, sender=Artist)
+def artist_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is None or 'name' in update_fields or 'beatport_artist_id' in update_fields:
+        Track.objects.refresh_display(get_artist_track_ids(instance))
+
+
+@receiver(pre_delete, sender=Artist)
+def artist_deleting(sender, instance, **kwargs):
+    instance.deleted_track_ids = get_artist_track_ids(instance)
+
+
+@receiver(post_delete, sender=Artist)
+def artist_deleted(sender, instance, **kwargs):
+    Track.objects.refresh_display(getattr(instance, 'deleted_track_ids', []))
+
+
+def get_artist_track_ids(artist):
+    track_ids = set(Track.artist.through.objects.filter(artist_id=artist.pk).values_list('track_id', flat=True))
+    track_ids.update(Track.remix_artist.through.objects.filter(artist_id=artist.pk).values_list('track_id', flat=True))
+    return track_ids
+
+
+# scrape job queue
+
+
+@receiver(post_save, sender=ArtistBacklog)
+@receiver(post_save, sender=GenreBacklog)
+@receiver(post_save, sender=LabelBacklog)
+@receiver(post_save, sender=TrackBacklog)
+def backlog_saved(sender, instance, created, **kwargs):
+    if created:
+        object_type = sender.__name__.replace('Backlog', '').lower()
+        ScrapeJob.objects.enqueue(object_type, [instance.get_id()], ScrapeJob.PRIORITY_BACKLOG)
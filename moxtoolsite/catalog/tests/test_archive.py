@@ -0,0 +1,146 @@
+from catalog.archive import PageArchive, extract_archived_page, extract_page
+from catalog.fetchers import FileFetcher
+from catalog.freshness import get_stale_ids
+from catalog.models import ArchivedPage, Artist, ScrapeJob, Track
+from catalog import utils
+from catalog.utils import object_model_processor, scrape_artist
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from io import StringIO
+from unittest import mock
+import datetime, os, shutil, tempfile
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def read_fixture(object_name, id):
+    with open(os.path.join(FIXTURE_DIR, object_name, str(id) + '.html'), encoding='utf-8') as file:
+        return file.read()
+
+
+class PageArchiveTest(TestCase):
+
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        self.archive = PageArchive(self.archive_dir)
+        settings_override = override_settings(PAGE_ARCHIVE_DIR=self.archive_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def archive_fixture(self, object_name, id):
+        return ArchivedPage.objects.record(object_name, id, self.archive.put(read_fixture(object_name, id)))
+
+    def test_put_and_get(self):
+        html = read_fixture('track', 20000001)
+        content_hash = self.archive.put(html)
+        self.assertEqual(content_hash, self.archive.get_hash(html))
+        self.assertEqual(self.archive.put(html), content_hash)
+        self.assertEqual(self.archive.get(content_hash), html)
+        path = self.archive.get_path(content_hash)
+        self.assertTrue(path.startswith(os.path.join(self.archive_dir, content_hash[:2])))
+        self.assertLess(os.path.getsize(path), len(html.encode('utf-8')))
+        result = extract_archived_page((self.archive_dir, 'track', 20000001, content_hash))
+        self.assertEqual(result[3]['title'], 'Mox Groove')
+        self.assertIsNone(result[4])
+
+    def test_scrape_skips_unchanged_page(self):
+        with mock.patch('catalog.utils.get_fetcher', return_value=FileFetcher(FIXTURE_DIR)):
+            result = scrape_artist(100001, 'fixture-artist')
+            self.assertEqual(result['count'], 1)
+            page = ArchivedPage.objects.get(object_type='artist', external_id=100001)
+            self.assertFalse(page.is_unchanged())
+
+            # nothing was saved, so the same page is parsed again
+            Artist.objects.create(beatport_artist_id=100001)
+            result = scrape_artist(100001, 'fixture-artist')
+            self.assertEqual(result['count'], 1)
+            self.assertTrue(object_model_processor(result['data']))
+            page.refresh_from_db()
+            self.assertTrue(page.is_unchanged())
+            result = scrape_artist(100001, 'fixture-artist', refresh=True)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['count'], 0)
+        self.assertEqual(result['message'], 'Process Skipped: artist page is unchanged')
+
+    def test_scrape_reparses_unchanged_page_of_incomplete_object(self):
+        with mock.patch('catalog.utils.get_fetcher', return_value=FileFetcher(FIXTURE_DIR)):
+            self.assertTrue(object_model_processor(scrape_artist(100001, 'fixture-artist')['data']))
+            Artist.objects.filter(beatport_artist_id=100001).update(metadata_state='incomplete')
+            result = scrape_artist(100001, 'fixture-artist', refresh=True)
+        self.assertEqual(result['count'], 1)
+
+    def test_reparse(self):
+        for object_name, id in [('artist', 100001), ('artist', 100002), ('artist', 100003), ('genre', 11), ('label', 2001), ('track', 20000001), ('track', 20000002)]:
+            self.archive_fixture(object_name, id)
+        out = StringIO()
+        call_command('reparse', '--workers', '2', stdout=out)
+        self.assertIn('Reparse complete: 7 of 7 pages processed, 0 errors', out.getvalue())
+        track = Track.objects.get(beatport_track_id=20000002)
+        self.assertEqual(list(track.remix_artist.values_list('beatport_artist_id', flat=True)), [100003])
+        self.assertEqual(ArchivedPage.objects.exclude(parsed_hash='').count(), 7)
+        out = StringIO()
+        call_command('reparse', '--workers', '1', stdout=out)
+        self.assertIn('Reparse complete: 0 of 0 pages processed', out.getvalue())
+        out = StringIO()
+        call_command('reparse', '--workers', '1', '--types', 'track', '--all', stdout=out)
+        self.assertIn('Reparse complete: 2 of 2 pages processed', out.getvalue())
+
+    def test_reparse_keeps_fetch_time(self):
+        fetched = timezone.now() - datetime.timedelta(days=90)
+        for object_name, id in [('artist', 100001), ('artist', 100002), ('artist', 100003), ('genre', 11), ('label', 2001), ('track', 20000002)]:
+            self.archive_fixture(object_name, id)
+        ArchivedPage.objects.update(datetime_fetched=fetched)
+        call_command('reparse', '--workers', '1', stdout=StringIO())
+        track = Track.objects.get(beatport_track_id=20000002)
+        self.assertEqual(track.last_scraped_at, fetched)
+        self.assertEqual(track.last_changed_at, fetched)
+        self.assertEqual(Artist.objects.get(beatport_artist_id=100001).last_scraped_at, fetched)
+        self.assertIn(20000002, get_stale_ids('track', 10))
+
+    def test_reparse_queues_unresolved_tracks(self):
+        self.archive_fixture('track', 20000001)
+        out = StringIO()
+        call_command('reparse', '--workers', '1', stdout=out)
+        self.assertIn('1 tracks queued for linked objects', out.getvalue())
+        self.assertFalse(Track.objects.filter(beatport_track_id=20000001).exists())
+        self.assertTrue(ScrapeJob.objects.filter(object_type='track', external_id=20000001, status='queued').exists())
+        self.assertEqual(ArchivedPage.objects.get(external_id=20000001).parsed_hash, '')
+
+    def test_reparse_counts_bad_pages(self):
+        for object_name, id in [('genre', 11), ('track', 20000001)]:
+            self.archive_fixture(object_name, id)
+
+        def extract_broken(task):
+            root, object_name, id, content_hash = task
+            data = extract_page(object_name, read_fixture(object_name, id), id)
+            if object_name == 'track':
+                data['length'] = None
+            return (object_name, id, content_hash, data, None)
+
+        out = StringIO()
+        with mock.patch('catalog.management.commands.reparse.extract_archived_page', side_effect=extract_broken):
+            call_command('reparse', '--workers', '1', stdout=out)
+        self.assertIn('Error reparsing track 20000001: invalid data', out.getvalue())
+        self.assertIn('Reparse complete: 1 of 2 pages processed, 1 errors', out.getvalue())
+        self.assertEqual(ArchivedPage.objects.get(object_type='genre').parsed_hash, ArchivedPage.objects.get(object_type='genre').content_hash)
+
+    def test_reparse_isolates_failed_processing(self):
+        for id in [100001, 100002]:
+            self.archive_fixture('artist', id)
+        process_named_objects = utils.process_named_objects
+
+        def process_failing(object_name, data, scraped_at=None):
+            if '100002' in data:
+                raise ValueError('bad artist')
+            return process_named_objects(object_name, data, scraped_at)
+
+        out = StringIO()
+        with mock.patch('catalog.utils.process_named_objects', side_effect=process_failing):
+            call_command('reparse', '--workers', '1', stdout=out)
+        self.assertIn('Error reparsing artist 100002: processing unsuccessful', out.getvalue())
+        self.assertIn('Reparse complete: 1 of 2 pages processed, 1 errors', out.getvalue())
+        self.assertTrue(Artist.objects.filter(beatport_artist_id=100001).exists())
+        self.assertEqual(ArchivedPage.objects.get(external_id=100002).parsed_hash, '')
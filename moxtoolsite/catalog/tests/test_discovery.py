@@ -0,0 +1,138 @@
+from catalog.discovery import DiscoveryEngine, IntervalSet
+from catalog.models import Artist, ArtistBacklog, Artist404, ProbedRange, Track, Track404, TrackBacklog
+from catalog.utils import object_lookup, random_scraper
+from django.test import TestCase
+from django.utils import timezone
+from unittest import mock
+import random
+
+
+class IntervalSetTest(TestCase):
+
+    def test_from_sorted_ids(self):
+        interval_set = IntervalSet.from_sorted_ids([1, 2, 2, 3, 7, 9, 10])
+        self.assertEqual(interval_set.starts, [1, 7, 9])
+        self.assertEqual(interval_set.ends, [3, 7, 10])
+        self.assertEqual(len(interval_set), 6)
+        for id in [1, 2, 3, 7, 9, 10]:
+            self.assertIn(id, interval_set)
+        for id in [0, 4, 8, 11]:
+            self.assertNotIn(id, interval_set)
+
+    def test_add_range_merges_neighbours(self):
+        interval_set = IntervalSet.from_sorted_ids([1, 5, 9])
+        interval_set.add_range(2, 4)
+        self.assertEqual(interval_set.starts, [1, 9])
+        self.assertEqual(interval_set.ends, [5, 9])
+        interval_set.add(8)
+        interval_set.add_range(20, 30)
+        interval_set.add_range(6, 25)
+        self.assertEqual(interval_set.starts, [1])
+        self.assertEqual(interval_set.ends, [30])
+
+    def test_nth_unseen_matches_brute_force(self):
+        rng = random.Random(5)
+        known = sorted(rng.sample(range(1, 200), 120))
+        interval_set = IntervalSet.from_sorted_ids(known)
+        for low in [1, 17, 50, 150]:
+            unseen = [id for id in range(low, 220) if id not in known]
+            self.assertEqual(interval_set.count_unseen(low, 219), len(unseen))
+            for n, id in enumerate(unseen):
+                self.assertEqual(interval_set.nth_unseen(low, n), id)
+
+    def test_sample_never_returns_known_ids(self):
+        interval_set = IntervalSet.from_sorted_ids(range(1, 100, 2))
+        sampled = set()
+        for _ in range(200):
+            id = interval_set.sample(1, 99)
+            self.assertNotIn(id, interval_set)
+            sampled.add(id)
+        self.assertTrue(sampled.issubset(set(range(2, 99, 2))))
+        full = IntervalSet.from_sorted_ids(range(1, 11))
+        self.assertIsNone(full.sample(1, 10))
+
+
+class DiscoveryEngineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for id in range(1, 11):
+            Artist.objects.create(beatport_artist_id=id, name='Artist ' + str(id))
+        Artist404.objects.create(beatport_artist_id=12, datetime_discovered=timezone.now())
+        ArtistBacklog.objects.create(beatport_artist_id=14, datetime_discovered=timezone.now())
+        ProbedRange.objects.create(object_type='artist', start=16, end=18)
+
+    def test_load_known_ids(self):
+        engine = DiscoveryEngine('artist', object_lookup('artist'))
+        self.assertEqual(engine.max_id, 10)
+        for id in list(range(1, 11)) + [12, 14, 16, 17, 18]:
+            self.assertIn(id, engine.known)
+        for id in [11, 13, 15, 19]:
+            self.assertNotIn(id, engine.known)
+
+    def test_sample_strategies(self):
+        engine = DiscoveryEngine('artist', object_lookup('artist'))
+        engine.recent_window = 20
+        self.assertEqual(engine.sample('uniform'), None)
+        self.assertEqual(engine.sample('recent'), 11)
+        self.assertIn(11, engine.sampled)
+        self.assertIsNone(engine.sample('recent'))
+        engine.max_id = 20
+        self.assertIn(engine.sample('dense'), [13, 15, 19, 20])
+        self.assertRaises(LookupError, engine.sample, 'bogus')
+
+    def test_sample_keeps_interval_prefix(self):
+        engine = DiscoveryEngine('artist', object_lookup('artist'))
+        engine.max_id = 1000
+        prefix = engine.known.get_prefix()
+        sampled = [engine.sample('uniform') for _ in range(100)]
+        self.assertIs(engine.known.prefix, prefix)
+        self.assertEqual(len(set(sampled)), 100)
+        for id in sampled:
+            self.assertNotIn(id, engine.known)
+        engine.load()
+        self.assertEqual(engine.sampled, set())
+        for id in sampled:
+            self.assertIn(id, engine.known)
+
+    def test_sample_merges_crowded_side_set(self):
+        engine = DiscoveryEngine('artist', object_lookup('artist'))
+        engine.max_id = 20
+        sampled = set(engine.sample('uniform') for _ in range(5))
+        self.assertEqual(sampled, {11, 13, 15, 19, 20})
+        self.assertIsNone(engine.sample('uniform'))
+        self.assertEqual(engine.sampled, set())
+        self.assertEqual(engine.known.count_unseen(1, 20), 0)
+
+    def test_add_ids_merges_neighbours(self):
+        interval_set = IntervalSet.from_sorted_ids([1, 5, 9])
+        interval_set.add_ids({4, 2, 3, 12, 11})
+        self.assertEqual(interval_set.starts, [1, 9, 11])
+        self.assertEqual(interval_set.ends, [5, 9, 12])
+
+    def test_load_merges_probed_ranges_in_one_pass(self):
+        ProbedRange.objects.create(object_type='artist', start=19, end=25)
+        ProbedRange.objects.create(object_type='artist', start=17, end=30)
+        ProbedRange.objects.create(object_type='artist', start=40, end=41)
+        with mock.patch.object(IntervalSet, 'add_range', side_effect=AssertionError('splice per range')):
+            engine = DiscoveryEngine('artist', object_lookup('artist'))
+        self.assertEqual(engine.known.starts, [1, 12, 14, 16, 40])
+        self.assertEqual(engine.known.ends, [10, 12, 14, 30, 41])
+
+    def test_random_scraper_uses_object_id_field(self):
+        Track.objects.create(beatport_track_id=5, title='Known Track')
+        Track404.objects.create(beatport_track_id=3, datetime_discovered=timezone.now())
+        TrackBacklog.objects.create(beatport_track_id=4, datetime_discovered=timezone.now())
+        tried = []
+
+        def fake_scraper(object_name, id, text=None):
+            tried.append((object_name, id))
+            return {'data': {}, 'success': True, 'message': 'ok', 'count': 0}
+
+        with mock.patch('catalog.utils.object_model_scraper', side_effect=fake_scraper):
+            with mock.patch('catalog.utils.get_discovery_engine', return_value=DiscoveryEngine('track', object_lookup('track'))):
+                for _ in range(2):
+                    random_scraper('track', object_lookup('track'), 'uniform')
+                result = random_scraper('track', object_lookup('track'), 'uniform')
+        self.assertEqual(sorted(tried), [('track', 1), ('track', 2)])
+        self.assertFalse(result['success'])
+        self.assertFalse(ProbedRange.objects.filter(object_type='track').exists())
@@ -0,0 +1,92 @@
+from catalog.exports import stream_export
+from catalog.models import Playlist, SetListItem, Track, TrackInstance
+from catalog.tests.mixins import CatalogTestMixin
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from io import StringIO
+import csv, json, os, tempfile
+
+
+class ExportTest(TestCase, CatalogTestMixin):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.groups = cls.create_test_data()
+
+    def export(self, obj_name, export_format, user=None):
+        return ''.join(stream_export(user or self.users['dj'], obj_name, export_format))
+
+    def test_trackinstance_csv(self):
+        rows = list(csv.DictReader(StringIO(self.export('trackinstance', 'csv'))))
+        trackinstances = TrackInstance.objects.filter(user=self.users['dj']).order_by('track_id')
+        self.assertEqual([row['title'] for row in rows], [trackinstance.track.title for trackinstance in trackinstances])
+        self.assertEqual([row['rating'] for row in rows], [trackinstance.rating for trackinstance in trackinstances])
+        self.assertEqual(rows[-1]['tags'], '; '.join(trackinstances.last().tag.values_list('value', flat=True)))
+        self.assertEqual(rows[0]['artist'], trackinstances.first().track.artist_display)
+
+    def test_header_is_sent_before_the_query(self):
+        chunks = stream_export(self.users['dj'], 'trackinstance', 'csv')
+        with self.assertNumQueries(0):
+            header = next(chunks)
+        self.assertTrue(header.startswith('beatport_track_id,title,mix'))
+
+    def test_setlist_jsonl(self):
+        rows = [json.loads(line) for line in self.export('setlist', 'jsonl').splitlines()]
+        items = SetListItem.objects.filter(setlist__user=self.users['dj']).order_by('start_time')
+        self.assertEqual([row['beatport_track_id'] for row in rows], [item.track.beatport_track_id for item in items])
+        self.assertEqual(set(row['setlist'] for row in rows), set(['Enter The Mix #5']))
+        self.assertEqual(rows[1]['start_time'], '00:05:00')
+
+    def test_setlist_item_without_track(self):
+        item = SetListItem.objects.filter(setlist__user=self.users['dj']).order_by('start_time').first()
+        SetListItem.objects.create(setlist=item.setlist, track=None, start_time='23:59:00')
+        rows = list(csv.DictReader(StringIO(self.export('setlist', 'csv'))))
+        self.assertEqual(rows[-1]['start_time'], '23:59:00')
+        self.assertEqual(rows[-1]['beatport_track_id'], '')
+        self.assertEqual(rows[-1]['title'], '')
+        rows = [json.loads(line) for line in self.export('setlist', 'jsonl').splitlines()]
+        self.assertIsNone(rows[-1]['beatport_track_id'])
+        lines = self.export('setlist', 'm3u').splitlines()
+        self.assertEqual(lines[-1], '# no track for this item')
+
+    def test_playlist_m3u(self):
+        lines = self.export('playlist', 'm3u').splitlines()
+        self.assertEqual(lines[0], '#EXTM3U')
+        self.assertEqual(lines[1], '#EXTGRP:Housey Time')
+        self.assertEqual(len([line for line in lines if line.startswith('#EXTINF:')]), Playlist.objects.get(name='Housey Time').track.count())
+        self.assertEqual(len([line for line in lines if line.startswith('#EXTGRP:')]), 1)
+
+    def test_query_count_is_flat(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                for export_format in ['csv', 'jsonl', 'm3u']:
+                    self.export('trackinstance', export_format)
+            return len(queries)
+        query_count = count_queries()
+        for track in Track.objects.all():
+            TrackInstance.objects.get_or_create(track=track, user=self.users['dj'])
+        self.assertEqual(count_queries(), query_count)
+
+    def test_export_view(self):
+        self.client.force_login(self.users['dj'])
+        response = self.client.get(reverse('export-library', args=['trackinstance', 'csv']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('dj_trackinstances.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(content, self.export('trackinstance', 'csv'))
+        response = self.client.get(reverse('export-library', args=['trackinstance', 'xml']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_library_command(self):
+        out = StringIO()
+        call_command('export_library', 'dj', '--object', 'setlist', '--format', 'jsonl', stdout=out)
+        self.assertEqual(out.getvalue(), self.export('setlist', 'jsonl'))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'library.m3u')
+            call_command('export_library', 'dj', '--format', 'm3u', '--output', path, stderr=StringIO())
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(file.read(), self.export('trackinstance', 'm3u'))
@@ -0,0 +1,71 @@
+from bs4 import BeautifulSoup
+from catalog.extractors import extract_name, extract_track, extract_track_json, get_next_data, parse_track_soup
+from catalog.fetchers import FileFetcher
+from catalog.models import Artist, Genre, Label, Track
+from catalog.utils import object_model_processor, scrape_track
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from io import StringIO
+from unittest import mock
+import os, tempfile
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def read_fixture(object_name, id):
+    with open(os.path.join(FIXTURE_DIR, object_name, str(id) + '.html'), encoding='utf-8') as file:
+        return file.read()
+
+
+class ExtractorTest(TestCase):
+
+    def test_track_json_matches_full_soup(self):
+        html = read_fixture('track', 20000001)
+        self.assertIsNotNone(get_next_data(html))
+        legacy = parse_track_soup(BeautifulSoup(html, 'html.parser'))
+        self.assertEqual(extract_track_json(html, 20000001), legacy)
+        self.assertEqual(extract_track(html, 20000001), legacy)
+        self.assertIsNone(extract_track_json(html, 20000002))
+
+    def test_track_json_missing_fields_falls_back_to_soup(self):
+        html = read_fixture('track', 20000001)
+        legacy = parse_track_soup(BeautifulSoup(html, 'html.parser'))
+        for field in ['"length": "6:14", "length_ms": 374000', '"key": {"id": 8, "name": "A Minor"}', '"publish_date": "2024-05-10"']:
+            broken = html.replace(field, '"unused": null')
+            self.assertNotEqual(broken, html)
+            self.assertIsNone(extract_track_json(broken, 20000001))
+            self.assertEqual(extract_track(broken, 20000001), legacy)
+
+    def test_track_targeted_parse_matches_full_soup(self):
+        html = read_fixture('track', 20000002)
+        self.assertIsNone(extract_track_json(html, 20000002))
+        data = extract_track(html, 20000002)
+        self.assertEqual(data, parse_track_soup(BeautifulSoup(html, 'html.parser')))
+        self.assertEqual(data['remix_artists'], [{'id': 100003, 'text': 'remix-artist'}])
+
+    def test_extract_name(self):
+        for object_name, id in [('artist', 100001), ('genre', 11), ('label', 2001)]:
+            html = read_fixture(object_name, id)
+            legacy = BeautifulSoup(html, 'html.parser').find('body').find('h1').text
+            self.assertEqual(extract_name(html, id), {'name': legacy})
+
+    def test_scrape_track_from_fixtures(self):
+        with tempfile.TemporaryDirectory() as archive_dir, override_settings(PAGE_ARCHIVE_DIR=archive_dir):
+            with mock.patch('catalog.utils.get_fetcher', return_value=FileFetcher(FIXTURE_DIR)):
+                result = scrape_track(20000002, 'fixture-remix')
+        self.assertTrue(result['success'], result['message'])
+        self.assertTrue(object_model_processor(result['data']))
+        track = Track.objects.get(beatport_track_id=20000002)
+        self.assertEqual(list(track.remix_artist.values_list('beatport_artist_id', flat=True)), [100003])
+        self.assertTrue(Artist.objects.filter(beatport_artist_id=100003).exclude(name=None).exists())
+        self.assertEqual(track.genre, Genre.objects.get(beatport_genre_id=11))
+        self.assertEqual(track.label, Label.objects.get(beatport_label_id=2001))
+
+    def test_benchmark_extractors(self):
+        out = StringIO()
+        call_command('benchmark_extractors', '--iterations', '1', '--fixture-dir', FIXTURE_DIR, stdout=out)
+        output = out.getvalue()
+        self.assertIn('track 20000001: full soup', output)
+        self.assertIn('embedded json', output)
+        self.assertIn('Extractor benchmark complete.', output)
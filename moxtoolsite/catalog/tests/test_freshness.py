@@ -0,0 +1,146 @@
+from catalog.freshness import get_refresh_budget, get_stale_candidates, get_stale_ids, schedule_refresh
+from catalog.models import Artist, ScrapeJob, Track, TrackInstance
+from catalog.utils import object_model_processor, run_scrape_job
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from io import StringIO
+from unittest import mock
+import datetime, importlib
+
+
+def get_track_data(id, title=None):
+    return {
+        'title': title or 'Track ' + str(id),
+        'mix': 'Original Mix',
+        'key': 'A Min',
+        'bpm': '124',
+        'released': '2024-01-05',
+        'length': '6:30',
+        'genre': {'id': 5, 'text': 'house'},
+        'label': {'id': 7, 'text': 'label'},
+        'artists': [{'id': 1, 'text': 'one'}],
+        'remix_artists': [],
+    }
+
+
+class FreshnessTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        object_model_processor({
+            'track': {str(id): get_track_data(id) for id in range(1, 6)},
+            'artist': {'1': {'name': 'One'}, '2': {'name': 'Two'}},
+            'genre': {'5': {'name': 'House'}},
+            'label': {'7': {'name': 'Label'}},
+        })
+        users = [User.objects.create_user(username='dj' + str(i), password='djtestpassword') for i in range(3)]
+        for user in users:
+            TrackInstance.objects.create(track=Track.objects.get(beatport_track_id=4), user=user)
+        TrackInstance.objects.create(track=Track.objects.get(beatport_track_id=2), user=users[0])
+
+    def set_ages(self, ages):
+        now = timezone.now()
+        for id, days in ages.items():
+            Track.objects.filter(beatport_track_id=id).update(last_scraped_at=now - datetime.timedelta(days=days))
+
+    def test_processing_tracks_scrape_and_change_times(self):
+        track = Track.objects.get(beatport_track_id=1)
+        self.assertIsNotNone(track.last_scraped_at)
+        self.assertEqual(track.last_changed_at, track.last_scraped_at)
+        self.assertIsNotNone(Artist.objects.get(beatport_artist_id=1).last_changed_at)
+        old = timezone.now() - datetime.timedelta(days=10)
+        Track.objects.update(last_scraped_at=old, last_changed_at=old)
+        Artist.objects.update(last_scraped_at=old, last_changed_at=old)
+        object_model_processor({
+            'track': {'1': get_track_data(1), '2': get_track_data(2, 'Renamed'), '3': dict(get_track_data(3), artists=[{'id': 2, 'text': 'two'}])},
+            'artist': {'1': {'name': 'One'}},
+        })
+        tracks = {track.beatport_track_id: track for track in Track.objects.all()}
+        for id in [1, 2, 3]:
+            self.assertGreater(tracks[id].last_scraped_at, old)
+        self.assertEqual(tracks[1].last_changed_at, old)
+        self.assertGreater(tracks[2].last_changed_at, old)
+        self.assertGreater(tracks[3].last_changed_at, old)
+        self.assertEqual(tracks[4].last_scraped_at, old)
+        artist = Artist.objects.get(beatport_artist_id=1)
+        self.assertGreater(artist.last_scraped_at, old)
+        self.assertEqual(artist.last_changed_at, old)
+
+    def test_last_scraped_migration_spreads_over_refresh_window(self):
+        migration = importlib.import_module('catalog.migrations.0055_backfill_last_scraped')
+        object_model_processor({'track': {str(id): get_track_data(id) for id in range(10, 130)}})
+        Track.objects.update(last_scraped_at=None)
+        Track.objects.filter(beatport_track_id=5).update(metadata_state='incomplete')
+        migration.populate_last_scraped(apps, None)
+        self.assertIsNone(Track.objects.get(beatport_track_id=5).last_scraped_at)
+        now = timezone.now()
+        ages = [(now - track.last_scraped_at).days for track in Track.objects.filter(metadata_state='complete')]
+        self.assertEqual(len(ages), 124)
+        self.assertEqual(set(ages), set(range(60)))
+        self.assertEqual(get_stale_ids('track', 500), [])
+
+    def test_stale_ids_weighted_by_popularity(self):
+        self.set_ages({1: 90, 2: 70, 3: 65, 4: 61, 5: 5})
+        self.assertEqual(get_stale_ids('track', 2), [4, 2])
+        self.assertEqual(get_stale_ids('track', 10), [4, 2, 1, 3])
+        Track.objects.filter(beatport_track_id=3).update(last_scraped_at=None)
+        self.assertEqual(get_stale_ids('track', 10), [4, 2, 3, 1])
+
+    def test_popularity_outranks_older_rows_in_the_window(self):
+        object_model_processor({'track': {str(id): get_track_data(id) for id in range(10, 25)}})
+        self.set_ages({1: 5, 2: 5, 3: 5, 4: 61, 5: 5})
+        self.set_ages({id: 100 + id for id in range(10, 25)})
+        self.assertEqual(get_stale_ids('track', 1), [4])
+        self.assertEqual(get_stale_ids('track', 3), [4, 24, 23])
+
+    def test_candidates_are_a_bounded_oldest_first_window(self):
+        self.set_ages({1: 90, 2: 70, 3: 65, 4: 61, 5: 5})
+        Track.objects.filter(beatport_track_id=3).update(last_scraped_at=None)
+        ids = dict(Track.objects.values_list('id', 'beatport_track_id'))
+        self.assertEqual([ids[id] for id in get_stale_candidates('track', 3)], [3, 1, 2])
+
+    def test_artist_popularity_counts_remix_credits(self):
+        object_model_processor({
+            'artist': {'3': {'name': 'Three'}},
+            'track': {str(id): dict(get_track_data(id), remix_artists=[{'id': 3, 'text': 'three'}], mix='Three Remix') for id in range(6, 9)},
+        })
+        Artist.objects.update(last_scraped_at=timezone.now() - datetime.timedelta(days=40))
+        self.assertEqual(get_stale_ids('artist', 1), [1])
+        Track.artist.through.objects.filter(artist__beatport_artist_id=1).exclude(track__beatport_track_id=6).delete()
+        self.assertEqual(get_stale_ids('artist', 1), [3])
+
+    def test_schedule_refresh_respects_budget(self):
+        self.set_ages({1: 90, 2: 70, 3: 65, 4: 61, 5: 5})
+        with mock.patch.dict('os.environ', {'MD_REFRESH_BUDGET_TRACK': '3'}):
+            self.assertEqual(schedule_refresh(['track']), {'track': 3})
+            jobs = ScrapeJob.objects.filter(object_type='track', priority=ScrapeJob.PRIORITY_REFRESH)
+            self.assertEqual(set(jobs.values_list('external_id', flat=True)), set([4, 2, 1]))
+            self.assertEqual(get_refresh_budget('track'), 0)
+            out = StringIO()
+            call_command('schedule_refresh', '--types', 'track', stdout=out)
+        self.assertIn('Queued 0 track refreshes', out.getvalue())
+
+    def test_refresh_job_rescrapes_complete_objects(self):
+        self.set_ages({1: 90})
+        schedule_refresh(['track'])
+        calls = []
+
+        def fake_scraper(object_name, id, text=None, refresh=False):
+            calls.append((id, refresh))
+            return {'data': {}, 'success': True, 'message': 'ok', 'count': 0}
+
+        job = ScrapeJob.objects.claim('worker-1', 1, ['track'])[0]
+        with mock.patch('catalog.utils.object_model_scraper', side_effect=fake_scraper):
+            run_scrape_job(job)
+        self.assertEqual(calls, [(job.external_id, True)])
+
+    def test_done_jobs_requeue_as_refresh(self):
+        ScrapeJob.objects.enqueue('track', [1], ScrapeJob.PRIORITY_BACKLOG)
+        ScrapeJob.objects.claim('worker-1', 1, ['track'])[0].complete()
+        self.set_ages({1: 90})
+        schedule_refresh(['track'])
+        job = ScrapeJob.objects.get(object_type='track', external_id=1)
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.priority, ScrapeJob.PRIORITY_REFRESH)
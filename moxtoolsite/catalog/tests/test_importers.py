@@ -0,0 +1,154 @@
+from catalog.importers import detect_format, get_beatport_track_id, get_rating, import_library, iter_rekordbox, split_mix
+from catalog.models import Playlist, ScrapeJob, Tag, Track, TrackBacklog, TrackInstance
+from catalog.tests.mixins import CatalogTestMixin
+from django.core.management import call_command
+from django.test import TestCase
+from io import BytesIO, StringIO
+import json, os, tempfile, tracemalloc
+
+
+REKORDBOX_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<DJ_PLAYLISTS Version="1.0.0">
+  <PRODUCT Name="rekordbox" Version="6.8.0" Company="AlphaTheta"/>
+  <COLLECTION Entries="5">
+    <TRACK TrackID="1" Name="I Know You Want To" Artist="Someone" Location="file://localhost/Music/20079434_I_Know_You_Want_To_(Original_Mix).mp3" Comments="/* Warmup / Peak */ big one" Rating="204" PlayCount="12" DateAdded="2024-03-02">
+      <TEMPO Inizio="0.025" Bpm="124.00" Metro="4/4" Battito="1"/>
+    </TRACK>
+    <TRACK TrackID="2" Name="Mau5 Hau5 (x)" Artist="EnterTheMox" Location="file://localhost/Music/Mau5%20Hau5.mp3" Rating="0" PlayCount="3" DateAdded="2024-03-03"/>
+    <TRACK TrackID="3" Name="Fresh One" Artist="Nobody" Location="file://localhost/Music/fresh.mp3" Comments="https://www.beatport.com/track/fresh-one/30000001"/>
+    <TRACK TrackID="4" Name="Gone" Artist="Nobody" Location="file://localhost/Music/1900504_Gone.mp3"/>
+    <TRACK TrackID="5" Name="Unknown Song" Artist="Nobody" Location="file://localhost/Music/unknown.mp3"/>
+  </COLLECTION>
+  <PLAYLISTS>
+    <NODE Type="0" Name="ROOT" Count="1">
+      <NODE Type="0" Name="Sets" Count="1">
+        <NODE Name="Peak Time" Type="1" KeyType="0" Entries="4">
+          <TRACK Key="1"/>
+          <TRACK Key="2"/>
+          <TRACK Key="3"/>
+          <TRACK Key="1"/>
+        </NODE>
+      </NODE>
+    </NODE>
+  </PLAYLISTS>
+</DJ_PLAYLISTS>
+'''
+
+TRAKTOR_NML = '''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
+<NML VERSION="19">
+  <HEAD COMPANY="www.native-instruments.com" PROGRAM="Traktor"></HEAD>
+  <COLLECTION ENTRIES="2">
+    <ENTRY TITLE="TechYES!" ARTIST="402072">
+      <LOCATION DIR="/:Music/:" FILE="techyes.mp3" VOLUME="Macintosh HD"></LOCATION>
+      <INFO MIX="x" COMMENT="tool" RANKING="255" PLAYCOUNT="4" IMPORT_DATE="2024/5/17"></INFO>
+    </ENTRY>
+    <ENTRY TITLE="Another" ARTIST="Nobody">
+      <LOCATION DIR="/:Music/:" FILE="30000002_Another_(Original_Mix).mp3" VOLUME="Macintosh HD"></LOCATION>
+      <INFO RANKING="51"></INFO>
+    </ENTRY>
+  </COLLECTION>
+  <PLAYLISTS>
+    <NODE TYPE="FOLDER" NAME="$ROOT">
+      <SUBNODES COUNT="1">
+        <NODE TYPE="PLAYLIST" NAME="Tools">
+          <PLAYLIST ENTRIES="2" TYPE="LIST" UUID="1">
+            <ENTRY><PRIMARYKEY TYPE="TRACK" KEY="Macintosh HD/:Music/:techyes.mp3"></PRIMARYKEY></ENTRY>
+            <ENTRY><PRIMARYKEY TYPE="TRACK" KEY="Macintosh HD/:Music/:30000002_Another_(Original_Mix).mp3"></PRIMARYKEY></ENTRY>
+          </PLAYLIST>
+        </NODE>
+      </SUBNODES>
+    </NODE>
+  </PLAYLISTS>
+</NML>
+'''
+
+
+class ImporterTest(TestCase, CatalogTestMixin):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.groups = cls.create_test_data()
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tempdir.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def test_helpers(self):
+        self.assertEqual(split_mix('Mau5 Hau5 (x)', ''), ('Mau5 Hau5', 'x'))
+        self.assertEqual(split_mix('Mau5 Hau5 (x)', 'Extended'), ('Mau5 Hau5 (x)', 'Extended'))
+        self.assertEqual(get_beatport_track_id(None, '/Music/20079434_Title.mp3'), 20079434)
+        self.assertEqual(get_beatport_track_id('see beatport.com/track/slug/123', None), 123)
+        self.assertIsNone(get_beatport_track_id('2024 promo', '/Music/track.mp3'))
+        self.assertEqual([get_rating(value) for value in ['0', '51', '153', '255', None]], [None, '2', '6', '10', None])
+        self.assertEqual(detect_format(self.write('rekordbox.xml', REKORDBOX_XML)), 'rekordbox')
+        self.assertEqual(detect_format(self.write('collection.nml', TRAKTOR_NML)), 'traktor')
+        self.assertRaises(ValueError, detect_format, self.write('other.xml', '<root/>'))
+
+    def test_rekordbox_import(self):
+        dj = self.users['dj']
+        progress = []
+        stats = import_library(dj, self.write('rekordbox.xml', REKORDBOX_XML), chunk_size=2, progress=progress.append)
+        self.assertEqual(stats['total'], 5)
+        self.assertEqual(stats['processed'], 5)
+        self.assertEqual(stats['matched'], 2)
+        self.assertEqual(stats['fuzzy'], 1)
+        self.assertEqual(stats['backlogged'], 1)
+        self.assertEqual(stats['unmatched'], 2)
+        self.assertEqual(stats['playlists'], 1)
+        self.assertEqual(stats['bytes_read'], stats['bytes_total'])
+        self.assertEqual([item['processed'] for item in progress], [2, 4, 5, 5])
+
+        # known and fuzzy matches land in the library with their metadata
+        imported = TrackInstance.objects.get(user=dj, track__beatport_track_id=20079434)
+        self.assertEqual(imported.rating, '8')
+        self.assertEqual(imported.play_count, 12)
+        self.assertEqual(str(imported.date_added), '2024-03-02')
+        self.assertEqual(sorted(imported.tag.values_list('value', flat=True)), ['Peak', 'Warmup'])
+        self.assertTrue(TrackInstance.objects.filter(user=dj, track=Track.objects.get(title='Mau5 Hau5')).exists())
+
+        # unknown beatport ids wait on the backlog for this user
+        backlog = TrackBacklog.objects.get(beatport_track_id=30000001)
+        self.assertEqual(list(backlog.users.all()), [dj])
+        self.assertEqual(ScrapeJob.objects.get(object_type='track', external_id=30000001).priority, ScrapeJob.PRIORITY_USER)
+
+        playlist = Playlist.objects.get(user=dj, name='Peak Time')
+        self.assertEqual(playlist.track.count(), 2)
+        self.assertEqual(list(playlist.tag.values_list('type', 'value')), [('folder', 'Sets')])
+
+        # a second import keeps existing rows instead of duplicating them
+        import_library(dj, self.write('rekordbox.xml', REKORDBOX_XML))
+        self.assertEqual(TrackInstance.objects.filter(user=dj, track__beatport_track_id=20079434).count(), 1)
+        self.assertEqual(Playlist.objects.filter(user=dj, name='Peak Time').count(), 1)
+        self.assertEqual(Tag.objects.filter(user=dj, type='my tag').count(), 2)
+
+    def test_traktor_import_command(self):
+        out = StringIO()
+        call_command('import_library', 'admin', self.write('collection.nml', TRAKTOR_NML), '--chunk-size', '1', stdout=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines() if line.startswith('{')]
+        self.assertEqual([line['event'] for line in lines], ['progress', 'progress', 'progress', 'summary'])
+        self.assertEqual(lines[-1]['matched'], 1)
+        self.assertEqual(lines[-1]['backlogged'], 1)
+        admin = self.users['admin']
+        imported = TrackInstance.objects.get(user=admin, track__title='TechYES!')
+        self.assertEqual(imported.rating, '10')
+        self.assertEqual(imported.comments, 'tool')
+        self.assertEqual(str(imported.date_added), '2024-05-17')
+        self.assertEqual(list(Playlist.objects.get(user=admin, name='Tools').track.all()), [imported.track])
+        self.assertTrue(TrackBacklog.objects.filter(beatport_track_id=30000002, users=admin).exists())
+
+    def test_parser_memory_is_bounded(self):
+        track = '<TRACK TrackID="{0}" Name="Track {0}" Artist="Artist {0}" Location="file://localhost/Music/{0}.mp3" Comments="{1}"/>'
+        content = '<DJ_PLAYLISTS><COLLECTION Entries="20000">' + ''.join(track.format(i, 'x' * 200) for i in range(20000)) + '</COLLECTION></DJ_PLAYLISTS>'
+        source = BytesIO(content.encode('utf-8'))
+        del content
+        tracemalloc.start()
+        count = sum(1 for item in iter_rekordbox(source) if item[0] == 'track')
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertEqual(count, 20000)
+        self.assertLess(peak, 2 * 1024 * 1024)
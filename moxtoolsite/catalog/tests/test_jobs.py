@@ -0,0 +1,211 @@
+from catalog import jobs
+from catalog.forms import BulkUploadForm
+from catalog.jobs import run_upload_job
+from catalog.models import Playlist, ScrapeJob, Track, Track404, TrackBacklog, TrackInstance, UploadJob, UserVisibility
+from catalog.tests.mixins import CatalogTestMixin
+from catalog.tests.test_importers import REKORDBOX_XML
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from io import StringIO
+from unittest import mock
+import datetime, os, tempfile
+
+
+@override_settings(UPLOAD_JOB_THREADS=0)
+class UploadJobTest(TestCase, CatalogTestMixin):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.groups = cls.create_test_data()
+
+    def setUp(self):
+        self.client.login(username='dj', password='djtestpassword')
+
+    def run_worker(self):
+        out = StringIO()
+        call_command('upload_worker', '--once', '5', stdout=out)
+        return out.getvalue()
+
+    def test_bulk_upload_returns_before_processing(self):
+        response = self.client.post(reverse('bulk-create', args=['track']), {'object_name': 'track', 'beatport_id_string': '20079434, 30000001, 30000001'})
+        job = UploadJob.objects.get(user=self.users['dj'])
+        self.assertRedirects(response, job.get_absolute_url())
+        self.assertEqual(job.kind, 'bulk_upload')
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.total, 2)
+        self.assertFalse(TrackBacklog.objects.filter(beatport_track_id=30000001).exists())
+
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.processed, 2)
+        self.assertIsNotNone(job.datetime_finished)
+        self.assertTrue(TrackInstance.objects.filter(user=self.users['dj'], track__beatport_track_id=20079434).exists())
+        self.assertTrue(TrackBacklog.objects.filter(beatport_track_id=30000001, users=self.users['dj']).exists())
+        self.assertEqual(ScrapeJob.objects.get(object_type='track', external_id=30000001).priority, ScrapeJob.PRIORITY_USER)
+
+    def test_json_clients_get_the_job_id(self):
+        response = self.client.post(
+            reverse('bulk-create', args=['label']),
+            {'object_name': 'label', 'beatport_id_string': '7, 8'},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        job = UploadJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual(response.json()['status_url'], reverse('upload-job-status', args=[job.id]))
+
+    def test_status_endpoint_and_page(self):
+        job = UploadJob.objects.create(user=self.users['dj'], kind='bulk_upload', processed=25, total=100, status='running')
+        response = self.client.get(reverse('upload-job-status', args=[job.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'running')
+        self.assertEqual(response.json()['percent'], 25)
+        response = self.client.get(job.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('upload-job-status', args=[job.id]))
+        self.client.login(username='admin', password='admintestpassword')
+        self.assertEqual(self.client.get(reverse('upload-job-status', args=[job.id])).status_code, 404)
+        self.assertEqual(self.client.get(job.get_absolute_url()).status_code, 404)
+
+    def test_library_import_runs_in_background(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        with override_settings(UPLOAD_JOB_DIR=tempdir.name):
+            response = self.client.post(reverse('import-library'), {
+                'library_file': SimpleUploadedFile('rekordbox.xml', REKORDBOX_XML.encode('utf-8')),
+                'import_format': '',
+            })
+        job = UploadJob.objects.get(user=self.users['dj'])
+        self.assertRedirects(response, job.get_absolute_url())
+        self.assertEqual(job.kind, 'library_import')
+        self.assertTrue(os.path.exists(job.payload['path']))
+        self.assertFalse(Playlist.objects.filter(name='Peak Time').exists())
+
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.processed, job.total), (5, 5))
+        self.assertTrue(job.message.startswith('Imported 2 of 5 tracks'))
+        self.assertFalse(os.path.exists(job.payload['path']))
+        self.assertEqual(Playlist.objects.get(user=self.users['dj'], name='Peak Time').track.count(), 2)
+
+    def test_failed_jobs_retry_then_fail(self):
+        job = UploadJob.objects.create(user=self.users['dj'], kind='bulk_upload', payload={'object_name': 'track', 'beatport_id_string': 'MOX'}, max_attempts=2)
+        owner = 'test-worker'
+        claimed = UploadJob.objects.claim(owner)
+        self.assertEqual(claimed.id, job.id)
+        self.assertIsNone(UploadJob.objects.claim('other-worker'))
+        self.assertFalse(run_upload_job(claimed))
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, 'queued')
+        self.assertIn('MOX', claimed.message)
+        self.assertIn('Traceback', claimed.error)
+        self.assertGreater(claimed.next_attempt_at, timezone.now())
+        self.assertIsNone(UploadJob.objects.claim(owner))
+        UploadJob.objects.filter(id=job.id).update(next_attempt_at=timezone.now())
+        claimed = UploadJob.objects.claim(owner)
+        self.assertFalse(run_upload_job(claimed))
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, 'failed')
+        self.assertIsNone(UploadJob.objects.claim(owner))
+
+    def test_claim_keeps_going_past_lost_candidates(self):
+        created = [UploadJob.objects.create(user=self.users['dj'], kind='bulk_upload') for _ in range(6)]
+        try_claim = UploadJob.objects.try_claim
+
+        # another worker wins the first four candidates, a whole window
+        def contended_claim(id, owner, lease_seconds=300):
+            if id in [job.id for job in created[:4]]:
+                try_claim(id, 'other-worker', lease_seconds)
+                return False
+            return try_claim(id, owner, lease_seconds)
+
+        UploadJob.objects.try_claim = contended_claim
+        try:
+            job = UploadJob.objects.claim('test-worker')
+        finally:
+            del UploadJob.objects.try_claim
+        self.assertEqual(job.id, created[4].id)
+
+    def test_expired_lease_is_reclaimed(self):
+        job = UploadJob.objects.create(user=self.users['dj'], kind='bulk_upload', status='running', lease_owner='gone', leased_until=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(UploadJob.objects.claim('test-worker').id, job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.lease_owner, 'test-worker')
+
+    @override_settings(UPLOAD_JOB_THREADS=2)
+    def test_thread_pool_submission_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('bulk-create', args=['track']), {'object_name': 'track', 'beatport_id_string': '20079434'})
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(UploadJob.objects.get(user=self.users['dj']).status, 'queued')
+
+    @override_settings(UPLOAD_JOB_THREADS=2)
+    def test_thread_pool_sweeps_available_jobs_on_startup(self):
+        queued = UploadJob.objects.create(user=self.users['dj'], kind='bulk_upload')
+        expired = UploadJob.objects.create(user=self.users['dj'], kind='bulk_upload', status='running', lease_owner='gone', leased_until=timezone.now() - datetime.timedelta(seconds=1))
+        UploadJob.objects.create(user=self.users['dj'], kind='bulk_upload', status='running', lease_owner='alive', leased_until=timezone.now() + datetime.timedelta(seconds=60))
+        UploadJob.objects.create(user=self.users['dj'], kind='bulk_upload', status='done')
+        executor = mock.Mock()
+        with mock.patch.object(jobs, '_executor', None), mock.patch('catalog.jobs.ThreadPoolExecutor', return_value=executor):
+            self.assertIs(jobs.get_executor(), executor)
+            self.assertIs(jobs.get_executor(), executor)
+        self.assertEqual([call.args for call in executor.submit.call_args_list], [(jobs.run_in_thread, queued.id), (jobs.run_in_thread, expired.id)])
+
+    def test_thread_pool_resubmits_requeued_jobs_after_backoff(self):
+        job = UploadJob.objects.create(user=self.users['dj'], kind='bulk_upload', payload={'object_name': 'track', 'beatport_id_string': 'MOX'}, max_attempts=2)
+        executor = mock.Mock()
+        with mock.patch('catalog.jobs.get_executor', return_value=executor), mock.patch('catalog.jobs.connections'), mock.patch('catalog.jobs.threading.Timer') as timer:
+            jobs.run_in_thread(job.id)
+            executor.submit.assert_not_called()
+            self.assertEqual(timer.call_count, 1)
+            self.assertAlmostEqual(timer.call_args.args[0], UploadJob.BACKOFF_BASE, delta=1)
+            timer.call_args.args[1]()
+            executor.submit.assert_called_once_with(jobs.run_in_thread, job.id)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', 1))
+
+            # still backing off, so a stray submission does not run it
+            jobs.run_in_thread(job.id)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, 1)
+            UploadJob.objects.filter(id=job.id).update(next_attempt_at=timezone.now())
+            timer.reset_mock()
+            jobs.run_in_thread(job.id)
+            timer.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('MOX', job.error)
+
+
+class BulkUploadSaveTest(TestCase):
+
+    def test_save_function_bulk(self):
+        user = User.objects.create_user(username='dj', password="djtestpassword")
+        track = Track.objects.create(beatport_track_id=1, title='Known', public=True)
+        Track404.objects.create(beatport_track_id=2, datetime_discovered=timezone.now())
+        TrackBacklog.objects.create(beatport_track_id=3, datetime_discovered=timezone.now())
+        ids = ', '.join(str(id) for id in range(1, 10001))
+        form = BulkUploadForm({'object_name': 'track', 'beatport_id_string': ids})
+        self.assertTrue(form.is_valid())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(form.save(user))
+        job_queries = [query for query in queries.captured_queries if 'catalog_scrapejob' in query['sql']]
+        self.assertLess(len(queries) - len(job_queries), 100)
+        self.assertLess(len(job_queries), 10000 // 50)
+        self.assertEqual(ScrapeJob.objects.filter(object_type='track', priority=ScrapeJob.PRIORITY_USER).count(), 9998)
+        self.assertEqual(TrackBacklog.objects.count(), 9998)
+        self.assertFalse(TrackBacklog.objects.filter(beatport_track_id__in=[1, 2]).exists())
+        self.assertEqual(TrackBacklog.objects.filter(users=user).count(), 9998)
+        self.assertTrue(TrackInstance.objects.filter(track=track, user=user).exists())
+        self.assertTrue(UserVisibility.objects.filter(user=user, object_type='track', object_id=track.id).exists())
+        form = BulkUploadForm({'object_name': 'track', 'beatport_id_string': ids})
+        self.assertTrue(form.is_valid())
+        self.assertTrue(form.save(user))
+        self.assertEqual(TrackBacklog.objects.count(), 9998)
+        self.assertEqual(TrackInstance.objects.count(), 1)
@@ -2,14 +2,21 @@ from catalog.models import Artist, Genre, Label, Playlist, SetList, SetListItem,
 from catalog.models import Artist404, Genre404, Label404, Track404
 from catalog.models import ArtistBacklog, GenreBacklog, LabelBacklog, TrackBacklog
 # from catalog.models import ArtistRequest, GenreRequest, TrackRequest
+from catalog.models import ScrapeJob, UserVisibility
 from catalog.models import metadata_action_status
 from catalog.tests.mixins import CatalogTestMixin
 from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.db import connection
 from django.db.models import Q
 from django.db.utils import IntegrityError
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from datetime import time
-import re
+from django.apps import apps
+from io import StringIO
+import datetime, importlib, re
 
 
 # shared models
@@ -93,6 +100,14 @@ class ArtistModelTest(TestCase, CatalogTestMixin):
         self.assertFalse(status2['remove'])
         self.assertFalse(status2['add'])
 
+    def test_metadata_state(self):
+        artist = Artist.objects.create(beatport_artist_id=765432)
+        self.assertEqual(artist.metadata_state, 'incomplete')
+        artist.set_field('name', 'State Artist')
+        self.assertEqual(Artist.objects.get(id=artist.id).metadata_state, 'complete')
+        self.assertEqual(Artist.objects.filter(metadata_state='incomplete').count(), Artist.objects.filter(name__isnull=True).count())
+        self.assertEqual(Artist.objects.filter(metadata_state='unlinked').count(), Artist.objects.filter(beatport_artist_id__isnull=True).count())
+
     def test_get_viewable_tracks_by_artist_with_count(self):
         for artist in Artist.objects.all():
             self.assertRaises(PermissionDenied, artist.get_viewable_tracks_by_artist, (self.users['anonymous']))
@@ -199,6 +214,76 @@ class ArtistModelTest(TestCase, CatalogTestMixin):
         self.client.force_login(self.users['admin'])
         self.assertEqual(set(Artist.objects.get_queryset_can_view(self.users['admin'])), set(all_artists))
 
+    def test_get_user_set(self):
+        artists_dj = Artist.objects.none()
+        for trackinstance in TrackInstance.objects.filter(user=self.users['dj']):
+            artists_dj = artists_dj | trackinstance.track.artist.all()
+            artists_dj = artists_dj | trackinstance.track.remix_artist.all()
+        self.assertEqual(set(Artist.objects.get_user_set(self.users['dj'])), set(artists_dj))
+
+    def test_get_queryset_can_view_query_count(self):
+        user = self.users['dj']
+        user.has_perm('catalog.moxtool_can_view_own_artist')
+        with self.assertNumQueries(1):
+            list(Artist.objects.get_queryset_can_view(user))
+        for track in Track.objects.all():
+            TrackInstance.objects.get_or_create(track=track, user=user)
+        with self.assertNumQueries(1):
+            list(Artist.objects.get_queryset_can_view(user))
+
+    def test_can_view(self):
+        self.assertRaises(PermissionDenied, Artist.objects.can_view, self.users['anonymous'], 1)
+        all_ids = set(Artist.objects.values_list('id', flat=True))
+        for user in [self.users['dj'], self.users['admin']]:
+            expected = set(Artist.objects.get_queryset_can_view(user).values_list('id', flat=True))
+            self.assertEqual(Artist.objects.can_view(user, all_ids), expected)
+            self.assertEqual(Artist.objects.can_view(user, list(Artist.objects.all())), expected)
+            for artist in Artist.objects.all():
+                self.assertEqual(Artist.objects.can_view(user, artist.id), artist.id in expected)
+        self.assertFalse(Artist.objects.can_view(self.users['dj'], None))
+
+        # view_any and public objects are answered without a query
+        with self.assertNumQueries(0):
+            self.assertTrue(Artist.objects.can_view(self.users['admin'], max(all_ids) + 1))
+        public_artist = Artist.objects.filter(public=True).first()
+        private_artist = Artist.objects.filter(public=False).first()
+        with self.assertNumQueries(0):
+            self.assertTrue(Artist.objects.can_view(self.users['dj'], public_artist))
+        with self.assertNumQueries(1):
+            Artist.objects.can_view(self.users['dj'], [private_artist.id, public_artist.id])
+
+    def test_get_queryset_can_view_with_track_count(self):
+        for user in [self.users['dj'], self.users['admin']]:
+            artists = Artist.objects.get_queryset_can_view_with_track_count(user)
+            self.assertEqual(set(artists), set(Artist.objects.get_queryset_can_view(user)))
+            counts = []
+            for artist in artists:
+                self.assertEqual(artist.track_count, artist.get_viewable_tracks_by_artist(user).distinct().count())
+                counts.append(artist.track_count)
+            self.assertEqual(counts, sorted(counts, reverse=True))
+        with self.assertNumQueries(1):
+            list(Artist.objects.get_queryset_can_view_with_track_count(self.users['admin'])[:20])
+
+    def test_get_top_by_track_count(self):
+        tracks = Track.objects.all()
+        counts = {}
+        for track in tracks:
+            for artist in (track.artist.all() | track.remix_artist.all()).distinct():
+                counts[artist.id] = counts.get(artist.id, 0) + 1
+        ranked = sorted(counts.values(), reverse=True)
+        with self.assertNumQueries(1):
+            top_artists = list(Artist.objects.get_top_by_track_count(tracks))
+        self.assertEqual(set(artist.id for artist in top_artists), set(id for id, count in counts.items() if count == ranked[0]))
+        for artist in top_artists:
+            self.assertEqual(artist.track_count, counts[artist.id])
+        top_artists = Artist.objects.get_top_by_track_count(tracks, limit=2)
+        self.assertEqual(set(artist.id for artist in top_artists), set(id for id, count in counts.items() if count >= ranked[1]))
+        top_artists = Artist.objects.get_top_by_track_count(tracks, limit=1, ties=False)
+        self.assertEqual(len(top_artists), 1)
+        self.assertEqual(top_artists[0].track_count, ranked[0])
+        all_artists = Artist.objects.get_top_by_track_count(tracks, limit=None)
+        self.assertEqual([artist.track_count for artist in all_artists], ranked)
+
     def test_get_queryset_can_direct_modify(self):
         all_artists = Artist.objects.all()
         self.assertRaises(PermissionDenied, Artist.objects.get_queryset_can_direct_modify, (self.users['anonymous']))
@@ -525,6 +610,13 @@ class GenreModelTest(TestCase, CatalogTestMixin):
         self.client.force_login(self.users['admin'])
         self.assertEqual(set(Genre.objects.get_queryset_can_view(self.users['admin'])), set(all_genres))
 
+    def test_get_user_set(self):
+        genres_dj = Genre.objects.none()
+        for trackinstance in TrackInstance.objects.filter(user=self.users['dj']):
+            if trackinstance.track.genre:
+                genres_dj = genres_dj | Genre.objects.filter(id=trackinstance.track.genre.id)
+        self.assertEqual(set(Genre.objects.get_user_set(self.users['dj'])), set(genres_dj))
+
     def test_get_queryset_can_direct_modify(self):
         all_genres = Genre.objects.all()
         self.assertRaises(PermissionDenied, Genre.objects.get_queryset_can_direct_modify, (self.users['anonymous']))
@@ -1097,6 +1189,49 @@ class TrackModelTest(TestCase, CatalogTestMixin):
         expected_object_name2 = str(track2.beatport_track_id)
         self.assertEqual(str(track2), expected_object_name2)
 
+    def test_display_columns_follow_artists(self):
+        track = Track.objects.filter(title__isnull=False).first()
+        artist = Artist.objects.create(beatport_artist_id=987654, name='Display Artist', public=True)
+        track.artist.add(artist)
+        track.remix_artist.add(artist)
+        track.refresh_from_db()
+        self.assertIn('Display Artist', track.artist_display)
+        self.assertIn('Display Artist', track.remix_artist_display)
+        self.assertEqual(track.full_display, track.build_full_display())
+        artist.name = 'Renamed Artist'
+        artist.save()
+        track.refresh_from_db()
+        self.assertIn('Renamed Artist', track.artist_display)
+        self.assertIn('Renamed Artist', track.full_display)
+        track.remix_artist.remove(artist)
+        artist.delete()
+        track.refresh_from_db()
+        self.assertNotIn('Renamed Artist', track.artist_display)
+        self.assertEqual(track.remix_artist_display, ', '.join(str(remix_artist) for remix_artist in track.remix_artist.all()))
+
+    def test_object_string_without_queries(self):
+        tracks = list(Track.objects.all())
+        with self.assertNumQueries(0):
+            for track in tracks:
+                str(track)
+
+    def test_backfill_track_display(self):
+        expected = {track.id: (track.artist_display, track.remix_artist_display, track.full_display) for track in Track.objects.all()}
+        Track.objects.update(artist_display='', remix_artist_display='', full_display='')
+        out = StringIO()
+        call_command('backfill_track_display', '--batch-size', '2', stdout=out)
+        self.assertIn('Track display backfill complete', out.getvalue())
+        for track in Track.objects.all():
+            self.assertEqual((track.artist_display, track.remix_artist_display, track.full_display), expected[track.id])
+
+    def test_track_display_migration(self):
+        migration = importlib.import_module('catalog.migrations.0046_track_display')
+        expected = {track.id: (track.artist_display, track.remix_artist_display, track.full_display) for track in Track.objects.all()}
+        Track.objects.update(artist_display='', remix_artist_display='', full_display='')
+        migration.populate_track_display(apps, None)
+        for track in Track.objects.all():
+            self.assertEqual((track.artist_display, track.remix_artist_display, track.full_display), expected[track.id])
+
     def test_get_absolute_url(self):
         for track in Track.objects.all():
             if track.title:
@@ -1185,6 +1320,32 @@ class TrackModelTest(TestCase, CatalogTestMixin):
         self.assertFalse(status2['remove'])
         self.assertFalse(status2['add'])
 
+    def test_metadata_state(self):
+        for track in Track.objects.all():
+            self.assertEqual(track.metadata_state, track.build_metadata_state())
+        track = Track.objects.create(beatport_track_id=876543, title='State Track', mix='Extended Remix', length='6:00', bpm=124, key='A Minor', released='2025-01-01', genre=Genre.objects.first(), label=Label.objects.first())
+        self.assertEqual(track.metadata_state, 'incomplete')
+        track.artist.add(Artist.objects.first())
+        track.refresh_from_db()
+        self.assertEqual(track.metadata_state, 'incomplete')
+        track.remix_artist.add(Artist.objects.last())
+        track.refresh_from_db()
+        self.assertEqual(track.metadata_state, 'complete')
+        track.set_field('bpm', None)
+        track.refresh_from_db()
+        self.assertEqual(track.metadata_state, 'incomplete')
+
+    def test_evaluate_metadata(self):
+        Track.objects.update(metadata_state='complete', public=True)
+        statuses = Track.objects.evaluate_metadata()
+        for track in Track.objects.all():
+            self.assertEqual(track.metadata_state, track.build_metadata_state())
+            self.assertEqual(statuses[track.id]['scrape'], track.metadata_state == 'incomplete')
+            self.assertEqual(statuses[track.id]['remove'], track.metadata_state != 'complete')
+            self.assertEqual(track.public, track.metadata_state == 'complete')
+        with self.assertNumQueries(1):
+            Track.objects.evaluate_metadata()
+
     # Shared model functions
 
     def test_set_field(self):
@@ -2394,6 +2555,14 @@ class SetListModelTest(TestCase, CatalogTestMixin):
             self.assertEqual(set(setlist.get_viewable_tracks_in_setlist(self.users['admin'])), set(tracks_admin))
             self.assertEqual(setlist.count_viewable_tracks_in_setlist(self.users['admin']), tracks_admin.count())
 
+    def test_get_viewable_tracks_in_setlist_is_one_query(self):
+        setlist = SetList.objects.filter(user=self.users['dj']).first()
+        expected = set(setlist.get_viewable_tracks_in_setlist(self.users['dj']))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(set(setlist.get_viewable_tracks_in_setlist(self.users['dj'])), expected)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('catalog_setlistitem', queries[0]['sql'])
+
     def test_get_top_viewable_setlist_artists(self):
         for setlist in SetList.objects.all():
             dj_data = {}
@@ -2680,6 +2849,33 @@ class SetListItemModelTest(TestCase, CatalogTestMixin):
         self.client.force_login(self.users['admin'])
         self.assertEqual(set(SetListItem.objects.get_queryset_can_request_modify(self.users['admin'])), set(all_setlistitems))
 
+    def test_can_view(self):
+        all_ids = set(SetListItem.objects.values_list('id', flat=True))
+        for user in [self.users['dj'], self.users['admin']]:
+            expected = set(SetListItem.objects.get_queryset_can_view(user).values_list('id', flat=True))
+            self.assertEqual(SetListItem.objects.can_view(user, all_ids), expected)
+            for setlistitem in SetListItem.objects.all():
+                self.assertEqual(SetListItem.objects.can_view(user, setlistitem), setlistitem.id in expected)
+
+    def test_permission_sets_use_constant_queries(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                list(SetListItem.objects.get_public_set())
+                list(SetListItem.objects.get_user_set(self.users['dj']))
+                list(SetListItem.objects.build_queryset_can_view(self.users['dj']))
+                list(SetListItem.objects.get_queryset_can_request_modify(self.users['dj']))
+            return len(queries)
+
+        # the first pass also loads and caches the user's permissions
+        count_queries()
+        query_count = count_queries()
+        setlist = SetList.objects.filter(user=self.users['dj']).first()
+        track = Track.objects.first()
+        for minute in range(30, 50):
+            SetListItem.objects.create(setlist=setlist, track=track, start_time=time(1, minute, 0))
+        self.assertEqual(count_queries(), query_count)
+        self.assertLessEqual(query_count, 4)
+
     def test_display(self):
         self.assertRaises(PermissionDenied, SetListItem.objects.display, self.users['anonymous'])
         dj_setlistitems = SetListItem.objects.get_public_set() | SetListItem.objects.get_user_set(self.users['dj'])
@@ -3388,6 +3584,201 @@ class TransitionModelTest(TestCase, CatalogTestMixin):
         self.assertRaises(IntegrityError, Transition.objects.create, user=transition2.user, from_track=transition2.from_track, to_track=transition2.to_track)
 
 
+# materialized permissions
+
+
+class UserVisibilityModelTest(TestCase, CatalogTestMixin):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.groups = cls.create_test_data()
+
+    def assertNoDrift(self):
+        for object_type in UserVisibility.OBJECT_TYPES:
+            missing, stale = UserVisibility.objects.get_drift(object_type)
+            self.assertEqual(missing, set())
+            self.assertEqual(stale, set())
+
+    def test_table_matches_libraries(self):
+        self.assertNoDrift()
+        user = self.users['dj']
+        for trackinstance in TrackInstance.objects.filter(user=user):
+            self.assertTrue(UserVisibility.objects.filter(user=user, object_type='track', object_id=trackinstance.track_id).exists())
+
+    def test_trackinstance_create_and_delete(self):
+        user = self.users['dj']
+        track = Track.objects.exclude(id__in=TrackInstance.objects.filter(user=user).values('track_id')).first()
+        trackinstance = TrackInstance.objects.create(track=track, user=user)
+        self.assertTrue(UserVisibility.objects.filter(user=user, object_type='track', object_id=track.id).exists())
+        self.assertNoDrift()
+        trackinstance.delete()
+        self.assertFalse(UserVisibility.objects.filter(user=user, object_type='track', object_id=track.id).exists())
+        self.assertNoDrift()
+
+    def test_track_artist_changes(self):
+        artist = Artist.objects.create(name='New Artist')
+        track = TrackInstance.objects.filter(user=self.users['dj']).first().track
+        track.artist.add(artist)
+        self.assertTrue(UserVisibility.objects.filter(user=self.users['dj'], object_type='artist', object_id=artist.id).exists())
+        self.assertNoDrift()
+        artist.track_set.clear()
+        self.assertFalse(UserVisibility.objects.filter(object_type='artist', object_id=artist.id).exists())
+        self.assertNoDrift()
+
+    def test_track_genre_change(self):
+        genre = Genre.objects.create(name='New Genre')
+        track = TrackInstance.objects.filter(user=self.users['dj']).first().track
+        track.genre = genre
+        track.save()
+        self.assertTrue(UserVisibility.objects.filter(user=self.users['dj'], object_type='genre', object_id=genre.id).exists())
+        self.assertNoDrift()
+
+    def test_trackinstance_edit_skips_visibility(self):
+        trackinstance = TrackInstance.objects.filter(user=self.users['dj']).first()
+        trackinstance.comments = 'New comment'
+        with CaptureQueriesContext(connection) as queries:
+            trackinstance.save()
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(any('catalog_uservisibility' in query['sql'] for query in queries.captured_queries))
+
+    def test_trackinstance_delete_keeps_shared_objects(self):
+        user = self.users['dj']
+        trackinstance = TrackInstance.objects.filter(user=user).first()
+        other = Track.objects.create(title='Shared Genre', genre=trackinstance.track.genre, public=True)
+        other.artist.set(trackinstance.track.artist.all())
+        TrackInstance.objects.create(track=other, user=user)
+        trackinstance = TrackInstance.objects.get(id=trackinstance.id)
+        with CaptureQueriesContext(connection) as queries:
+            trackinstance.delete()
+
+        # no full-library drift check, only lookups of the deleted track's own objects
+        self.assertFalse(any(query['sql'].startswith('SELECT') and 'FROM "catalog_uservisibility"' in query['sql'] for query in queries.captured_queries))
+        self.assertFalse(UserVisibility.objects.filter(user=user, object_type='track', object_id=trackinstance.track_id).exists())
+        self.assertTrue(UserVisibility.objects.filter(user=user, object_type='genre', object_id=other.genre_id).exists())
+        self.assertNoDrift()
+
+    def test_trackinstance_moved_to_another_track(self):
+        trackinstance = TrackInstance.objects.filter(user=self.users['dj']).first()
+        old_track_id = trackinstance.track_id
+        trackinstance.track = Track.objects.exclude(id__in=TrackInstance.objects.filter(user=self.users['dj']).values('track_id')).first()
+        trackinstance.save()
+        self.assertFalse(UserVisibility.objects.filter(user=self.users['dj'], object_type='track', object_id=old_track_id).exists())
+        self.assertNoDrift()
+
+    def test_track_genre_and_artist_removal(self):
+        track = TrackInstance.objects.filter(user=self.users['dj']).first().track
+        track = Track.objects.get(id=track.id)
+        track.genre = Genre.objects.create(name='Another Genre')
+        track.save()
+        self.assertNoDrift()
+        with CaptureQueriesContext(connection) as queries:
+            track.title = 'Retitled'
+            track.save()
+        self.assertFalse(any('catalog_uservisibility' in query['sql'] for query in queries.captured_queries))
+        track.artist.remove(*track.artist.all())
+        self.assertNoDrift()
+        track.remix_artist.clear()
+        self.assertNoDrift()
+
+    def test_rebuild_command(self):
+        UserVisibility.objects.filter(object_type='track').delete()
+        UserVisibility.objects.create(user=self.users['dj'], object_type='label', object_id=0)
+        out = StringIO()
+        call_command('rebuild_user_visibility', '--check', stdout=out)
+        self.assertIn('Drift found', out.getvalue())
+        self.assertFalse(UserVisibility.objects.filter(object_type='track').exists())
+        out = StringIO()
+        call_command('rebuild_user_visibility', stdout=out)
+        self.assertIn('Drift repaired', out.getvalue())
+        self.assertNoDrift()
+
+
+# scrape job queue
+
+
+class ScrapeJobModelTest(TestCase, CatalogTestMixin):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.groups = cls.create_test_data()
+
+    def test_backlog_rows_are_queued(self):
+        for object_type, backlog in [('artist', ArtistBacklog), ('genre', GenreBacklog), ('label', LabelBacklog), ('track', TrackBacklog)]:
+            backlog_ids = set(obj.get_id() for obj in backlog.objects.all())
+            job_ids = set(ScrapeJob.objects.filter(object_type=object_type).values_list('external_id', flat=True))
+            self.assertEqual(backlog_ids, job_ids)
+            self.assertFalse(ScrapeJob.objects.filter(object_type=object_type).exclude(priority=ScrapeJob.PRIORITY_BACKLOG).exists())
+
+    def test_claim_by_priority(self):
+        ScrapeJob.objects.enqueue('track', [90000001, 90000002], ScrapeJob.PRIORITY_USER)
+        ScrapeJob.objects.enqueue('track', [90000003], ScrapeJob.PRIORITY_RANDOM)
+        jobs = ScrapeJob.objects.claim('worker-1', 2, ['track'])
+        self.assertEqual(set(job.external_id for job in jobs), set([90000001, 90000002]))
+        for job in jobs:
+            self.assertEqual(job.status, 'leased')
+            self.assertEqual(job.attempts, 1)
+            self.assertEqual(job.lease_owner, 'worker-1')
+        other_jobs = ScrapeJob.objects.claim('worker-2', 100, ['track'])
+        self.assertTrue(set(job.id for job in jobs).isdisjoint(set(job.id for job in other_jobs)))
+        self.assertEqual(other_jobs[-1].external_id, 90000003)
+
+    def test_claim_keeps_going_past_lost_candidates(self):
+        ScrapeJob.objects.enqueue('genre', range(60000001, 60000011), ScrapeJob.PRIORITY_USER)
+        try_claim = ScrapeJob.objects.try_claim
+        raced = []
+
+        # another worker wins the first eight candidates, a whole window for a limit of two
+        def contended_claim(id, owner, lease_seconds, object_types=None):
+            if len(raced) < 8:
+                raced.append(id)
+                try_claim(id, 'worker-2', lease_seconds, object_types)
+            return try_claim(id, owner, lease_seconds, object_types)
+
+        ScrapeJob.objects.try_claim = contended_claim
+        try:
+            jobs = ScrapeJob.objects.claim('worker-1', 2, ['genre'])
+        finally:
+            del ScrapeJob.objects.try_claim
+        self.assertEqual(len(jobs), 2)
+        self.assertTrue(set(job.id for job in jobs).isdisjoint(raced))
+        self.assertFalse(ScrapeJob.objects.filter(object_type='genre', external_id__gt=60000000, status='queued').exists())
+
+    def test_enqueue_raises_priority_and_requeues(self):
+        ScrapeJob.objects.enqueue('artist', [80000001], ScrapeJob.PRIORITY_RANDOM)
+        job = ScrapeJob.objects.claim('worker-1', 1, ['artist'])[0]
+        job.complete()
+        ScrapeJob.objects.enqueue('artist', [80000001], ScrapeJob.PRIORITY_USER)
+        job = ScrapeJob.objects.get(object_type='artist', external_id=80000001)
+        self.assertEqual(job.priority, ScrapeJob.PRIORITY_USER)
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.attempts, 0)
+
+    def test_try_claim_is_compare_and_swap(self):
+        ScrapeJob.objects.enqueue('label', [70000001], ScrapeJob.PRIORITY_USER)
+        job = ScrapeJob.objects.get(object_type='label', external_id=70000001)
+        self.assertTrue(ScrapeJob.objects.try_claim(job.id, 'worker-1', 300))
+        self.assertFalse(ScrapeJob.objects.try_claim(job.id, 'worker-2', 300))
+        ScrapeJob.objects.filter(id=job.id).update(leased_until=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertTrue(ScrapeJob.objects.try_claim(job.id, 'worker-2', 300))
+        job.refresh_from_db()
+        self.assertEqual(job.lease_owner, 'worker-2')
+        self.assertEqual(job.attempts, 2)
+
+    def test_fail_backs_off_then_gives_up(self):
+        ScrapeJob.objects.enqueue('genre', [60000001], ScrapeJob.PRIORITY_USER)
+        ScrapeJob.objects.filter(external_id=60000001).update(max_attempts=2)
+        job = ScrapeJob.objects.claim('worker-1', 1, ['genre'])[0]
+        self.assertTrue(job.fail('Error: genre web scraping unsuccessful'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertGreater(job.next_attempt_at, timezone.now() + datetime.timedelta(seconds=ScrapeJob.BACKOFF_BASE * 0.75))
+        self.assertNotIn(job.id, [claimed.id for claimed in ScrapeJob.objects.claim('worker-2', 100, ['genre'])])
+        ScrapeJob.objects.filter(id=job.id).update(next_attempt_at=timezone.now())
+        job = ScrapeJob.objects.claim('worker-1', 1, ['genre'])[0]
+        job.fail('Error: genre web scraping unsuccessful')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertFalse(job.complete())
+
+
 # model functions
 
 
@@ -0,0 +1,52 @@
+from catalog.models import Track
+from catalog.pagination import KeysetPaginator
+from catalog.tests.mixins import CatalogTestMixin
+from datetime import date
+from django.test import TestCase
+from django.urls import reverse
+
+
+class KeysetPaginatorTest(TestCase, CatalogTestMixin):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.groups = cls.create_test_data()
+        for i in range(7):
+            Track.objects.create(
+                beatport_track_id=1000+i,
+                title=None if i == 3 else 'Track ' + str(i % 3),
+                bpm=None if i % 2 == 0 else 120 + i % 3,
+                released=date(2024, 1, 1+i % 4),
+                public=True,
+            )
+
+    def get_expected(self, field_name, descending):
+        tracks = list(Track.objects.all())
+        with_value = sorted([track for track in tracks if getattr(track, field_name) is not None], key=lambda track: (getattr(track, field_name), track.id), reverse=descending)
+        without_value = sorted([track for track in tracks if getattr(track, field_name) is None], key=lambda track: track.id, reverse=descending)
+        return with_value + without_value
+
+    def test_walk_forward_and_back(self):
+        for field_name in ['title', 'bpm', 'key', 'released']:
+            for descending in [False, True]:
+                paginator = KeysetPaginator(Track.objects.all(), field_name, 3, descending)
+                pages = [paginator.page()]
+                self.assertFalse(pages[0].has_previous())
+                while pages[-1].has_next():
+                    pages.append(paginator.page(after=pages[-1].next_cursor))
+                walked = [track for page in pages for track in page]
+                self.assertEqual(walked, self.get_expected(field_name, descending))
+                for i in range(len(pages) - 1, 0, -1):
+                    previous_page = paginator.page(before=pages[i].previous_cursor)
+                    self.assertEqual(list(previous_page), list(pages[i - 1]))
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Track.objects.all(), 'title', 3)
+        self.assertEqual(list(paginator.page(after='MOX')), list(paginator.page()))
+
+    def test_track_list_view(self):
+        self.client.force_login(self.users['admin'])
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('tracks'), {'sort': '-bpm'})
+        self.assertEqual(response.status_code, 200)
+        expected = self.get_expected('bpm', True)[:20]
+        self.assertEqual([row['track'] for row in response.context['page_data']], expected)
@@ -1,8 +1,18 @@
-from catalog.models import Artist, Genre, Label, Track, Track404
+from catalog.models import Artist, Artist404, ArtistBacklog, Genre, Genre404, Label, ScrapeJob, Track, Track404, TrackBacklog, TrackInstance, UserVisibility, Watermark
 from catalog.utils import get_soup, scrape_artist, scrape_genre, scrape_label, scrape_track, random_scraper
+from catalog.fetchers import FileFetcher, get_fetcher
+from catalog.utils import EntityCache, object_model_processor, HostRateLimiter, aget_soup, cleanup404, entity_cache, get_known_ids, process_scrape_jobs, scrape_linked_objects
 from datetime import date
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from requests.exceptions import HTTPError
+from io import StringIO
+from unittest import mock
+import asyncio, contextlib, json, os, signal, tempfile, threading, time
 
 
 class ScrapingUtilsTest(TestCase):
@@ -331,4 +341,298 @@ class ScrapingUtilsTest(TestCase):
         message2 = random_scraper(5)
         self.assertNotEqual(message2, 'No new tracks found')
         track_count2 = Track.objects.all().count()
-        self.assertNotEqual(track_count1, track_count2)
\ No newline at end of file
+        self.assertNotEqual(track_count1, track_count2)
+
+
+class SqliteWriteLockTest(TestCase):
+
+    def test_processor_saves_one_thread_at_a_time(self):
+        active = []
+        overlaps = []
+        lock = threading.Lock()
+
+        def slow_process(data, scraped_at=None):
+            with lock:
+                active.append(1)
+                overlaps.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+            return True
+
+        with mock.patch('catalog.utils.process_artist', side_effect=slow_process), \
+            mock.patch('catalog.utils.transaction.atomic', side_effect=lambda: contextlib.nullcontext()), \
+            mock.patch('catalog.utils.ArchivedPage.objects.mark_saved'):
+            threads = [threading.Thread(target=object_model_processor, args=({'artist': {str(id): {'name': 'A'}}},)) for id in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(overlaps, [1, 1, 1, 1])
+
+
+class HostRateLimiterTest(TestCase):
+
+    def test_host_rate_limiter(self):
+        limiter = HostRateLimiter(0.05)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.wait('http://www.beatport.com/track/a/1')
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        start = time.monotonic()
+        limiter.wait('http://www.enterthemox.com')
+        self.assertLess(time.monotonic() - start, 0.05)
+
+
+class ScrapeJobProcessingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ScrapeJob.objects.enqueue('artist', [1, 2, 3], ScrapeJob.PRIORITY_BACKLOG)
+
+    def test_failing_job_does_not_block_the_queue(self):
+        tried = []
+
+        def fake_scraper(object_name, id, text=None, refresh=False):
+            tried.append(id)
+            if id == 1:
+                return {'data': {}, 'success': False, 'message': 'Error: artist web scraping unsuccessful', 'count': 0}
+            return {'data': {}, 'success': True, 'message': 'ok', 'count': 0}
+
+        with mock.patch('catalog.utils.object_model_scraper', side_effect=fake_scraper):
+            message = process_scrape_jobs(10, ['artist'])
+        self.assertEqual(sorted(tried), [1, 2, 3])
+        self.assertIn('completed 2 jobs successfully, with 1 errors', message)
+        self.assertEqual(ScrapeJob.objects.get(external_id=1).status, 'queued')
+        self.assertEqual(ScrapeJob.objects.filter(status='done').count(), 2)
+        with mock.patch('catalog.utils.object_model_scraper', side_effect=fake_scraper):
+            process_scrape_jobs(10, ['artist'])
+        self.assertEqual(len(tried), 3)
+
+
+    def test_scrape_worker_once(self):
+        def fake_scraper(object_name, id, text=None, refresh=False):
+            return {'data': {}, 'success': True, 'message': 'ok', 'count': 0}
+
+        out = StringIO()
+        with mock.patch('catalog.utils.object_model_scraper', side_effect=fake_scraper):
+            call_command('scrape_worker', '--once', '2', '--types', 'artist', stdout=out)
+        events = [json.loads(line) for line in out.getvalue().splitlines() if line.startswith('{')]
+        jobs = [event for event in events if event['event'] == 'job']
+        self.assertEqual(len(jobs), 2)
+        for job in jobs:
+            self.assertTrue(job['success'])
+            self.assertIn('total', job['timings'])
+            self.assertIn('parse', job['timings'])
+        summary = [event for event in events if event['event'] == 'summary'][0]
+        self.assertEqual(summary['jobs'], 2)
+        self.assertIsNotNone(summary['total_p99'])
+        self.assertEqual(ScrapeJob.objects.filter(status='done').count(), 2)
+
+    def test_scrape_worker_stops_on_sigterm(self):
+        def fake_scraper(object_name, id, text=None, refresh=False):
+            os.kill(os.getpid(), signal.SIGTERM)
+            return {'data': {}, 'success': True, 'message': 'ok', 'count': 0}
+
+        out = StringIO()
+        with mock.patch('catalog.utils.object_model_scraper', side_effect=fake_scraper):
+            call_command('scrape_worker', '--types', 'artist', '--idle-sleep', '0', stdout=out)
+        self.assertIn('"event": "stopping"', out.getvalue())
+        self.assertEqual(ScrapeJob.objects.filter(status='done').count(), 1)
+        self.assertEqual(ScrapeJob.objects.filter(status='queued').count(), 2)
+
+
+class FetcherTest(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.root.name, 'artist'))
+        with open(os.path.join(self.root.name, 'artist', '610028.html'), 'w') as file:
+            file.write('<html><body><h1>John Summit</h1></body></html>')
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def test_get_fetcher(self):
+        self.assertRaises(LookupError, get_fetcher, 'APIFY')
+        self.assertIs(get_fetcher('FILE'), get_fetcher('FILE'))
+
+    def test_session_is_reused(self):
+        fetcher = FileFetcher(self.root.name)
+        self.assertIs(fetcher.get_session(), fetcher.get_session())
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(fetcher.get_session()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(sessions[0], fetcher.get_session())
+
+    def test_file_fetcher(self):
+        fetcher = FileFetcher(self.root.name)
+        self.assertIn('John Summit', fetcher.fetch('http://www.beatport.com/artist/john-summit/610028'))
+        with self.assertRaisesMessage(HTTPError, '404'):
+            fetcher.fetch('http://www.beatport.com/artist/nobody/1')
+        results = asyncio.run(fetcher.fetch_many_in_threads([
+            'http://www.beatport.com/artist/john-summit/610028',
+            'http://www.beatport.com/artist/nobody/1',
+        ]))
+        self.assertIn('John Summit', results[0])
+        self.assertTrue(str(results[1]).startswith('404'))
+
+    def test_aget_soup(self):
+        with mock.patch.dict(os.environ, {'MD_METHOD': 'FILE', 'MD_FIXTURE_DIR': self.root.name}):
+            with mock.patch.dict('catalog.fetchers._fetchers', clear=True):
+                soup = asyncio.run(aget_soup('http://www.beatport.com/artist/john-summit/610028'))
+        self.assertEqual(soup.find('h1').text, 'John Summit')
+
+
+class EntityResolutionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Genre.objects.create(beatport_genre_id=5, name='House', public=False)
+        Genre.objects.create(beatport_genre_id=12, public=True)
+        Genre404.objects.create(beatport_genre_id=99, datetime_discovered=timezone.now())
+        Artist.objects.create(beatport_artist_id=1, name='EnterTheMox', public=True)
+        ArtistBacklog.objects.create(beatport_artist_id=1, datetime_discovered=timezone.now())
+
+    def setUp(self):
+        entity_cache.clear()
+
+    def fake_scraper(self, object_name, id, text=None):
+        self.calls.append((object_name, id))
+        return {'data': {object_name: {str(id): {'name': text}}}, 'success': True, 'message': 'ok', 'count': 1}
+
+    def test_get_known_ids(self):
+        self.assertEqual(get_known_ids('genre', [5, 12, 99, 100]), {5, 99})
+        self.assertTrue(Genre.objects.get(beatport_genre_id=5).public)
+        self.assertFalse(Genre.objects.get(beatport_genre_id=12).public)
+        self.assertEqual(get_known_ids('artist', [1]), {1})
+        self.assertFalse(ArtistBacklog.objects.filter(beatport_artist_id=1).exists())
+
+    def test_scrape_linked_objects(self):
+        self.calls = []
+        items = [{'id': 1, 'text': 'a'}, {'id': 2, 'text': 'b'}, {'id': 2, 'text': 'b'}, {'id': 3, 'text': 'c'}]
+        with mock.patch('catalog.utils.object_model_scraper', side_effect=self.fake_scraper):
+            results = scrape_linked_objects('artist', items)
+            self.assertEqual(len(results), 2)
+            scrape_linked_objects('artist', items[1:])
+            scrape_linked_objects('genre', [{'id': 5, 'text': 'house'}, {'id': 12, 'text': 'techno'}])
+        self.assertEqual(self.calls, [('artist', 2), ('artist', 3), ('genre', 12)])
+
+    def test_entity_cache_skips_failures(self):
+        self.calls = []
+        cache = EntityCache()
+
+        def failing_scraper(object_name, id, text=None):
+            self.calls.append((object_name, id))
+            return {'data': {object_name: {}}, 'success': False, 'message': 'Error', 'count': 0}
+
+        with mock.patch('catalog.utils.object_model_scraper', side_effect=failing_scraper):
+            cache.scrape('label', 7)
+            cache.scrape('label', 7)
+        self.assertEqual(len(self.calls), 2)
+
+
+class ObjectModelProcessorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='dj', password='djtestpassword')
+        Artist.objects.create(beatport_artist_id=1, name=None, public=False)
+        backlog = TrackBacklog.objects.create(beatport_track_id=100, datetime_discovered=timezone.now())
+        backlog.users.add(cls.user)
+
+    def get_track_data(self, id, genre_id=5):
+        return {
+            'title': 'Track ' + str(id),
+            'mix': 'Extended Remix',
+            'key': 'A Min',
+            'bpm': '124',
+            'released': '2024-01-05',
+            'length': '6:30',
+            'genre': {'id': genre_id, 'text': 'house'},
+            'label': {'id': 7, 'text': 'label'},
+            'artists': [{'id': 1, 'text': 'one'}],
+            'remix_artists': [{'id': 2, 'text': 'two'}],
+        }
+
+    def test_batch(self):
+        batch = [
+            {
+                'track': {'100': self.get_track_data(100)},
+                'artist': {'1': {'name': 'One'}, '2': {'name': 'Two'}},
+                'genre': {'5': {'name': 'House'}},
+                'label': {'7': {'name': 'Label'}},
+            },
+            {
+                'track': {'101': self.get_track_data(101)},
+                'artist': {'2': {'name': 'Two'}},
+            },
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(object_model_processor(batch))
+        self.assertLess(len(queries), 50)
+        track = Track.objects.get(beatport_track_id=100)
+        self.assertEqual(track.title, 'Track 100')
+        self.assertEqual(track.bpm, 124)
+        self.assertEqual(track.released, date(2024, 1, 5))
+        self.assertEqual(track.genre.name, 'House')
+        self.assertTrue(track.public)
+        self.assertEqual(list(track.artist.values_list('name', flat=True)), ['One'])
+        self.assertEqual(list(track.remix_artist.values_list('name', flat=True)), ['Two'])
+        self.assertTrue(Artist.objects.get(beatport_artist_id=1).public)
+        self.assertTrue(Track.objects.filter(beatport_track_id=101).exists())
+        self.assertTrue(TrackInstance.objects.filter(track=track, user=self.user).exists())
+        self.assertFalse(TrackBacklog.objects.exists())
+        self.assertTrue(UserVisibility.objects.filter(user=self.user, object_type='genre', object_id=track.genre_id).exists())
+
+    def test_artist_rename_refreshes_track_display(self):
+        self.assertTrue(object_model_processor({'track': {'100': self.get_track_data(100)}, 'artist': {'2': {'name': 'Two'}}, 'genre': {'5': {'name': 'House'}}, 'label': {'7': {'name': 'Label'}}}))
+        track = Track.objects.get(beatport_track_id=100)
+        self.assertEqual(track.artist_display, '1')
+        self.assertTrue(object_model_processor({'artist': {'1': {'name': 'Real Name'}}}))
+        track.refresh_from_db()
+        self.assertEqual(track.artist_display, 'Real Name')
+        self.assertEqual(str(track), 'Track 100 (Extended Remix) by Real Name')
+
+    def test_batch_rolls_back(self):
+        batch = [
+            {
+                'track': {'100': self.get_track_data(100, genre_id=404)},
+                'artist': {'1': {'name': 'One'}, '2': {'name': 'Two'}},
+                'label': {'7': {'name': 'Label'}},
+            },
+        ]
+        self.assertFalse(object_model_processor(batch))
+        self.assertFalse(Track.objects.exists())
+        self.assertIsNone(Artist.objects.get(beatport_artist_id=1).name)
+        self.assertFalse(Label.objects.exists())
+
+
+class Cleanup404Test(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for id in range(1, 6):
+            Track.objects.create(beatport_track_id=id, title='Track ' + str(id))
+            Artist.objects.create(beatport_artist_id=id, name='Artist ' + str(id))
+        for id in [2, 4]:
+            Track404.objects.create(beatport_track_id=id, datetime_discovered=timezone.now())
+        TrackBacklog.objects.create(beatport_track_id=4, datetime_discovered=timezone.now())
+        Artist404.objects.create(beatport_artist_id=3, datetime_discovered=timezone.now())
+        ArtistBacklog.objects.create(beatport_artist_id=3, datetime_discovered=timezone.now())
+
+    def test_cleanup404_is_incremental(self):
+        cleanup404(chunk_size=1)
+        self.assertEqual(list(Track.objects.order_by('beatport_track_id').values_list('beatport_track_id', flat=True)), [1, 3, 5])
+        self.assertFalse(TrackBacklog.objects.exists())
+        self.assertFalse(Artist.objects.filter(beatport_artist_id=3).exists())
+        self.assertFalse(ArtistBacklog.objects.exists())
+        self.assertEqual(Watermark.objects.get_value('cleanup404_track'), Track404.objects.order_by('id').last().id)
+
+        # rows behind the watermark are left to a full sweep
+        Track.objects.create(beatport_track_id=2, title='Track 2')
+        Track.objects.create(beatport_track_id=6, title='Track 6')
+        Track404.objects.create(beatport_track_id=6, datetime_discovered=timezone.now())
+        with CaptureQueriesContext(connection) as queries:
+            cleanup404()
+        self.assertTrue(any('IN (SELECT' in query['sql'] and 'catalog_track404' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(list(Track.objects.order_by('beatport_track_id').values_list('beatport_track_id', flat=True)), [1, 2, 3, 5])
+        cleanup404(full=True)
+        self.assertEqual(list(Track.objects.order_by('beatport_track_id').values_list('beatport_track_id', flat=True)), [1, 3, 5])
@@ -0,0 +1,50 @@
+from catalog.models import Artist, Label, Track, TrackInstance
+from catalog.tests.mixins import CatalogTestMixin
+from catalog.visibility import visibility_cache
+from django.test import TestCase
+
+
+class VisibilityCacheTest(TestCase, CatalogTestMixin):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.groups = cls.create_test_data()
+
+    def test_visible_set_shared_within_cache(self):
+        user = self.users['dj']
+        with visibility_cache():
+            visible_set = Track.objects.get_visible_set(user)
+            self.assertIs(Track.objects.get_visible_set(user), visible_set)
+            self.assertIsNot(Artist.objects.get_visible_set(user), visible_set)
+            self.assertEqual(set(Track.objects.get_queryset_can_view(user)), set(visible_set.queryset))
+        self.assertIsNot(Track.objects.get_visible_set(user), visible_set)
+
+    def test_visible_set_ids_computed_once(self):
+        user = self.users['dj']
+        user.has_perm('catalog.moxtool_can_view_own_track')
+        track_ids = list(Track.objects.values_list('id', flat=True))
+        with visibility_cache():
+            with self.assertNumQueries(1):
+                for track_id in track_ids:
+                    track_id in Track.objects.get_visible_set(user)
+                    track_id in Track.objects.get_visible_set(user)
+            self.assertEqual(Track.objects.get_visible_set(user).ids, set(Track.objects.get_queryset_can_view(user).values_list('id', flat=True)))
+
+    def test_unrestricted_visible_set(self):
+        user = self.users['admin']
+        user.has_perm('catalog.moxtool_can_view_any_label')
+        with visibility_cache():
+            with self.assertNumQueries(0):
+                visible_set = Label.objects.get_visible_set(user)
+                self.assertTrue(visible_set.unrestricted)
+                self.assertIn(1, visible_set)
+                self.assertNotIn(None, visible_set)
+
+    def test_trackinstance_invalidates_visible_set(self):
+        user = self.users['dj']
+        track = Track.objects.exclude(id__in=TrackInstance.objects.filter(user=user).values('track_id')).filter(public=False).first()
+        with visibility_cache():
+            self.assertNotIn(track.id, Track.objects.get_visible_set(user))
+            trackinstance = TrackInstance.objects.create(track=track, user=user)
+            self.assertIn(track.id, Track.objects.get_visible_set(user))
+            trackinstance.delete()
+            self.assertNotIn(track.id, Track.objects.get_visible_set(user))
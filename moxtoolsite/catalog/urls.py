@@ -51,6 +51,10 @@ urlpatterns = [
     path('tracks/', views.TrackListView, name='tracks'),
     path('track/<int:pk>/<str:title>', views.TrackDetailView.as_view(), name='track-detail'),
     path('user/tracks/', views.UserTrackInstanceListView, name='user-trackinstances'),
+    path('user/export/<str:obj_name>/<str:export_format>', views.export_library, name='export-library'),
+    path('user/import', views.import_library, name='import-library'),
+    path('user/jobs/<int:pk>', views.upload_job_detail, name='upload-job-detail'),
+    path('user/jobs/<int:pk>/status', views.upload_job_status, name='upload-job-status'),
     # path('trackrequest/<int:pk>/<str:name>', views.TrackRequestDetailView.as_view(), name='track-request-detail'),
     # path('track/create', views.modify_track, name='create-track'),
     # path('track/modify/<int:pk>', views.modify_track, name='modify-track'),
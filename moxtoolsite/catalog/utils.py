@@ -1,9 +1,17 @@
 from bs4 import BeautifulSoup
+from contextlib import nullcontext
+from django.db import DatabaseError, connection, transaction
 from django.utils import timezone
-from catalog.models import Artist, Artist404, ArtistBacklog, Genre, Genre404, GenreBacklog, Label, Label404, LabelBacklog, Track, Track404, TrackBacklog, TrackInstance
+from catalog.archive import get_page_archive
+from catalog.discovery import get_discovery_engine
+from catalog.extractors import extract_name, extract_track
+from catalog.fetchers import get_fetcher
+from catalog.metrics import start_timings, timed
+from catalog.models import Artist, Artist404, ArtistBacklog, Genre, Genre404, GenreBacklog, Label, Label404, LabelBacklog, Track, Track404, TrackBacklog, TrackInstance, UserVisibility
+from catalog.models import ArchivedPage, ScrapeJob, Watermark
 from datetime import date
-from scrapingbee import ScrapingBeeClient
-import datetime, os, random, requests, string, time, traceback
+from urllib.parse import urlparse
+import asyncio, datetime, os, random, socket, string, threading, time, traceback
 
 
 # scraping utils
@@ -90,51 +98,67 @@ def object_model_data_checker(object_name, data):
     return True
 
 
-def get_soup(url, iteration_count=0):
-    extra_time = iteration_count * 5
-    time.sleep(random.randint(2+extra_time, 4+extra_time))
-
-    # v1, by free proxy
-    if os.environ.get('MD_METHOD') == 'PROXY':
-        user_agents = os.environ.get('MY_USER_AGENT_LIST').split('&')
-        user_agent = random.choice(user_agents)
-        proxies = os.environ.get('MY_PROXY_LIST').split(',')
-        proxy = 'http://' + os.environ.get('MY_PROXY_CREDS') + '@' + random.choice(proxies)
-        response = requests.get(
-            convert_url(url, False), 
-            proxies = {'http': proxy}, 
-            headers = {'User-Agent': user_agent} , 
-            timeout = 15,
-        )
-
-    # v2, by scrapingbee
-    elif os.environ.get('MD_METHOD') == 'BEE':
-        client = ScrapingBeeClient(api_key=os.environ.get('BEE_KEY'))
-        response = client.get(
-            convert_url(url, True),
-            params={
-                # 'render_js': 'true',
-                # 'premium_proxy': 'true',
-                # 'country_code': 'US',
-            },
-            timeout=60,
-        )
+class HostRateLimiter:
 
-    # v3, by apify
-    # elif os.environ.get('MD_METHOD') == 'APIFY':
-    #     # TBD
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_slot = {}
+        self.lock = threading.Lock()
 
-    # unknown method requires an error
-    else:
-        raise LookupError('Error: unselected or unsupoorted web scraping method')
+    def wait(self, url):
+        self.wait_for(urlparse(url).netloc.lower().removeprefix('www.'))
+
+    def wait_for(self, key):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(key, now))
+            self.next_slot[key] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+host_rate_limiter = HostRateLimiter(float(os.environ.get('MD_HOST_INTERVAL', 1)))
+
+
+def get_page(url, iteration_count=0):
+    if iteration_count > 0:
+        with timed('wait'):
+            time.sleep(random.randint(iteration_count * 5, iteration_count * 5 + 2))
+    fetcher = get_fetcher()
+    if fetcher.rate_limited:
+        with timed('wait'):
+            host_rate_limiter.wait(url)
+    with timed('fetch'):
+        return fetcher.fetch(url)
+
+
+def archive_page(object_name, id, page):
+    archive = get_page_archive()
+    if archive is None:
+        return None
+    try:
+        return ArchivedPage.objects.record(object_name, id, archive.put(page))
+    except Exception as e:
+        print('Error archiving ' + object_name + ' page: ' + str(e))
+        return None
+
+
+def get_soup(url, iteration_count=0):
+    soup = BeautifulSoup(get_page(url, iteration_count), 'html.parser')
+    return soup
 
-    # return text
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, 'html.parser')
+
+async def aget_soup(url, iteration_count=0):
+    if iteration_count > 0:
+        await asyncio.sleep(random.randint(iteration_count * 5, iteration_count * 5 + 2))
+    fetcher = get_fetcher()
+    if fetcher.rate_limited:
+        await asyncio.to_thread(host_rate_limiter.wait, url)
+    soup = BeautifulSoup(await fetcher.fetch_in_thread(url), 'html.parser')
     return soup
 
 
-def scrape_artist(id, text=None):
+def scrape_artist(id, text=None, refresh=False):
 
     # initialize the result dictionary
     result = {
@@ -155,7 +179,7 @@ def scrape_artist(id, text=None):
     if Artist.objects.filter(beatport_artist_id=id).count() > 0:
         ArtistBacklog.objects.filter(beatport_artist_id=id).delete()
         artist = Artist.objects.get(beatport_artist_id=id)
-        if should_object_be_scraped(artist) == False:
+        if should_object_be_scraped(artist) == False and refresh == False:
             result['success'] = True
             result['message'] = 'Process Skipped: artist is already populated'
             return result
@@ -176,9 +200,9 @@ def scrape_artist(id, text=None):
         if text is None:
             text = ''.join(random.choice(string.ascii_letters) for _ in range(random.randint(5, 9)))
         url = 'http://www.beatport.com/artist/' + text + '/' + str(id)
-        soup = None
+        page = None
         try:
-            soup = get_soup(url, iteration_count)
+            page = get_page(url, iteration_count)
         except Exception as e:
             print('Error scraping data: ' + str(e))
             if str(e).startswith('404'):
@@ -189,13 +213,20 @@ def scrape_artist(id, text=None):
             else:
                 traceback.print_exc()
 
+        # archive the raw page, skipping an unchanged page already saved into a complete artist
+        archived = None
+        if page is not None:
+            archived = archive_page('artist', id, page)
+            if archived is not None and archived.is_unchanged() and Artist.objects.filter(beatport_artist_id=id, metadata_state='complete').exists():
+                Artist.objects.filter(beatport_artist_id=id).update(last_scraped_at=timezone.now())
+                result['success'] = True
+                result['message'] = 'Process Skipped: artist page is unchanged'
+                return result
+
         # parse html text if successful
-        if soup is not None:
+        if page is not None:
             try:
-                title_line = soup.find('body').find('h1')
-                data = {
-                    'name': title_line.text,
-                }
+                data = extract_name(page, id)
                 if object_model_data_checker('artist', data) == True:
                     result['data']['artist'][str(id)] = data
                     result['count'] += 1
@@ -214,7 +245,7 @@ def scrape_artist(id, text=None):
     return result
 
 
-def scrape_genre(id, text=None):
+def scrape_genre(id, text=None, refresh=False):
 
     # initialize the result dictionary
     result = {
@@ -235,7 +266,7 @@ def scrape_genre(id, text=None):
     if Genre.objects.filter(beatport_genre_id=id).count() > 0:
         GenreBacklog.objects.filter(beatport_genre_id=id).delete()
         genre = Genre.objects.get(beatport_genre_id=id)
-        if should_object_be_scraped(genre) == False:
+        if should_object_be_scraped(genre) == False and refresh == False:
             result['success'] = True
             result['message'] = 'Process Skipped: genre is already populated'
             return result
@@ -256,9 +287,9 @@ def scrape_genre(id, text=None):
         if text is None:
             text = ''.join(random.choice(string.ascii_letters) for _ in range(random.randint(9, 15)))
         url = 'http://www.beatport.com/genre/' + text + '/' + str(id)
-        soup = None
+        page = None
         try:
-            soup = get_soup(url, iteration_count)
+            page = get_page(url, iteration_count)
         except Exception as e:
             print('Error scraping data: ' + str(e))
             if str(e).startswith('404'):
@@ -269,13 +300,20 @@ def scrape_genre(id, text=None):
             else:
                 traceback.print_exc()
 
+        # archive the raw page, skipping an unchanged page already saved into a complete genre
+        archived = None
+        if page is not None:
+            archived = archive_page('genre', id, page)
+            if archived is not None and archived.is_unchanged() and Genre.objects.filter(beatport_genre_id=id, metadata_state='complete').exists():
+                Genre.objects.filter(beatport_genre_id=id).update(last_scraped_at=timezone.now())
+                result['success'] = True
+                result['message'] = 'Process Skipped: genre page is unchanged'
+                return result
+
         # parse html text if successful
-        if soup is not None:
+        if page is not None:
             try:
-                title_line = soup.find('body').find('h1')
-                data = {
-                    'name': title_line.text,
-                }
+                data = extract_name(page, id)
                 if object_model_data_checker('genre', data) == True:
                     result['data']['genre'][str(id)] = data
                     result['count'] += 1
@@ -294,7 +332,7 @@ def scrape_genre(id, text=None):
     return result
     
 
-def scrape_label(id, text=None):
+def scrape_label(id, text=None, refresh=False):
 
     # initialize the result dictionary
     result = {
@@ -315,7 +353,7 @@ def scrape_label(id, text=None):
     if Label.objects.filter(beatport_label_id=id).count() > 0:
         LabelBacklog.objects.filter(beatport_label_id=id).delete()
         label = Label.objects.get(beatport_label_id=id)
-        if should_object_be_scraped(label) == False:
+        if should_object_be_scraped(label) == False and refresh == False:
             result['success'] = True
             result['message'] = 'Process Skipped: label is already populated'
             return result
@@ -336,9 +374,9 @@ def scrape_label(id, text=None):
         if text is None:
             text = ''.join(random.choice(string.ascii_letters) for _ in range(random.randint(10, 17)))
         url = 'http://www.beatport.com/label/' + text + '/' + str(id)
-        soup = None
+        page = None
         try:
-            soup = get_soup(url, iteration_count)
+            page = get_page(url, iteration_count)
         except Exception as e:
             print('Error scraping data: ' + str(e))
             if str(e).startswith('404'):
@@ -349,13 +387,20 @@ def scrape_label(id, text=None):
             else:
                 traceback.print_exc()
 
+        # archive the raw page, skipping an unchanged page already saved into a complete label
+        archived = None
+        if page is not None:
+            archived = archive_page('label', id, page)
+            if archived is not None and archived.is_unchanged() and Label.objects.filter(beatport_label_id=id, metadata_state='complete').exists():
+                Label.objects.filter(beatport_label_id=id).update(last_scraped_at=timezone.now())
+                result['success'] = True
+                result['message'] = 'Process Skipped: label page is unchanged'
+                return result
+
         # parse html text if successful
-        if soup is not None:
+        if page is not None:
             try:
-                title_line = soup.find('body').find('h1')
-                data = {
-                    'name': title_line.text,
-                }
+                data = extract_name(page, id)
                 if object_model_data_checker('label', data) == True:
                     result['data']['label'][str(id)] = data
                     result['count'] += 1
@@ -374,7 +419,7 @@ def scrape_label(id, text=None):
     return result
     
 
-def scrape_track(id, text=None):
+def scrape_track(id, text=None, refresh=False):
 
     # initialize the result dictionary
     result = {
@@ -395,7 +440,7 @@ def scrape_track(id, text=None):
     if Track.objects.filter(beatport_track_id=id).count() > 0:
         TrackBacklog.objects.filter(beatport_track_id=id).delete()
         track = Track.objects.get(beatport_track_id=id)
-        if should_object_be_scraped(track) == False:
+        if should_object_be_scraped(track) == False and refresh == False:
             result['success'] = True
             result['message'] = 'Process Skipped: track is already populated'
             return result
@@ -417,9 +462,9 @@ def scrape_track(id, text=None):
         if text is None:
             text = ''.join(random.choice(string.ascii_letters) for _ in range(random.randint(10, 17)))
         url = 'http://www.beatport.com/track/' + text + '/' + str(id)
-        soup = None
+        page = None
         try:
-            soup = get_soup(url, iteration_count)
+            page = get_page(url, iteration_count)
         except Exception as e:
             print('Error scraping data: ' + str(e))
             if str(e).startswith('404'):
@@ -430,36 +475,20 @@ def scrape_track(id, text=None):
             else:
                 traceback.print_exc()
 
+        # archive the raw page, skipping an unchanged page already saved into a complete track
+        archived = None
+        if page is not None:
+            archived = archive_page('track', id, page)
+            if archived is not None and archived.is_unchanged() and Track.objects.filter(beatport_track_id=id, metadata_state='complete').exists():
+                Track.objects.filter(beatport_track_id=id).update(last_scraped_at=timezone.now())
+                result['success'] = True
+                result['message'] = 'Process Skipped: track page is unchanged'
+                return result
+
         # parse html text if successful
-        if soup is not None:
+        if page is not None:
             try:
-                title_line = soup.find('body').find('h1', {'class': lambda x: x and x.startswith('Typography-style__HeadingH1')})
-                data['title'] = str(title_line).split('>')[1].split('<')[0].strip()
-                data['mix'] = str(title_line).split('<span')[1].split('>')[1].split('<')[0].strip()
-                data['artists'] = []
-                data['remix_artists'] = []
-                metadata = soup.find('body').findAll('div', {'class': lambda x: x and x.startswith('TrackMeta-style__MetaItem')})
-                for item in metadata:
-                    field = str(item).split('<div>')[1].split('<')[0].replace(':','').lower()
-                    if field not in data:
-                        if item.find('a'):
-                            data[field] = {
-                                'id': int(item.find('a', href=True)['href'].split('/')[-1].strip()),
-                                'text': item.find('a', href=True)['href'].split('/')[-2].strip(),
-                            }
-                        else:
-                            data[field] = str(item).split('<span>')[1].split('<')[0].strip()
-                artist_section = soup.find('body').findAll('div', {'class': lambda x: x and x.startswith('Artists-styles__Items')})
-                for section in artist_section:
-                    for artist_line in section.findAll('a', href=True):
-                        artist_data = {
-                            'id': int(artist_line['href'].split('/')[-1].strip()),
-                            'text': artist_line['href'].split('/')[-2].strip(),
-                        }
-                        if 'remix' in str(section).lower():
-                            data['remix_artists'].append(artist_data)
-                        else:
-                            data['artists'].append(artist_data)
+                data = extract_track(page, id)
                 if object_model_data_checker('track', data) == True:
                     result['message'] = 'Track data scraped: ' + data['title']
                     break
@@ -471,61 +500,26 @@ def scrape_track(id, text=None):
         iteration_count += 1
         result['message'] = 'Error: track web scraping unsuccessful'
 
-    # scrape linked genre
-    if 'genre' in data and result['message'] == 'Track data scraped: ' + data['title']:
-        try:
-            genre_result = object_model_scraper('genre', data['genre']['id'], data['genre']['text'])
-            if genre_result['count'] > 0:
-                if object_model_data_checker('genre', list(genre_result['data']['genre'].values())[0]) == False:
-                    raise ValueError('bad genre data')
-        except Exception as e:
-            result['message'] = 'Error: scraping a genre was unsuccessful'
-            print('Error scraping track genre: ' + str(e))
-            traceback.print_exc()
-
-    # scrape linked label
-    if 'label' in data and result['message'] == 'Track data scraped: ' + data['title']:
-        try:
-            label_result = object_model_scraper('label', data['label']['id'], data['label']['text'])
-            if label_result['count'] > 0:
-                if object_model_data_checker('label', list(label_result['data']['label'].values())[0]) == False:
-                    raise ValueError('bad label data')
-        except Exception as e:
-            result['message'] = 'Error: scraping a label was unsuccessful'
-            print('Error scraping track label: ' + str(e))
-            traceback.print_exc()
-
-    # scrape linked artists
-    if 'artists' in data and result['message'] == 'Track data scraped: ' + data['title']:
-        artist_results = []
-        try:
-            for artist in data['artists']:
-                a_data = object_model_scraper('artist', artist['id'], artist['text'])
-                if a_data['count'] > 0:
-                    if object_model_data_checker('artist', list(a_data['data']['artist'].values())[0]) == True:
-                        artist_results.append(a_data)
-                    else:
-                        raise ValueError('bad remix artist data')
-        except Exception as e:
-            result['message'] = 'Error: scraping an artist was unsuccessful'
-            print('Error scraping track artists: ' + str(e))
-            traceback.print_exc()
-
-    # scrape linked remix artists
-    if 'remix_artists' in data and result['message'] == 'Track data scraped: ' + data['title']:
-        remix_artist_results = []
-        try:
-            for remix_artist in data['remix_artists']:
-                ra_data = object_model_scraper('artist', remix_artist['id'], remix_artist['text'])
-                if ra_data['count'] > 0:
-                    if object_model_data_checker('artist', list(ra_data['data']['artist'].values())[0]) == True:
-                        remix_artist_results.append(ra_data)
-                    else:
-                        raise ValueError('bad remix artist data')
-        except Exception as e:
-            result['message'] = 'Error: scraping a remix artist was unsuccessful'
-            print('Error scraping track remix artists: ' + str(e))
-            traceback.print_exc()
+    # scrape linked genre, label, artists and remix artists
+    linked_results = []
+    if 'title' in data and result['message'] == 'Track data scraped: ' + data['title']:
+        linked_objects = {
+            'genre': [data['genre']],
+            'label': [data['label']],
+            'artist': data['artists'] + data['remix_artists'],
+        }
+        for object_name, items in linked_objects.items():
+            try:
+                for linked_result in scrape_linked_objects(object_name, items):
+                    if linked_result['count'] > 0:
+                        if object_model_data_checker(object_name, list(linked_result['data'][object_name].values())[0]) == False:
+                            raise ValueError('bad ' + object_name + ' data')
+                        linked_results.append(linked_result)
+            except Exception as e:
+                result['message'] = 'Error: scraping a ' + object_name + ' was unsuccessful'
+                print('Error scraping track ' + object_name + ': ' + str(e))
+                traceback.print_exc()
+                break
 
     # complete and return data
     if 'title' in data and result['message'] == 'Track data scraped: ' + data['title']:
@@ -541,53 +535,128 @@ def scrape_track(id, text=None):
             'artists': data['artists'],
             'remix_artists': data['remix_artists'],
         }
-        if genre_result['count'] > 0:
-            result['data']['genre'] = {}
-            for genre_id, genre_value in genre_result['data']['genre'].items():
-                result['data']['genre'][genre_id] = genre_value
-        if label_result['count'] > 0:
-            result['data']['label'] = {}
-            for label_id, label_value in label_result['data']['label'].items():
-                result['data']['label'][label_id] = label_value
-        for artist_result in artist_results:
-            if artist_result['count'] > 0:
-                if 'artist' not in result['data']:
-                    result['data']['artist'] = {}
-                for artist_id, artist_value in artist_result['data']['artist'].items():
-                    result['data']['artist'][artist_id] = artist_value
-        for remix_artist_result in remix_artist_results:
-            if remix_artist_result['count'] > 0:
-                if 'artist' not in result['data']:
-                    result['data']['artist'] = {}
-                for remix_artist_id, remix_artist_value in remix_artist_result['data']['artist'].items():
-                    result['data']['artist'][remix_artist_id] = remix_artist_value
+        for linked_result in linked_results:
+            for object_name, object_data in linked_result['data'].items():
+                if object_name not in result['data']:
+                    result['data'][object_name] = {}
+                for object_id, object_value in object_data.items():
+                    result['data'][object_name][object_id] = object_value
         result['count'] += 1
         result['success'] = True
     return result
     
 
-def object_model_scraper(object_name, id, text=None):
+class EntityCache:
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.results = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get_lock(self, key):
+        with self.lock:
+            if key not in self.locks:
+                if len(self.locks) >= self.max_size:
+                    self.results.clear()
+                    self.locks.clear()
+                self.locks[key] = threading.Lock()
+            return self.locks[key]
+
+    def scrape(self, object_name, id, text=None):
+        key = (object_name, id)
+        with self.get_lock(key):
+            if key in self.results:
+                return self.results[key]
+            result = object_model_scraper(object_name, id, text)
+            if result['success'] == True:
+                self.results[key] = result
+            return result
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+            self.locks.clear()
+
+
+entity_cache = EntityCache()
+
+
+def get_known_ids(object_name, ids):
+    lookup = object_lookup(object_name)
+    known_ids = set(lookup['404'].objects.filter(**{lookup['id']+'__in': ids}).values_list(lookup['id'], flat=True))
+    objects = lookup['model'].objects.filter(**{lookup['id']+'__in': ids})
+    statuses = lookup['model'].objects.evaluate_metadata(objects)
+    complete_ids = [id for id, status in statuses.items() if status['scrape'] == False]
+    known_ids.update(lookup['model'].objects.filter(id__in=complete_ids).values_list(lookup['id'], flat=True))
+    lookup['backlog'].objects.filter(**{lookup['id']+'__in': known_ids}).delete()
+    return known_ids
+
+
+def scrape_linked_objects(object_name, items):
+    texts = {}
+    for item in items:
+        if item['id'] not in texts:
+            texts[item['id']] = item['text']
+    known_ids = get_known_ids(object_name, list(texts))
+    results = []
+    for id, text in texts.items():
+        if id not in known_ids:
+            results.append(entity_cache.scrape(object_name, id, text))
+    return results
+
+
+def object_model_scraper(object_name, id, text=None, refresh=False):
     result = None
     if object_name == 'artist':
-        result = scrape_artist(id, text)
+        result = scrape_artist(id, text, refresh)
     elif object_name == 'genre':
-        result = scrape_genre(id, text)
+        result = scrape_genre(id, text, refresh)
     elif object_name == 'label':
-        result = scrape_label(id, text)
+        result = scrape_label(id, text, refresh)
     elif object_name == 'track':
-        result = scrape_track(id, text)
+        result = scrape_track(id, text, refresh)
     return result
 
 
-def process_artist(data):
+def process_named_objects(object_name, data, scraped_at=None):
+    lookup = object_lookup(object_name)
+    model = lookup['model']
+    ids = [int(key) for key in data]
+    existing = {obj.get_field(lookup['id']): obj for obj in model.objects.filter(**{lookup['id']+'__in': ids})}
+    new_objects = []
+    renamed = []
+    now = timezone.now()
+    for key, value in data.items():
+        when = get_scraped_at(scraped_at, key, now)
+        if int(key) in existing:
+            obj = existing[int(key)]
+            if obj.name != value['name']:
+                obj.last_changed_at = when
+                renamed.append(obj.id)
+            obj.name = value['name']
+            obj.public = True
+        else:
+            obj = model(**{lookup['id']: int(key), 'name': value['name'], 'public': True, 'last_changed_at': when})
+            new_objects.append(obj)
+        obj.metadata_state = obj.build_metadata_state()
+        obj.last_scraped_at = when
+    model.objects.bulk_update(existing.values(), ['name', 'public', 'metadata_state', 'last_scraped_at', 'last_changed_at'], batch_size=500)
+    model.objects.bulk_create(new_objects, batch_size=500)
+    for obj in new_objects:
+        print('New ' + object_name + ' created: ' + str(obj))
+
+    # bulk writes skip the artist_saved signal, so refresh the track display strings directly
+    if object_name == 'artist' and len(renamed) > 0:
+        track_ids = set(Track.artist.through.objects.filter(artist_id__in=renamed).values_list('track_id', flat=True))
+        track_ids.update(Track.remix_artist.through.objects.filter(artist_id__in=renamed).values_list('track_id', flat=True))
+        Track.objects.refresh_display(track_ids)
+
+
+def process_artist(data, scraped_at=None):
     success = False
     try:
-        for key, value in data.items():
-            artist, created = Artist.objects.get_or_create(beatport_artist_id=key)
-            artist.set_field('name', value['name'])
-            artist.set_field('public', True)
-        if created == True:
-            print('New artist created: ' + str(artist))
+        process_named_objects('artist', data, scraped_at)
         success = True
     except Exception as e:
         print('Error processing artist: ' + str(e))
@@ -595,15 +664,10 @@ def process_artist(data):
     return success
 
 
-def process_genre(data):
+def process_genre(data, scraped_at=None):
     success = False
     try:
-        for key, value in data.items():
-            genre, created = Genre.objects.get_or_create(beatport_genre_id=key)
-            genre.set_field('name', value['name'])
-            genre.set_field('public', True)
-        if created == True:
-            print('New genre created: ' + str(genre))
+        process_named_objects('genre', data, scraped_at)
         success = True
     except Exception as e:
         print('Error processing genre: ' + str(e))
@@ -611,15 +675,10 @@ def process_genre(data):
     return success
 
 
-def process_label(data):
+def process_label(data, scraped_at=None):
     success = False
     try:
-        for key, value in data.items():
-            label, created = Label.objects.get_or_create(beatport_label_id=key)
-            label.set_field('name', value['name'])
-            label.set_field('public', True)
-        if created == True:
-            print('New label created: ' + str(label))
+        process_named_objects('label', data, scraped_at)
         success = True
     except Exception as e:
         print('Error processing label: ' + str(e))
@@ -627,87 +686,172 @@ def process_label(data):
     return success
 
 
-def process_track(data):
+def get_scraped_at(scraped_at, key, now):
+    # reparsed pages keep the time they were fetched, everything else was scraped just now
+    if scraped_at is None or key not in scraped_at:
+        return now
+    return scraped_at[key]
+
+
+def get_track_snapshot(track, artist_ids):
+    snapshot = [artist_ids]
+    for field_name in ['title', 'mix', 'length', 'released', 'bpm', 'key', 'genre_id', 'label_id']:
+        snapshot.append(Track._meta.get_field(field_name).to_python(getattr(track, field_name)))
+    return snapshot
+
+
+def get_track_snapshots(tracks):
+    artist_ids = {track.id: ([], []) for track in tracks}
+    for i, through in enumerate([Track.artist.through, Track.remix_artist.through]):
+        for track_id, artist_id in through.objects.filter(track_id__in=list(artist_ids)).order_by('artist_id').values_list('track_id', 'artist_id'):
+            artist_ids[track_id][i].append(artist_id)
+    return {track.id: get_track_snapshot(track, artist_ids[track.id]) for track in tracks}
+
+
+def process_track(data, scraped_at=None):
     success = False
     try:
+        ids = [int(key) for key in data]
+
+        # resolve foreign keys in bulk
+        genre_ids = set(value['genre']['id'] for value in data.values())
+        label_ids = set(value['label']['id'] for value in data.values())
+        artist_ids = set()
+        for value in data.values():
+            artist_ids.update(artist['id'] for artist in value['artists'] + value['remix_artists'])
+        genres = dict(Genre.objects.filter(beatport_genre_id__in=genre_ids).values_list('beatport_genre_id', 'id'))
+        labels = dict(Label.objects.filter(beatport_label_id__in=label_ids).values_list('beatport_label_id', 'id'))
+        artists = dict(Artist.objects.filter(beatport_artist_id__in=artist_ids).values_list('beatport_artist_id', 'id'))
+
+        # create or update tracks, noting which existing tracks changed
+        tracks = {track.beatport_track_id: track for track in Track.objects.filter(beatport_track_id__in=ids)}
+        previous = get_track_snapshots(tracks.values())
+        new_tracks = []
+        now = timezone.now()
+        for key, value in data.items():
+            track = tracks.get(int(key))
+            if track is None:
+                track = Track(beatport_track_id=int(key), last_changed_at=get_scraped_at(scraped_at, key, now))
+                new_tracks.append(track)
+            track.title = value['title']
+            track.mix = value['mix']
+            track.length = value['length']
+            track.released = value['released']
+            track.bpm = value['bpm']
+            track.key = value['key']
+            track.genre_id = genres[value['genre']['id']]
+            track.label_id = labels[value['label']['id']]
+            track.public = True
+            track.last_scraped_at = get_scraped_at(scraped_at, key, now)
+        for track in tracks.values():
+            value = data[str(track.beatport_track_id)]
+            artist_ids = (
+                sorted(artists[artist['id']] for artist in value['artists']),
+                sorted(artists[artist['id']] for artist in value['remix_artists']),
+            )
+            if get_track_snapshot(track, artist_ids) != previous[track.id]:
+                track.last_changed_at = track.last_scraped_at
+        Track.objects.bulk_update(tracks.values(), ['title', 'mix', 'length', 'released', 'bpm', 'key', 'genre', 'label', 'public', 'last_scraped_at', 'last_changed_at'], batch_size=500)
+        Track.objects.bulk_create(new_tracks, batch_size=500)
+        for track in new_tracks:
+            print('New track created: ' + str(track))
+        tracks = dict(Track.objects.filter(beatport_track_id__in=ids).values_list('beatport_track_id', 'id'))
+
+        # replace artist and remix artist through rows
+        track_pks = list(tracks.values())
+        ArtistThrough = Track.artist.through
+        RemixArtistThrough = Track.remix_artist.through
+        ArtistThrough.objects.filter(track_id__in=track_pks).delete()
+        RemixArtistThrough.objects.filter(track_id__in=track_pks).delete()
+        artist_rows = []
+        remix_artist_rows = []
         for key, value in data.items():
-            track, created = Track.objects.get_or_create(beatport_track_id=key)
-            track.set_field('title', value['title'])
-            track.set_field('mix', value['mix'])
-            track.set_field('length', value['length'])
-            track.set_field('released', value['released'])
-            track.set_field('bpm', value['bpm'])
-            track.set_field('key', value['key'])
-            track.set_field('genre', Genre.objects.get(beatport_genre_id=value['genre']['id']))
-            track.set_field('label', Label.objects.get(beatport_label_id=value['label']['id']))
-            track.artist.clear()
             for artist in value['artists']:
-                track.artist.add(Artist.objects.get(beatport_artist_id=artist['id']))
-            track.remix_artist.clear()
+                artist_rows.append(ArtistThrough(track_id=tracks[int(key)], artist_id=artists[artist['id']]))
             for remix_artist in value['remix_artists']:
-                track.remix_artist.add(Artist.objects.get(beatport_artist_id=artist['id']))
-            track.set_field('public', True)
-        if created == True:
-            print('New track created: ' + str(track))
-        if TrackBacklog.objects.filter(beatport_track_id=track.beatport_track_id).count() > 0:
-            backlog = TrackBacklog.objects.get(beatport_track_id=track.beatport_track_id)
-            for user in backlog.users.all():
-                trackinstance, ic = TrackInstance.objects.get_or_create(track=track, user=user)
-                if ic == True:
-                    print('New trackinstance added: ' + str(trackinstance) + ' for ' + str(user))
-            backlog.delete()
+                remix_artist_rows.append(RemixArtistThrough(track_id=tracks[int(key)], artist_id=artists[remix_artist['id']]))
+        ArtistThrough.objects.bulk_create(artist_rows, batch_size=500, ignore_conflicts=True)
+        RemixArtistThrough.objects.bulk_create(remix_artist_rows, batch_size=500, ignore_conflicts=True)
+        Track.objects.refresh_display(track_pks)
+
+        # move backlog users into their libraries
+        backlogs = TrackBacklog.objects.filter(beatport_track_id__in=ids)
+        trackinstances = []
+        for beatport_track_id, user_id in backlogs.filter(users__isnull=False).values_list('beatport_track_id', 'users'):
+            trackinstances.append(TrackInstance(track_id=tracks[beatport_track_id], user_id=user_id))
+        TrackInstance.objects.bulk_create(trackinstances, batch_size=500, ignore_conflicts=True)
+        if len(trackinstances) > 0:
+            print(str(len(trackinstances)) + ' backlog trackinstances added')
+        backlogs.delete()
+
+        # bulk writes skip signals, so refresh materialized visibility directly
+        UserVisibility.objects.sync_track_owners(track_pks)
         success = True
     except Exception as e:
-        print('Error processing label: ' + str(e))
+        print('Error processing track: ' + str(e))
         traceback.print_exc()
     return success
 
 
-def object_model_processor(combined_data):
-    if 'artist' in combined_data:
-        success = process_artist(combined_data['artist'])
-        if success == False:
-            return False
-    if 'genre' in combined_data:
-        success = process_genre(combined_data['genre'])
-        if success == False:
-            return False
-    if 'label' in combined_data:
-        success = process_label(combined_data['label'])
-        if success == False:
-            return False
-    if 'track' in combined_data:
-        success = process_track(combined_data['track'])
-        if success == False:
-            return False
+def merge_scraped_data(results):
+    combined_data = {}
+    for data in results:
+        for object_name, object_data in data.items():
+            if object_name not in combined_data:
+                combined_data[object_name] = {}
+            for object_id, object_value in object_data.items():
+                combined_data[object_name][object_id] = object_value
+    return combined_data
+
+
+# sqlite allows one writer at a time, so scrape_worker threads take turns saving rather than failing with "database is locked"
+sqlite_write_lock = threading.Lock()
+
+
+def get_write_lock():
+    if connection.vendor == 'sqlite':
+        return sqlite_write_lock
+    return nullcontext()
+
+
+def object_model_processor(combined_data, scraped_at=None):
+    if isinstance(combined_data, list):
+        combined_data = merge_scraped_data(combined_data)
+    if scraped_at is None:
+        scraped_at = {}
+    try:
+        with get_write_lock(), transaction.atomic():
+            for object_name, processor in [('artist', process_artist), ('genre', process_genre), ('label', process_label), ('track', process_track)]:
+                if object_name in combined_data and len(combined_data[object_name]) > 0:
+                    if processor(combined_data[object_name], scraped_at.get(object_name)) == False:
+                        raise DatabaseError('Error processing ' + object_name + ' batch')
+    except DatabaseError as e:
+        print(str(e))
+        return False
+
+    # only pages whose data is now saved count as parsed
+    for object_name, object_data in combined_data.items():
+        if len(object_data) > 0:
+            ArchivedPage.objects.mark_saved(object_name, [int(id) for id in object_data])
     return True
 
 
-def random_scraper(object_name, lookup):
-    result = None
-    good_ids = list(lookup['model'].objects.values_list('beatport_track_id', flat=True))
-    bad_ids = list(lookup['404'].objects.values_list('beatport_track_id', flat=True))
-    medium_ids = list(lookup['backlog'].objects.values_list('beatport_track_id', flat=True))
-    if len(good_ids) == 0:
-        max_id = 20000000
-    else:
-        max_id = max(good_ids)
-    id = max_id
-    while id in good_ids + bad_ids + medium_ids:
-        id = random.choice(range(1, max_id))
+def random_scraper(object_name, lookup, strategy=None):
+    engine = get_discovery_engine(object_name, lookup)
+    id = engine.sample(strategy)
+    if id is None:
+        return {
+            'data': {
+                object_name: {},
+            },
+            'success': False,
+            'message': 'Error: no unseen ' + object_name + ' IDs left to try',
+            'count': 0,
+        }
     print('Trying random ' + object_name + ': ' + str(id))
-    if lookup['model'].objects.filter(beatport_track_id=id).count() == 0:
-        result = object_model_scraper(object_name, id)
-    return result
-
 
-def convert_url(url, s=True):
-    clean_url = url
-    if url.startswith('http://') and s == True:
-        clean_url = 'https://' + url.replace('http://', '', 1)
-    elif url.startswith('https://') and s == False:
-        clean_url = 'http://' + url.replace('https://', '', 1)
-    return clean_url
+    # found and missing ids land in the model and 404 tables, which the engine reads on reload
+    return object_model_scraper(object_name, id)
 
 
 def object_lookup(object_name):
@@ -741,14 +885,19 @@ def process_backlog_items(object_name, num=1):
     strike_count = 0
     success_count = 0
 
-    # non-public loop
+    # publish complete objects in bulk, then walk incomplete objects by index
+    lookup['model'].objects.evaluate_metadata(lookup['model'].objects.filter(metadata_state='complete', public=False))
+    incomplete = lookup['model'].objects.filter(metadata_state='incomplete')
+    print('Incomplete ' + object_name + 's: ' + str(incomplete.count()))
+    last_id = 0
     while strike_count < 3:
-        bad_tracks = lookup['model'].objects.filter(public=False)
-        print('Non-public tracks: ' + str(bad_tracks.count()))
-        if bad_tracks.count() == 0 or success_count >= num:
+        if success_count >= num:
             break
-        bad_track_item = bad_tracks.first()
-        result = object_model_scraper(object_name, bad_track_item.get_field(lookup['id']))
+        incomplete_item = incomplete.filter(id__gt=last_id).order_by('id').first()
+        if incomplete_item is None:
+            break
+        last_id = incomplete_item.id
+        result = object_model_scraper(object_name, incomplete_item.get_field(lookup['id']))
         print(result['message'])
         if result['count'] > 0:
             print('Processing ' + object_name + ': ' + str(object_model_processor(result['data'])))
@@ -756,17 +905,15 @@ def process_backlog_items(object_name, num=1):
         if result['success'] == False:
             strike_count += 1
 
-    # backlog loop
+    # job queue loop, failed jobs back off instead of blocking the head of the backlog
+    owner = get_worker_name()
     while strike_count < 3:
-        backlog = lookup['backlog'].objects.all()
-        print('Backlog tracks: ' + str(backlog.count()))
-        if backlog.count() == 0 or success_count >= num:
+        if success_count >= num:
             break
-        backlog_item = backlog.first()
-        result = object_model_scraper(object_name, backlog_item.get_id())
-        print(result['message'])
-        if result['count'] > 0:
-            print('Processing ' + object_name + ': ' + str(object_model_processor(result['data'])))
+        jobs = ScrapeJob.objects.claim(owner, 1, [object_name])
+        if len(jobs) == 0:
+            break
+        result = run_scrape_job(jobs[0])
         success_count += result['count']
         if result['success'] == False:
             strike_count += 1
@@ -790,6 +937,62 @@ def process_backlog_items(object_name, num=1):
     return 'Backlog processing: completed ' + str(success_count) + ' items successfully, with ' + str(strike_count) + ' errors, in ' + str(difference_seconds) + ' seconds'
 
 
+def get_worker_name():
+    return socket.gethostname() + ':' + str(os.getpid()) + ':' + str(threading.get_ident())
+
+
+def run_scrape_job(job):
+    lookup = object_lookup(job.object_type)
+    timings = start_timings()
+    start = time.perf_counter()
+    try:
+        result = object_model_scraper(job.object_type, job.external_id, refresh=job.priority == ScrapeJob.PRIORITY_REFRESH)
+        print(result['message'])
+
+        # parse time is whatever the scraper spent outside of waiting and fetching
+        timings['parse'] = max(time.perf_counter() - start - timings.get('fetch', 0) - timings.get('wait', 0), 0)
+        if result['count'] > 0:
+            with timed('persist'):
+                processed = object_model_processor(result['data'])
+            print('Processing ' + job.object_type + ': ' + str(processed))
+            if processed == False:
+                result['success'] = False
+                result['message'] = 'Error: ' + job.object_type + ' processing unsuccessful'
+        if result['success'] == True or lookup['404'].objects.filter(**{lookup['id']: job.external_id}).exists():
+            job.complete()
+        else:
+            job.fail(result['message'])
+    except Exception as e:
+        print('Error running scrape job ' + str(job) + ': ' + str(e))
+        traceback.print_exc()
+        job.fail(str(e))
+        result = {
+            'data': {},
+            'success': False,
+            'message': 'Error: ' + str(e),
+            'count': 0,
+        }
+    timings['total'] = time.perf_counter() - start
+    result['timings'] = timings
+    return result
+
+
+def process_scrape_jobs(num=1, object_types=None, owner=None):
+    if owner is None:
+        owner = get_worker_name()
+    success_count = 0
+    error_count = 0
+    while success_count + error_count < num:
+        jobs = ScrapeJob.objects.claim(owner, 1, object_types)
+        if len(jobs) == 0:
+            break
+        if run_scrape_job(jobs[0])['success'] == True:
+            success_count += 1
+        else:
+            error_count += 1
+    return 'Scrape jobs: completed ' + str(success_count) + ' jobs successfully, with ' + str(error_count) + ' errors'
+
+
 def should_object_be_scraped(object):
     status = object.metadata_status()
     if status['add'] == True:
@@ -799,24 +1002,20 @@ def should_object_be_scraped(object):
     return status['scrape']
 
 
-def cleanup404():
-
-    # track (first due to FKeys)
-    bad_tracks = list(Track404.objects.all().values_list('beatport_track_id', flat=True))
-    Track.objects.filter(beatport_track_id__in=bad_tracks).delete()
-    TrackBacklog.objects.filter(beatport_track_id__in=bad_tracks).delete()
+def cleanup404(chunk_size=1000, full=False):
 
-    # artist
-    bad_artists = list(Artist404.objects.all().values_list('beatport_artist_id', flat=True))
-    Artist.objects.filter(beatport_artist_id__in=bad_artists).delete()
-    ArtistBacklog.objects.filter(beatport_artist_id__in=bad_artists).delete()
-
-    # genre
-    bad_genres = list(Genre404.objects.all().values_list('beatport_genre_id', flat=True))
-    Genre.objects.filter(beatport_genre_id__in=bad_genres).delete()
-    GenreBacklog.objects.filter(beatport_genre_id__in=bad_genres).delete()
-
-    # label
-    bad_labels = list(Label404.objects.all().values_list('beatport_label_id', flat=True))
-    Label.objects.filter(beatport_label_id__in=bad_labels).delete()
-    LabelBacklog.objects.filter(beatport_label_id__in=bad_labels).delete()
\ No newline at end of file
+    # track first due to FKeys, each type only past its watermark unless a full sweep is requested
+    for object_name in ['track', 'artist', 'genre', 'label']:
+        lookup = object_lookup(object_name)
+        watermark = 'cleanup404_' + object_name
+        last_id = 0 if full == True else Watermark.objects.get_value(watermark)
+        while True:
+            chunk = list(lookup['404'].objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+            if len(chunk) == 0:
+                break
+            bad_ids = lookup['404'].objects.filter(id__gt=last_id, id__lte=chunk[-1]).values(lookup['id'])
+            with transaction.atomic():
+                lookup['model'].objects.filter(**{lookup['id']+'__in': bad_ids}).delete()
+                lookup['backlog'].objects.filter(**{lookup['id']+'__in': bad_ids}).delete()
+                Watermark.objects.advance(watermark, chunk[-1])
+            last_id = chunk[-1]
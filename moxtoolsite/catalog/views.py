@@ -1,6 +1,9 @@
-from catalog.models import Artist, Genre, Label, Playlist, SetList, SetListItem, Tag, Track, TrackInstance, Transition
+from catalog.models import Artist, Genre, Label, Playlist, SetList, SetListItem, Tag, Track, TrackInstance, Transition, UploadJob
 # from catalog.models import ArtistRequest, GenreRequest, TrackRequest
-from catalog.forms import AddTrackToLibraryForm, AddTrackToPlaylistForm, BulkUploadForm, PlaylistForm
+from catalog.exports import EXPORT_FORMATS, EXPORT_OBJECTS, stream_export
+from catalog.forms import AddTrackToLibraryForm, AddTrackToPlaylistForm, BulkUploadForm, LibraryImportForm, PlaylistForm
+from catalog.jobs import store_upload, submit_upload_job
+from catalog.pagination import KeysetPaginator
 from catalog.utils import random_scraper
 from django.apps import apps
 from django.contrib.auth.decorators import login_required
@@ -8,7 +11,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.db import IntegrityError
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse
 from django.views import generic
@@ -142,19 +145,28 @@ def modify_shared_model(request, obj_name, pk):
         print(f"An error occurred: {e}")
 
 
+def get_submitted_job_response(request, job):
+    if request.get_preferred_type(['text/html', 'application/json']) == 'application/json':
+        return JsonResponse({'job_id': job.id, 'status_url': reverse('upload-job-status', args=[job.id])}, status=202)
+    return HttpResponseRedirect(job.get_absolute_url())
+
+
 @login_required
 def bulk_upload(request, obj_name):
     if request.method == 'POST':
         form = BulkUploadForm(request.POST)
         if form.is_valid():
-            success = form.save(request.user)
-            print(success)
-            if success is True:
-                # find additional data
-                # print(random_scraper(1))
-                return HttpResponseRedirect(reverse('index'))
-            else:
-                print('Invalid form')
+            # queue the upload so the request returns before the ids are processed
+            job = submit_upload_job(
+                request.user,
+                'bulk_upload',
+                {
+                    'object_name': form.cleaned_data['object_name'],
+                    'beatport_id_string': form.cleaned_data['beatport_id_string'],
+                },
+                len(set(form.cleaned_data['beatport_id_list'])),
+            )
+            return get_submitted_job_response(request, job)
         else:
             print(form.errors)
     else:
@@ -172,20 +184,47 @@ def bulk_upload(request, obj_name):
     return render(request, 'catalog/bulk_upload.html', context)
 
 
+@login_required
+def import_library(request):
+    if request.method == 'POST':
+        form = LibraryImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            path = store_upload(form.cleaned_data['library_file'])
+            job = submit_upload_job(request.user, 'library_import', {'path': path, 'format': form.cleaned_data['import_format']})
+            return get_submitted_job_response(request, job)
+        else:
+            print(form.errors)
+    else:
+        form = LibraryImportForm()
+
+    context = {
+        'form': form,
+    }
+
+    return render(request, 'catalog/import_library.html', context)
+
+
+@login_required
+def upload_job_detail(request, pk):
+    job = get_object_or_404(UploadJob, id=pk, user=request.user)
+    context = {
+        'job': job,
+    }
+    return render(request, 'catalog/upload_job_detail.html', context)
+
+
+@login_required
+def upload_job_status(request, pk):
+    job = get_object_or_404(UploadJob, id=pk, user=request.user)
+    return JsonResponse(job.get_status())
+
+
 # artist
 
 
 @login_required
 def ArtistListView(request):
-    artist_data = []
-    for artist in Artist.objects.get_queryset_can_view(request.user):
-        artist_data.append({
-            'artist': artist,
-            'track_count':artist.count_viewable_tracks_by_artist(request.user),
-            'top_genres': artist.get_top_viewable_artist_genres(request.user),
-        })
-    sorted_data = sorted(artist_data, key=lambda dictionary: dictionary["track_count"], reverse=True)
-    paginator = Paginator(sorted_data, 20)
+    paginator = Paginator(Artist.objects.get_queryset_can_view_with_track_count(request.user), 20)
     page = request.GET.get('page')
     try:
         page_data = paginator.page(page)
@@ -193,6 +232,14 @@ def ArtistListView(request):
         page_data = paginator.page(1)
     except EmptyPage:
         page_data = paginator.page(paginator.num_pages)
+    row_data = []
+    for artist in page_data:
+        row_data.append({
+            'artist': artist,
+            'track_count': artist.track_count,
+            'top_genres': artist.get_top_viewable_artist_genres(request.user),
+        })
+    page_data.object_list = row_data
     context = {
         'page_data': page_data,
     }
@@ -206,7 +253,7 @@ class ArtistDetailView(LoginRequiredMixin, generic.DetailView):
     
     def get_object(self):
         pk = self.kwargs.get(self.pk_url_kwarg)
-        return Artist.objects.get_queryset_can_view(self.request.user).get(id=pk)
+        return Artist.objects.get_viewable_object(self.request.user, pk)
 
 
 # class ArtistRequestDetailView(LoginRequiredMixin, generic.DetailView):
@@ -224,15 +271,7 @@ class ArtistDetailView(LoginRequiredMixin, generic.DetailView):
 
 @login_required
 def GenreListView(request):
-    genre_data = []
-    for genre in Genre.objects.get_queryset_can_view(request.user):
-        genre_data.append({
-            'genre': genre,
-            'track_count':genre.count_viewable_tracks_in_genre(request.user),
-            'top_artists': genre.get_top_viewable_genre_artists(request.user),
-        })
-    sorted_data = sorted(genre_data, key=lambda dictionary: dictionary["track_count"], reverse=True)
-    paginator = Paginator(sorted_data, 20)
+    paginator = Paginator(Genre.objects.get_queryset_can_view_with_track_count(request.user), 20)
     page = request.GET.get('page')
     try:
         page_data = paginator.page(page)
@@ -240,6 +279,14 @@ def GenreListView(request):
         page_data = paginator.page(1)
     except EmptyPage:
         page_data = paginator.page(paginator.num_pages)
+    row_data = []
+    for genre in page_data:
+        row_data.append({
+            'genre': genre,
+            'track_count': genre.track_count,
+            'top_artists': genre.get_top_viewable_genre_artists(request.user),
+        })
+    page_data.object_list = row_data
     context = {
         'page_data': page_data,
     }
@@ -253,7 +300,7 @@ class GenreDetailView(LoginRequiredMixin, generic.DetailView):
     
     def get_object(self):
         pk = self.kwargs.get(self.pk_url_kwarg)
-        return Genre.objects.get_queryset_can_view(self.request.user).get(id=pk)
+        return Genre.objects.get_viewable_object(self.request.user, pk)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -277,15 +324,7 @@ class GenreDetailView(LoginRequiredMixin, generic.DetailView):
 
 @login_required
 def LabelListView(request):
-    label_data = []
-    for label in Label.objects.get_queryset_can_view(request.user):
-        label_data.append({
-            'label': label,
-            'track_count':label.count_viewable_tracks_in_label(request.user),
-            'top_artists': label.get_top_viewable_label_artists(request.user),
-        })
-    sorted_data = sorted(label_data, key=lambda dictionary: dictionary["track_count"], reverse=True)
-    paginator = Paginator(sorted_data, 20)
+    paginator = Paginator(Label.objects.get_queryset_can_view_with_track_count(request.user), 20)
     page = request.GET.get('page')
     try:
         page_data = paginator.page(page)
@@ -293,6 +332,14 @@ def LabelListView(request):
         page_data = paginator.page(1)
     except EmptyPage:
         page_data = paginator.page(paginator.num_pages)
+    row_data = []
+    for label in page_data:
+        row_data.append({
+            'label': label,
+            'track_count': label.track_count,
+            'top_artists': label.get_top_viewable_label_artists(request.user),
+        })
+    page_data.object_list = row_data
     context = {
         'page_data': page_data,
     }
@@ -306,7 +353,7 @@ class LabelDetailView(LoginRequiredMixin, generic.DetailView):
     
     def get_object(self):
         pk = self.kwargs.get(self.pk_url_kwarg)
-        return Label.objects.get_queryset_can_view(self.request.user).get(id=pk)
+        return Label.objects.get_viewable_object(self.request.user, pk)
     
 
 # setlist
@@ -343,7 +390,7 @@ class SetListDetailView(LoginRequiredMixin, generic.DetailView):
     
     def get_object(self):
         pk = self.kwargs.get(self.pk_url_kwarg)
-        return SetList.objects.get_queryset_can_view(self.request.user).get(id=pk)
+        return SetList.objects.get_viewable_object(self.request.user, pk)
 
 
 @login_required
@@ -373,24 +420,27 @@ def UserSetListListView(request):
 # track
 
 
+TRACK_SORT_FIELDS = {
+    'title': 'Title',
+    'bpm': 'BPM',
+    'key': 'Key',
+    'released': 'Released',
+}
+
+
 @login_required
 def TrackListView(request):
-    track_data = []
-    for track in Track.objects.get_queryset_can_view(request.user):
-        track_data.append({
-            'track': track,
-        })
-    sorted_data = sorted(track_data, key=lambda item: item['track'].title)
-    paginator = Paginator(sorted_data, 20)
-    page = request.GET.get('page')
-    try:
-        page_data = paginator.page(page)
-    except PageNotAnInteger:
-        page_data = paginator.page(1)
-    except EmptyPage:
-        page_data = paginator.page(paginator.num_pages)
+    sort = request.GET.get('sort', 'title')
+    if sort.lstrip('-') not in TRACK_SORT_FIELDS:
+        sort = 'title'
+    queryset = Track.objects.get_queryset_can_view(request.user).select_related('genre', 'label').prefetch_related('artist', 'remix_artist')
+    paginator = KeysetPaginator(queryset, sort.lstrip('-'), 20, sort.startswith('-'))
+    page_data = paginator.page(request.GET.get('after'), request.GET.get('before'))
+    page_data.object_list = [{'track': track} for track in page_data]
     context = {
         'page_data': page_data,
+        'sort': sort,
+        'sort_options': TRACK_SORT_FIELDS,
     }
     return render(request, 'catalog/track_list.html', context=context)
 
@@ -402,15 +452,17 @@ class TrackDetailView(LoginRequiredMixin, generic.DetailView):
     
     def get_object(self):
         pk = self.kwargs.get(self.pk_url_kwarg)
-        return Track.objects.get_queryset_can_view(self.request.user).filter(id=pk).first()
+        track = Track.objects.filter(id=pk).first()
+        if track is not None and Track.objects.can_view(self.request.user, track):
+            return track
+        return None
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if 'track' in context:
             context['viewable_genre'] = context['track'].get_viewable_genre_on_track(self.request.user)
-            for label in Label.objects.get_queryset_can_view(self.request.user):
-                if label == context['track'].label:
-                    context['viewable_label'] = label
+            if Label.objects.can_view(self.request.user, context['track'].label_id):
+                context['viewable_label'] = context['track'].label
             context['viewable_artists'] = context['track'].get_viewable_artists_on_track(self.request.user)
             context['viewable_remix_artists'] = context['track'].get_viewable_remix_artists_on_track(self.request.user)
             context['viewable_trackinstances'] = context['track'].get_viewable_instances_of_track(self.request.user).exclude(user=self.request.user)
@@ -458,6 +510,15 @@ def UserTrackInstanceListView(request):
     return render(request, 'catalog/user_track_list.html', context=context)
 
 
+@login_required
+def export_library(request, obj_name, export_format):
+    if obj_name not in EXPORT_OBJECTS or export_format not in EXPORT_FORMATS:
+        raise Http404('Exports are not available for ' + obj_name + ' as ' + export_format)
+    response = StreamingHttpResponse(stream_export(request.user, obj_name, export_format), content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = 'attachment; filename="' + request.user.username + '_' + obj_name + 's.' + export_format + '"'
+    return response
+
+
 # playlist
 
 
@@ -650,7 +711,7 @@ class TransitionDetailView(LoginRequiredMixin, generic.DetailView):
     
     def get_object(self):
         pk = self.kwargs.get(self.pk_url_kwarg)
-        return Transition.objects.get_queryset_can_view(self.request.user).get(id=pk)
+        return Transition.objects.get_viewable_object(self.request.user, pk)
 
 
 @login_required
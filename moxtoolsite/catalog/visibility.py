@@ -0,0 +1,67 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# request-scoped cache of viewable sets, keyed by (user id, model name)
+
+_visibility_cache = ContextVar('visibility_cache', default=None)
+
+
+class VisibleSet:
+
+    def __init__(self, queryset, unrestricted=False):
+        self.queryset = queryset
+        self.unrestricted = unrestricted
+        self._ids = None
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = frozenset(self.queryset.values_list('id', flat=True))
+        return self._ids
+
+    def __contains__(self, pk):
+        if pk is None:
+            return False
+        return self.unrestricted or pk in self.ids
+
+
+def get_visible_set(user, model, build_queryset):
+    model_name = model.__name__.lower()
+    cache = _visibility_cache.get()
+    key = (user.pk, model_name)
+    if cache is not None and key in cache:
+        return cache[key]
+    visible_set = VisibleSet(
+        build_queryset(user),
+        user.has_perm('catalog.moxtool_can_view_any_'+model_name),
+    )
+    if cache is not None:
+        cache[key] = visible_set
+    return visible_set
+
+
+def invalidate_visibility(user_id):
+    cache = _visibility_cache.get()
+    if cache is not None:
+        for key in [key for key in cache if key[0] == user_id]:
+            del cache[key]
+
+
+@contextmanager
+def visibility_cache():
+    token = _visibility_cache.set({})
+    try:
+        yield _visibility_cache.get()
+    finally:
+        _visibility_cache.reset(token)
+
+
+class VisibilityCacheMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with visibility_cache():
+            return self.get_response(request)
@@ -43,6 +43,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'catalog.visibility.VisibilityCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -76,6 +77,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # scrape_worker threads wait for each other's short job updates instead of failing
+        'OPTIONS': {'timeout': 20},
     }
 }
 
@@ -129,6 +132,13 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# raw page archive, set MD_ARCHIVE_DIR to an empty string to disable
+PAGE_ARCHIVE_DIR = os.environ.get('MD_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+
+# background upload jobs, set MD_UPLOAD_JOB_THREADS to 0 to leave them to the upload_worker command
+UPLOAD_JOB_THREADS = int(os.environ.get('MD_UPLOAD_JOB_THREADS', 2))
+UPLOAD_JOB_DIR = os.environ.get('MD_UPLOAD_JOB_DIR', os.path.join(BASE_DIR, 'uploads'))
+
 # database config
 if 'DATABASE_URL' in os.environ:
     DATABASES['default'] = dj_database_url.config(